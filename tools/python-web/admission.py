@@ -0,0 +1,106 @@
+"""
+Admission Module
+요청 마감시간 기반 수락 제어 - 버스가 포화되면 제시간에 끝낼 수 없는 요청을 미리 거절하는 모듈
+- ServiceTimes: (port, 명령 종류)별 최근 버스 처리 시간 (EWMA)
+- AdmissionController: 대기열 예상 시간 + 처리 시간이 마감시간을 넘으면 거절
+- 대기 중 마감시간이 지난 요청은 버스를 쓰지 않고 버림 (FairBusGate에서 DeadlineExceeded)
+"""
+import threading
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """마감시간 안에 처리할 수 없는 요청"""
+
+    def __init__(self, message: str, estimated: float = 0.0):
+        super().__init__(message)
+        self.estimated = estimated  # 예상 대기 + 처리 시간 (초)
+
+
+class ServiceTimes:
+    """(port, kind)별 버스 처리 시간 지수이동평균"""
+
+    def __init__(self, defaults: dict, alpha: float = 0.2):
+        """
+        Args:
+            defaults: 관측 전 기본값 {kind: 초}
+            alpha: 새 관측값 반영 비율
+        """
+        self.defaults = defaults
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._ewma = {}
+        self._count = {}
+
+    def observe(self, port: str, kind: str, seconds: float):
+        key = (port, kind)
+        with self._lock:
+            current = self._ewma.get(key)
+            self._ewma[key] = seconds if current is None else current + self.alpha * (seconds - current)
+            self._count[key] = self._count.get(key, 0) + 1
+
+    def estimate(self, port: str, kind: str) -> float:
+        with self._lock:
+            return self._ewma.get((port, kind), self.defaults.get(kind, 0.1))
+
+    def measured(self, port: str, kind: str) -> Optional[float]:
+        """관측값이 있을 때만 추정치 (없으면 None)"""
+        with self._lock:
+            return self._ewma.get((port, kind))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                f'{port}:{kind}': {'ewma_ms': round(value * 1000, 1), 'samples': self._count[(port, kind)]}
+                for (port, kind), value in self._ewma.items()
+            }
+
+
+class AdmissionController:
+    def __init__(self, service_times: ServiceTimes, max_deadline: float = 30.0):
+        """
+        Args:
+            service_times: 처리 시간 추정치
+            max_deadline: 요청 헤더로 지정할 수 있는 최대 마감시간 (초)
+        """
+        self.service_times = service_times
+        self.max_deadline = max_deadline
+        self.admitted = 0
+        self.rejected = 0
+
+    def deadline(self, budget_ms: Optional[str], default: float) -> float:
+        """
+        요청 마감시각 (time.monotonic 기준)
+
+        Args:
+            budget_ms: 요청 헤더의 남은 시간 (밀리초 문자열, 없거나 잘못되면 default)
+            default: 엔드포인트 기본 마감시간 (초)
+        """
+        budget = default
+        if budget_ms:
+            try:
+                budget = min(max(float(budget_ms) / 1000, 0.0), self.max_deadline)
+            except ValueError:
+                pass
+        return time.monotonic() + budget
+
+    def admit(self, port: str, kind: str, deadline: float, backlog: float):
+        """
+        수락 여부 판단 - 대기열(backlog초) 뒤에서 처리해도 마감시간 안이면 통과
+
+        Raises:
+            DeadlineExceeded: 제시간에 끝낼 수 없음
+        """
+        estimated = backlog + self.service_times.estimate(port, kind)
+        if time.monotonic() + estimated > deadline:
+            self.rejected += 1
+            raise DeadlineExceeded('버스가 혼잡해 제시간에 처리할 수 없습니다.', estimated)
+        self.admitted += 1
+
+    def snapshot(self) -> dict:
+        return {
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'service_times': self.service_times.snapshot(),
+        }
@@ -2,22 +2,403 @@
 Door Lock Control Web Application
 Flask 기반 웹 인터페이스로 잠금장치 제어
 """
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, g, has_request_context
+from contextlib import contextmanager
+from typing import Optional
+from admission import AdmissionController, DeadlineExceeded, ServiceTimes
+from bus_scanner import ALL_DEVICE_IDS, BusScanner, DeviceMapStore
+from capacity_planner import plan as plan_capacity
+from circuit_breaker import CircuitOpen, DeviceBreakers
+from command_outbox import PRIORITY_HIGH, CommandOutbox
 from door_lock_controller import DoorLockController
+from door_events import TransitionDetector, WebhookDispatcher
+from fleet_config import ConfigWatcher, ControllerRegistry
+from fleet_state import FleetStateTable
+from frame_codec import build_frame, build_status_query
+from history_store import HistoryStore
+from line_timing import COMMAND, QUERY
+from poll_scheduler import AdaptivePoller
+from port_discovery import candidate_ports, discover
+from rate_limiter import FairBusGate, RateLimits
+from relock_timer import RelockScheduler
+from single_flight import SingleFlight
+from tracing import Tracer
+import tracing
+from datetime import datetime
+import math
+import os
+import threading
+import time
 import traceback
 
 app = Flask(__name__)
 
-# 전역 컨트롤러 인스턴스
-controller = None
+# 장치 맵 등 런타임 데이터 저장 위치 (부하 테스트 등은 환경변수 DOOR_LOCK_DATA_DIR로 분리)
+DATA_DIR = os.environ.get(
+    'DOOR_LOCK_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+)
+
+# 포트/장치 구성 파일 (없으면 기본 포트 COM2로 동작)
+CONFIG_PATH = os.environ.get(
+    'DOOR_LOCK_CONFIG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fleet.json')
+)
+
+# 응답 없는 장치 차단 (포트 재시작 후에도 유지)
+breakers = DeviceBreakers()
+
+# 포트별 컨트롤러 (설정 파일 변경 시 바뀐 포트만 재시작)
+registry = ControllerRegistry(lambda cfg: DoorLockController(
+    port=cfg.port, baudrate=cfg.baudrate, timeout=cfg.timeout,
+    append_cr=cfg.append_cr, background_reader=True, breakers=breakers,
+))
+config_watcher = ConfigWatcher(CONFIG_PATH, registry)
+config_watcher.reload()
+
+# 동일 (port, device) 상태 조회 합치기
+status_flight = SingleFlight()
+
+# 문 상태 변화 감지 → 웹훅 전달
+detector = TransitionDetector()
+webhooks = WebhookDispatcher()
+detector.add_listener(webhooks.publish)
+
+# 명령 결과 / 상태 변화 기록 (data/history.db)
+history = HistoryStore(os.path.join(DATA_DIR, 'history.db'))
+detector.add_listener(history.record_transition)
+poller = None
+
+# 전체 장치 최근 상태 (대시보드 일괄 조회용)
+fleet_state = FleetStateTable()
+
+# 클라이언트별 요청 한도 + 포트별 공정 큐
+rate_limits = RateLimits()
+fair_gates = {}
+
+# 버스를 사용하는 API: (예산 종류, 기본 마감시간 초)
+# 요청 헤더 X-Deadline-Ms(남은 밀리초)로 마감시간 지정 가능
+BUS_ENDPOINTS = {
+    'open_lock': (COMMAND, 5.0),
+    'open_lock_5sec': (COMMAND, 5.0),
+    'open_for': (COMMAND, 5.0),
+    'close_lock': (COMMAND, 5.0),
+    'send_raw': (COMMAND, 5.0),
+    'query_status': (QUERY, 3.0),
+    'read_status': (QUERY, 3.0),
+}
+
+# 마감시간 기반 수락 제어 (관측 전 처리 시간 기본값: 초)
+admission = AdmissionController(ServiceTimes({COMMAND: 0.2, QUERY: 0.1}))
+
+# 요청 구간 측정 (샘플 비율: 환경변수 DOOR_LOCK_TRACE_SAMPLE, 기본 0 = 파일 기록 안 함)
+tracer = Tracer(
+    os.path.join(DATA_DIR, 'trace.json'),
+    sample_rate=float(os.environ.get('DOOR_LOCK_TRACE_SAMPLE', '0') or 0),
+)
+
+# 버스 장치 ID 스캔
+device_maps = DeviceMapStore(os.path.join(DATA_DIR, 'device_map.json'))
+scanner = BusScanner(device_maps)
+background_scans = set()  # 백그라운드 전체 스캔 중인 포트
+background_scans_lock = threading.Lock()
+
 
 def get_controller():
-    """컨트롤러 인스턴스 가져오기"""
-    global controller
-    if controller is None:
-        port = request.args.get('port', 'COM2')
-        controller = DoorLockController(port=port)
-    return controller
+    """요청 대상 포트(port 파라미터, 없으면 기본 포트)의 컨트롤러 가져오기"""
+    data = request.get_json(silent=True) or {}
+    return registry.get(request.args.get('port') or data.get('port'))
+
+
+def request_device_id() -> Optional[int]:
+    """요청의 device_id (JSON 본문 또는 쿼리스트링, 기본값 1) - 범위 밖이면 None"""
+    data = request.get_json(silent=True) or {}
+    value = data.get('device_id', request.args.get('device_id', 1))
+    try:
+        device_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return device_id if device_id in ALL_DEVICE_IDS else None
+
+
+def invalid_device_response():
+    return jsonify({
+        'success': False,
+        'message': '장치 ID는 1~254 사이여야 합니다.'
+    }), 400
+
+
+def client_id() -> str:
+    """요청 클라이언트 식별자 (X-Client-Id 헤더, 없으면 접속 주소)"""
+    if not has_request_context():
+        return 'poller'
+    return request.headers.get('X-Client-Id') or request.remote_addr or 'unknown'
+
+
+def fair_gate(port: str) -> FairBusGate:
+    gate = fair_gates.setdefault(port, FairBusGate())
+    # 실제로 동시 전송 중인 포트만 창 크기만큼 함께 통과 (SOH 응답 / 요청-응답 모드 / 확인 전에는 1)
+    ctrl = registry.get(port)
+    gate.capacity = ctrl.pipeline_window if ctrl.pipeline_active else 1
+    return gate
+
+
+@contextmanager
+def bus_slot(ctrl, kind: str, client: Optional[str] = None):
+    """
+    포트 버스 사용 구간 - 클라이언트 가중치에 따라 공정하게 순서 배정
+    대기 중 요청 마감시간이 지나면 DeadlineExceeded, 사용 시간은 처리 시간 추정에 반영
+    """
+    client = client or client_id()
+    weight = registry.config.client_weights.get(client, 1.0)
+    deadline = g.get('deadline') if has_request_context() else None
+    cost = admission.service_times.estimate(ctrl.port, kind)
+    tracing.mark('queue_enter')
+    with fair_gate(ctrl.port).slot(client, weight=weight, cost=cost, deadline=deadline):
+        tracing.mark('bus_acquired')
+        started = time.monotonic()
+        try:
+            yield
+        except CircuitOpen:
+            # 버스를 쓰지 않고 거절됨 - 처리 시간 추정에서 제외
+            started = None
+            raise
+        finally:
+            if started is not None:
+                admission.service_times.observe(ctrl.port, kind, time.monotonic() - started)
+            tracing.mark('bus_released')
+
+
+def deadline_response(e: DeadlineExceeded):
+    """마감시간 안에 처리할 수 없는 요청 - 503 + Retry-After"""
+    response = jsonify({
+        'success': False,
+        'message': str(e),
+        'estimated_ms': round(e.estimated * 1000)
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.estimated)))
+    return response
+
+
+def timing_requested() -> bool:
+    """응답에 timing 포함 요청 여부 (?timing=1 또는 X-Timing: 1)"""
+    value = request.args.get('timing') or request.headers.get('X-Timing')
+    return value not in (None, '', '0', 'false')
+
+
+@app.before_request
+def begin_trace():
+    """요청 구간 측정 시작 (샘플링 또는 timing 요청 시에만)"""
+    tracer.begin(request.endpoint or request.path, force=timing_requested(), path=request.path)
+
+
+@app.before_request
+def reject_unknown_port():
+    """설정에 없는 포트 요청은 400 (요청마다 컨트롤러 / 수신 스레드가 생기지 않도록)"""
+    if request.endpoint == 'set_port':
+        return None
+    data = request.get_json(silent=True) or {}
+    port = request.args.get('port') or data.get('port')
+    if port and not registry.known(port):
+        return jsonify({
+            'success': False,
+            'message': f'잘못된 요청: 설정에 없는 포트입니다: {port}'
+        }), 400
+    return None
+
+
+@app.before_request
+def limit_request():
+    """
+    버스 사용 API 수락 확인
+    - 요청 한도 초과 시 429 + Retry-After
+    - 대기열 예상 시간으로 마감시간을 못 지키면 503 (버스에 넣지 않음, 소모한 토큰 반환)
+    """
+    endpoint = BUS_ENDPOINTS.get(request.endpoint)
+    if endpoint is None:
+        return None
+    kind, default_deadline = endpoint
+    data = request.get_json(silent=True) or {}
+    port = request.args.get('port') or data.get('port') or registry.default_port
+    client, device_id = client_id(), request_device_id() or 1
+    retry_after = rate_limits.check(client, port, device_id, kind)
+    if retry_after > 0:
+        response = jsonify({
+            'success': False,
+            'message': '요청이 너무 많습니다. 잠시 후 다시 시도해주세요.',
+            'retry_after': round(retry_after, 2)
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+    g.deadline = admission.deadline(request.headers.get('X-Deadline-Ms'), default_deadline)
+    try:
+        admission.admit(port, kind, g.deadline, fair_gate(port).backlog())
+    except DeadlineExceeded as e:
+        rate_limits.refund(client, port, device_id, kind)
+        return deadline_response(e)
+    tracing.mark('admitted')
+    return None
+
+
+@app.after_request
+def end_trace(response):
+    """요청 구간 측정 종료 - timing 요청 시 JSON 응답에 구간별 소요 시간 추가"""
+    trace = tracing.current()
+    if trace is None:
+        return response
+    trace.mark('response')
+    if timing_requested() and response.is_json:
+        data = response.get_json(silent=True)
+        if isinstance(data, dict):
+            data['timing'] = trace.timing()
+            response.set_data(app.json.dumps(data))
+    tracer.end(trace)
+    return response
+
+
+def hex_bytes(frame: bytes) -> str:
+    return ' '.join(f'{b:02X}' for b in frame)
+
+
+def coalesced_query(ctrl, device_id):
+    """(port, device) 단위로 합쳐진 상태 조회 - (결과, 공유 여부)"""
+    def leader():
+        with bus_slot(ctrl, QUERY):
+            return ctrl.query_status(device_id)
+
+    result, coalesced = status_flight.do((ctrl.port, device_id), leader)
+    # 공유받은 결과는 같은 관측이므로 변화 감지에는 한 번만 반영
+    if not coalesced:
+        device_maps.mark(ctrl.port, device_id, result is not None)
+        fleet_state.update(ctrl.port, device_id, result['status_code'] if result else None)
+        if result:
+            detector.observe(ctrl.port, device_id, result['status_code'])
+    return result, coalesced
+
+
+def poll_query(ctrl, device_id):
+    """폴러용 상태 조회 - 차단 중인 장치는 응답 없음으로 취급 (폴러 스레드 유지)"""
+    try:
+        return coalesced_query(ctrl, device_id)[0]
+    except CircuitOpen:
+        return None
+
+
+def deliver_outbox(entry) -> bool:
+    """outbox 명령 재전송 (포트 복구 후)"""
+    ctrl = registry.get(entry.port)
+    actions = {'open': ctrl.open_lock, 'open5sec': ctrl.open_lock_5sec, 'close': ctrl.close_lock}
+    with bus_slot(ctrl, COMMAND, client='outbox'):
+        success = actions[entry.action](entry.device_id)
+    if success:
+        history.record_command(entry.port, entry.device_id, entry.action, 'ok', client='outbox')
+    return success
+
+
+# 포트 장애 동안 반드시 전달할 명령 보관 (재시작 후에도 유지)
+outbox = CommandOutbox(os.path.join(DATA_DIR, 'outbox.jsonl'), deliver_outbox)
+
+# must_deliver 명령 기본 만료 시간 / 예약 잠금 만료 시간 (초)
+OUTBOX_DEFAULT_TTL = 300
+OUTBOX_RELOCK_TTL = 3600
+
+
+def relock(port: str, device_id: int) -> bool:
+    """예약 시간이 된 장치 잠금 (relock 타이머 스레드에서 호출) - 실패 시 스케줄러가 재시도"""
+    ctrl = registry.get(port)
+    print(f"[RELOCK] 자동 잠금: {port} 장치 {device_id}")
+    try:
+        with bus_slot(ctrl, COMMAND, client='relock'):
+            success = ctrl.close_lock(device_id)
+    except DeadlineExceeded as e:
+        # 차단 중인 장치(CircuitOpen) 등 - 실패로 보고 재시도, 끝내 실패하면 relock_give_up
+        print(f"[RELOCK] 전송 보류: {port} 장치 {device_id} ({e})")
+        success = False
+    if success:
+        outbox.supersede(port, device_id)
+        boost_poll(port, device_id)
+        history.record_command(port, device_id, 'relock', 'ok', client='relock')
+    return success
+
+
+def relock_give_up(port: str, device_id: int):
+    """재시도까지 실패한 예약 잠금 - outbox가 포트 복구 후 재전송"""
+    outbox.put(port, device_id, 'close', ttl=OUTBOX_RELOCK_TTL, priority=PRIORITY_HIGH)
+    outbox.start()
+    history.record_command(port, device_id, 'relock', 'queued', client='relock')
+
+
+# 서버 측 자동 잠금 예약 (재시작 후에도 유지)
+relocks = RelockScheduler(os.path.join(DATA_DIR, 'relocks.jsonl'), relock, give_up=relock_give_up)
+
+
+def command_sent(ctrl, device_id: int, action: str):
+    """직접 보낸 열기/닫기 성공 - 예약 잠금 / 보관 중인 이전 명령보다 우선"""
+    history.record_command(ctrl.port, device_id, action, 'ok', client=client_id())
+    relocks.cancel(ctrl.port, device_id)
+    outbox.supersede(ctrl.port, device_id)
+    boost_poll(ctrl.port, device_id)
+
+
+def command_failed(ctrl, device_id: int, action: str):
+    """
+    명령 전송 실패 응답
+    must_deliver 요청이면 outbox에 보관하고 202 (포트가 돌아오면 재전송)
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get('must_deliver'):
+        history.record_command(ctrl.port, device_id, action, 'failed', client=client_id())
+        return jsonify({
+            'success': False,
+            'message': '명령 전송에 실패했습니다.'
+        }), 500
+    try:
+        ttl = float(data.get('ttl', OUTBOX_DEFAULT_TTL))
+        if not math.isfinite(ttl) or ttl <= 0:
+            raise ValueError(f'ttl은 0보다 큰 초 단위 숫자여야 합니다: {data.get("ttl")}')
+    except (TypeError, ValueError) as e:
+        history.record_command(ctrl.port, device_id, action, 'failed', client=client_id())
+        return jsonify({
+            'success': False,
+            'message': f'잘못된 요청: {str(e)}'
+        }), 400
+    entry = outbox.put(ctrl.port, device_id, action, ttl=ttl)
+    outbox.start()
+    history.record_command(ctrl.port, device_id, action, 'queued', client=client_id())
+    return jsonify({
+        'success': False,
+        'queued': True,
+        'message': '포트에 연결할 수 없어 명령을 보관했습니다. 연결되면 다시 전송합니다.',
+        'device_id': device_id,
+        'expires': entry.expires
+    }), 202
+
+# open-for 최대 시간 (초)
+MAX_OPEN_SECONDS = 7 * 24 * 3600
+
+
+def boost_poll(port: str, device_id: int):
+    """열기/닫기 직후 해당 장치 상태를 자주 조회"""
+    if poller is not None and poller.port == port:
+        poller.boost(device_id)
+
+
+def stop_poller():
+    """상태 폴링 중지 (컨트롤러 교체 전 호출)"""
+    global poller
+    if poller is not None:
+        poller.stop()
+        poller = None
+
+
+def on_controller_retired(port, ctrl):
+    """설정 변경으로 컨트롤러가 교체/제거될 때 해당 포트 폴링 중지"""
+    if poller is not None and poller.port == port:
+        stop_poller()
+
+
+registry.add_listener(on_controller_retired)
 
 
 @app.route('/')
@@ -31,23 +412,30 @@ def open_lock():
     """잠금장치 열기 API"""
     try:
         ctrl = get_controller()
+        device_id = request_device_id()
+        if device_id is None:
+            return invalid_device_response()
 
         # 상세 로그 출력
         print(f"\n{'='*60}")
-        print(f"[OPEN] 명령 전송 시작")
+        print(f"[OPEN] 명령 전송 시작 (장치 {device_id})")
         print(f"포트: {ctrl.port}, Baud: {ctrl.baudrate}")
         print(f"RTS/CTS: 활성화, CR 추가: {ctrl.append_cr}")
         print(f"{'='*60}\n")
 
-        success = ctrl.open_lock()
+        with bus_slot(ctrl, COMMAND):
+            success = ctrl.open_lock(device_id)
+        if success:
+            command_sent(ctrl, device_id, 'open')
 
-        command_hex = '10 02 01 1B 31 FF 10 03'
+        command_hex = hex_bytes(build_frame(device_id, '1'))
 
         if success:
             return jsonify({
                 'success': True,
                 'message': '잠금장치를 열었습니다.',
                 'command': command_hex,
+                'device_id': device_id,
                 'details': {
                     'port': ctrl.port,
                     'rtscts': True,
@@ -55,11 +443,10 @@ def open_lock():
                 }
             })
         else:
-            return jsonify({
-                'success': False,
-                'message': '명령 전송에 실패했습니다.'
-            }), 500
+            return command_failed(ctrl, device_id, 'open')
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -73,21 +460,28 @@ def open_lock_5sec():
     """잠금장치 열기 (5초 후 자동잠금) API"""
     try:
         ctrl = get_controller()
+        device_id = request_device_id()
+        if device_id is None:
+            return invalid_device_response()
 
         print(f"\n{'='*60}")
-        print(f"[OPEN5SEC] 명령 전송 시작 (5초 자동잠금)")
+        print(f"[OPEN5SEC] 명령 전송 시작 (5초 자동잠금, 장치 {device_id})")
         print(f"포트: {ctrl.port}, Baud: {ctrl.baudrate}")
         print(f"{'='*60}\n")
 
-        success = ctrl.open_lock_5sec()
+        with bus_slot(ctrl, COMMAND):
+            success = ctrl.open_lock_5sec(device_id)
+        if success:
+            command_sent(ctrl, device_id, 'open5sec')
 
-        command_hex = '10 02 01 1B 31 31 10 03'
+        command_hex = hex_bytes(build_frame(device_id, '1', param=0x31))
 
         if success:
             return jsonify({
                 'success': True,
                 'message': '잠금장치를 열었습니다. (5초 후 자동잠금)',
                 'command': command_hex,
+                'device_id': device_id,
                 'details': {
                     'port': ctrl.port,
                     'rtscts': True,
@@ -95,11 +489,167 @@ def open_lock_5sec():
                 }
             })
         else:
+            return command_failed(ctrl, device_id, 'open5sec')
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/open-for', methods=['POST'])
+def open_for():
+    """잠금장치 열기 (지정한 시간 후 서버에서 잠금) API - 다시 호출하면 잠금 시각 갱신"""
+    try:
+        ctrl = get_controller()
+        device_id = request_device_id()
+        if device_id is None:
+            return invalid_device_response()
+
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get('seconds', request.args.get('seconds')))
+        except (TypeError, ValueError):
+            seconds = 0
+        if not 0 < seconds <= MAX_OPEN_SECONDS:
+            return jsonify({
+                'success': False,
+                'message': f'seconds는 0 초과 {MAX_OPEN_SECONDS} 이하여야 합니다.'
+            }), 400
+
+        print(f"[OPEN-FOR] 명령 전송 시작 (장치 {device_id}, {seconds}초 후 잠금)")
+
+        with bus_slot(ctrl, COMMAND):
+            success = ctrl.open_lock(device_id)
+
+        if success:
+            history.record_command(ctrl.port, device_id, 'open_for', 'ok', client=client_id(), seconds=seconds)
+            outbox.supersede(ctrl.port, device_id)
+            boost_poll(ctrl.port, device_id)
+            relock_at = relocks.schedule(ctrl.port, device_id, seconds)
+            return jsonify({
+                'success': True,
+                'message': f'잠금장치를 열었습니다. ({seconds:g}초 후 자동잠금)',
+                'command': hex_bytes(build_frame(device_id, '1')),
+                'device_id': device_id,
+                'relock_at': relock_at,
+                'details': {
+                    'port': ctrl.port,
+                    'rtscts': True,
+                    'auto_lock': f'{seconds:g}sec'
+                }
+            })
+        else:
+            history.record_command(ctrl.port, device_id, 'open_for', 'failed', client=client_id(), seconds=seconds)
             return jsonify({
                 'success': False,
                 'message': '명령 전송에 실패했습니다.'
             }), 500
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/relocks', methods=['GET', 'DELETE'])
+def manage_relocks():
+    """자동 잠금 예약 조회 / 취소 (DELETE: port, device_id)"""
+    try:
+        if request.method == 'DELETE':
+            ctrl = get_controller()
+            device_id = request_device_id()
+            if device_id is None:
+                return invalid_device_response()
+            if not relocks.cancel(ctrl.port, device_id):
+                return jsonify({
+                    'success': False,
+                    'message': '예약된 자동 잠금이 없습니다.'
+                }), 404
+            return jsonify({'success': True, 'message': '자동 잠금 예약을 취소했습니다.'})
+
+        return jsonify({
+            'success': True,
+            'relocks': relocks.pending(request.args.get('port')),
+            'stats': relocks.snapshot()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """epoch 초 또는 ISO 8601 문자열 → epoch 초"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@app.route('/api/history', methods=['GET'])
+def event_history():
+    """
+    명령 / 상태 변화 기록 조회 (최신순)
+    필터: port, device_id, type, category(command/transition), since, until (epoch 초 또는 ISO 8601)
+    페이지: limit (최대 1000), cursor (이전 응답의 next_cursor)
+    """
+    try:
+        args = request.args
+        device_id = args.get('device_id', type=int)
+        port = args.get('port') or (registry.default_port if device_id is not None else None)
+        limit = min(max(args.get('limit', 100, type=int), 1), 1000)
+        started = time.monotonic()
+        events, next_cursor = history.query(
+            port=port,
+            device_id=device_id,
+            type_=args.get('type'),
+            category=args.get('category'),
+            since=parse_time(args.get('since')),
+            until=parse_time(args.get('until')),
+            limit=limit,
+            cursor=args.get('cursor'),
+        )
+        return jsonify({
+            'success': True,
+            'events': events,
+            'next_cursor': next_cursor,
+            'query_ms': round((time.monotonic() - started) * 1000, 2)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'잘못된 요청: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/outbox', methods=['GET'])
+def outbox_status():
+    """포트 장애로 보관 중인 명령 목록"""
+    try:
+        return jsonify({
+            'success': True,
+            'pending': outbox.pending(request.args.get('port')),
+            'stats': outbox.snapshot()
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -113,23 +663,30 @@ def close_lock():
     """잠금장치 닫기 API"""
     try:
         ctrl = get_controller()
+        device_id = request_device_id()
+        if device_id is None:
+            return invalid_device_response()
 
         # 상세 로그 출력
         print(f"\n{'='*60}")
-        print(f"[CLOSE] 명령 전송 시작")
+        print(f"[CLOSE] 명령 전송 시작 (장치 {device_id})")
         print(f"포트: {ctrl.port}, Baud: {ctrl.baudrate}")
         print(f"RTS/CTS: 활성화, CR 추가: {ctrl.append_cr}")
         print(f"{'='*60}\n")
 
-        success = ctrl.close_lock()
+        with bus_slot(ctrl, COMMAND):
+            success = ctrl.close_lock(device_id)
+        if success:
+            command_sent(ctrl, device_id, 'close')
 
-        command_hex = '10 02 01 1B 30 FF 10 03'
+        command_hex = hex_bytes(build_frame(device_id, '0'))
 
         if success:
             return jsonify({
                 'success': True,
                 'message': '잠금장치를 닫았습니다.',
                 'command': command_hex,
+                'device_id': device_id,
                 'details': {
                     'port': ctrl.port,
                     'rtscts': True,
@@ -137,11 +694,10 @@ def close_lock():
                 }
             })
         else:
-            return jsonify({
-                'success': False,
-                'message': '명령 전송에 실패했습니다.'
-            }), 500
+            return command_failed(ctrl, device_id, 'close')
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -155,13 +711,16 @@ def query_status():
     """잠금장치 상태 조회 API (능동적 쿼리)"""
     try:
         ctrl = get_controller()
+        device_id = request_device_id()
+        if device_id is None:
+            return invalid_device_response()
 
         print(f"\n{'='*60}")
-        print(f"[QUERY STATUS] 상태 조회 명령 전송")
+        print(f"[QUERY STATUS] 상태 조회 명령 전송 (장치 {device_id})")
         print(f"포트: {ctrl.port}, Baud: {ctrl.baudrate}")
         print(f"{'='*60}\n")
 
-        result = ctrl.query_status()
+        result, coalesced = coalesced_query(ctrl, device_id)
 
         if result:
             return jsonify({
@@ -171,7 +730,9 @@ def query_status():
                 'door': result['door'],
                 'description': result['description'],
                 'raw_data': result['raw_data'],
-                'command': '10 02 01 1C FF 00 10 03',
+                'command': hex_bytes(build_status_query(device_id)),
+                'device_id': device_id,
+                'coalesced': coalesced,
                 'message': result['description']
             })
         else:
@@ -180,6 +741,8 @@ def query_status():
                 'message': '상태 조회에 실패했습니다.'
             }), 500
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -193,7 +756,13 @@ def read_status():
     """잠금장치 상태 읽기 API"""
     try:
         ctrl = get_controller()
-        status = ctrl.read_status()
+        if ctrl.reader is not None:
+            # 상시 수신: 장치가 보내는 프레임을 이벤트 채널에서 대기 - 버스를 쓰지 않으므로 슬롯 없이
+            status = ctrl.read_status()
+        else:
+            # 요청-응답 모드: 포트에서 직접 읽는 동안 버스 점유
+            with bus_slot(ctrl, QUERY):
+                status = ctrl.read_status()
 
         if status:
             return jsonify({
@@ -209,6 +778,8 @@ def read_status():
                 'message': '상태 읽기에 실패했습니다.'
             }), 500
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -217,24 +788,106 @@ def read_status():
         }), 500
 
 
+def scan_slot(ctrl):
+    """스캔 조회 묶음 1개의 버스 사용 구간 - 다른 요청과 공정 큐로 번갈아 사용"""
+    return bus_slot(ctrl, QUERY, client='scan')
+
+
+def check_id_fair(ctrl) -> Optional[int]:
+    """설정된 장치 중 응답하는 첫 ID (ID마다 버스를 잡았다 놓음 - 다른 요청과 번갈아 사용)"""
+    for device_id in registry.port_config(ctrl.port).devices:
+        with scan_slot(ctrl):
+            if ctrl.check_id([device_id]) is not None:
+                return device_id
+    return None
+
+
+def start_background_scan(ctrl) -> bool:
+    """1~254 전체 스캔을 백그라운드로 시작 (이미 스캔 중이면 False) - 결과는 장치 맵에 저장"""
+    with background_scans_lock:
+        if ctrl.port in background_scans:
+            return False
+        background_scans.add(ctrl.port)
+
+    def run():
+        try:
+            scanner.scan(ctrl, slot=lambda: scan_slot(ctrl))
+        except Exception as e:
+            print(f"[SCAN] 백그라운드 스캔 실패 ({ctrl.port}): {e}")
+        finally:
+            with background_scans_lock:
+                background_scans.discard(ctrl.port)
+
+    threading.Thread(target=run, name='bus-scan', daemon=True).start()
+    return True
+
+
 @app.route('/api/check-id', methods=['GET'])
 def check_id():
     """장치 ID 확인 API"""
     try:
         ctrl = get_controller()
-        device_id = ctrl.check_id()
 
-        if device_id is not None:
+        # 스캔된 장치 맵이 있으면 버스를 건드리지 않음
+        device_ids = device_maps.device_ids(ctrl.port)
+        if not device_ids:
+            device_id = check_id_fair(ctrl)
+            device_ids = [device_id] if device_id is not None else []
+        if not device_ids:
+            # 설정된 장치가 응답하지 않음 - 전체 범위는 요청 안에서 기다리지 않고 백그라운드 스캔
+            start_background_scan(ctrl)
+            return jsonify({
+                'success': False,
+                'scanning': True,
+                'message': '설정된 장치가 응답하지 않아 전체 ID 스캔을 시작했습니다. 잠시 후 다시 확인하세요.'
+            }), 202
+
+        return jsonify({
+            'success': True,
+            'device_id': device_ids[0],
+            'device_ids': device_ids,
+            'message': f'장치 ID: {", ".join(map(str, device_ids))}'
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/scan', methods=['GET', 'POST'])
+def scan_bus():
+    """버스 장치 ID 스캔 API (mode: full / incremental)"""
+    try:
+        ctrl = get_controller()
+        if request.method == 'GET':
             return jsonify({
                 'success': True,
-                'device_id': device_id,
-                'message': f'장치 ID: {device_id}'
+                'port': ctrl.port,
+                'map': device_maps.get(ctrl.port)
             })
-        else:
+
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode', 'full')
+        try:
+            start = int(data.get('start', 1))
+            end = int(data.get('end', 254))
+        except (TypeError, ValueError) as e:
             return jsonify({
                 'success': False,
-                'message': 'ID 확인에 실패했습니다.'
-            }), 500
+                'message': f'잘못된 요청: {str(e)}'
+            }), 400
+        if mode not in ('full', 'incremental') or not 1 <= start <= end <= 254:
+            return jsonify({
+                'success': False,
+                'message': 'mode는 full/incremental, 범위는 1~254 사이여야 합니다.'
+            }), 400
+
+        report = scanner.scan(ctrl, range(start, end + 1), incremental=(mode == 'incremental'),
+                              slot=lambda: scan_slot(ctrl))
+        return jsonify(dict(report, success=True))
 
     except Exception as e:
         return jsonify({
@@ -272,23 +925,64 @@ def connection_test():
         }), 500
 
 
+@app.route('/api/discover-ports', methods=['GET'])
+def discover_ports():
+    """잠금장치가 연결된 시리얼 포트 병렬 탐색 API"""
+    try:
+        extra = [p for p in request.args.get('extra', '').split(',') if p]
+        deadline = request.args.get('deadline', 0.3, type=float)
+        device_id = request.args.get('device_id', 1, type=int)
+
+        # 사용 중인 포트는 다시 열지 않고 해당 컨트롤러로 조회
+        active = registry.ports()
+        ports = [p for p in candidate_ports(extra) if p not in active]
+        scan_started = time.monotonic()
+        report = discover(ports, device_id=device_id, deadline=deadline)
+
+        for port in active:
+            ctrl = registry.get(port)
+            if not ctrl.connect():
+                continue
+            started = time.monotonic()
+            result, _ = coalesced_query(ctrl, device_id)
+            active_result = {
+                'port': port,
+                'opened': True,
+                'responded': result is not None,
+                'status_code': result['status_code'] if result else None,
+                'latency_ms': round((time.monotonic() - started) * 1000, 1),
+                'error': None,
+                'in_use': True,
+            }
+            report['results'].insert(0, active_result)
+            if active_result['responded']:
+                report['found'].insert(0, port)
+            report['elapsed_ms'] = round((time.monotonic() - scan_started) * 1000, 1)
+
+        return jsonify(dict(report, success=True))
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
 @app.route('/api/set-port', methods=['POST'])
 def set_port():
-    """COM 포트 설정 API"""
+    """기본 포트 설정 API (다른 포트의 연결은 유지)"""
     try:
-        global controller
         data = request.get_json()
         port = data.get('port', 'COM2')
+        if registry.config.ports and port not in registry.config.ports:
+            # 설정 파일로 포트를 선언한 경우 그 안에서만 선택
+            return jsonify({
+                'success': False,
+                'message': f'잘못된 요청: 설정에 없는 포트입니다: {port}'
+            }), 400
 
-        # 기존 설정 보존
-        append_cr = controller.append_cr if controller else False
-
-        # 기존 연결 해제
-        if controller:
-            controller.disconnect()
-
-        # 새 컨트롤러 생성 (CR 설정 유지)
-        controller = DoorLockController(port=port, append_cr=append_cr)
+        registry.set_default_port(port)
 
         return jsonify({
             'success': True,
@@ -305,21 +999,13 @@ def set_port():
 
 @app.route('/api/toggle-cr', methods=['POST'])
 def toggle_cr():
-    """CR 추가 옵션 토글 API"""
+    """CR 추가 옵션 토글 API (재연결 없이 다음 명령부터 적용)"""
     try:
-        global controller
         data = request.get_json()
         append_cr = data.get('append_cr', True)
 
-        # 기존 연결 해제
-        if controller:
-            port = controller.port
-            controller.disconnect()
-        else:
-            port = 'COM2'
-
-        # CR 옵션으로 새 컨트롤러 생성
-        controller = DoorLockController(port=port, append_cr=append_cr)
+        ctrl = get_controller()
+        ctrl.append_cr = append_cr
 
         return jsonify({
             'success': True,
@@ -353,7 +1039,8 @@ def send_raw():
         print(f"포트: {ctrl.port}, Baud: {ctrl.baudrate}")
         print(f"{'='*60}\n")
 
-        success = ctrl.send_raw(hex_string)
+        with bus_slot(ctrl, COMMAND):
+            success = ctrl.send_raw(hex_string)
 
         if success:
             return jsonify({
@@ -367,6 +1054,8 @@ def send_raw():
                 'message': '전송 실패'
             }), 500
 
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -387,7 +1076,310 @@ def get_settings():
                 'port': ctrl.port,
                 'baudrate': ctrl.baudrate,
                 'append_cr': ctrl.append_cr,
-                'rtscts': True
+                'rtscts': True,
+                'ports': registry.ports(),
+                'default_port': registry.default_port
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/config', methods=['GET', 'POST'])
+def fleet_config():
+    """구성 조회 / 설정 파일 즉시 다시 읽기 API"""
+    try:
+        if request.method == 'POST':
+            config_watcher.reload(force=True)
+
+        config = registry.config
+        return jsonify({
+            'success': config_watcher.last_error is None,
+            'path': CONFIG_PATH,
+            'default_port': config.default_port,
+            'ports': {port: cfg._asdict() for port, cfg in config.ports.items()},
+            'groups': {name: [f'{p}:{d}' for p, d in members] for name, members in config.groups.items()},
+            'active_ports': registry.ports(),
+            'last_report': config_watcher.last_report,
+            'error': config_watcher.last_error
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/events', methods=['GET'])
+def events():
+    """요청 없이 수신된 상태 프레임(이벤트) 조회 API"""
+    try:
+        ctrl = get_controller()
+        if not ctrl.connect() or ctrl.reader is None:
+            return jsonify({
+                'success': False,
+                'message': '상시 수신이 동작 중이 아닙니다.'
+            }), 500
+
+        since = request.args.get('since', 0, type=int)
+        recent = ctrl.reader.recent_events(since)
+        return jsonify({
+            'success': True,
+            'events': recent,
+            'last_seq': recent[-1]['seq'] if recent else since
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/transitions', methods=['GET'])
+def transitions():
+    """최근 문/잠금 상태 변화 조회 API"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({
+            'success': True,
+            'transitions': [t.to_dict() for t in detector.recent(limit)],
+            'states': detector.known_states()
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/webhooks', methods=['GET', 'POST', 'DELETE'])
+def manage_webhooks():
+    """상태 변화 웹훅 등록/해제/조회 API"""
+    try:
+        if request.method == 'GET':
+            return jsonify({
+                'success': True,
+                'webhooks': webhooks.snapshot()
+            })
+
+        data = request.get_json()
+        url = data.get('url', '')
+        if not url.startswith(('http://', 'https://')):
+            return jsonify({
+                'success': False,
+                'message': 'http(s) URL을 입력해주세요.'
+            }), 400
+
+        if request.method == 'POST':
+            webhooks.register(url)
+            return jsonify({
+                'success': True,
+                'message': f'웹훅 등록: {url}'
+            })
+
+        if not webhooks.unregister(url):
+            return jsonify({
+                'success': False,
+                'message': f'등록되지 않은 웹훅: {url}'
+            }), 404
+        return jsonify({
+            'success': True,
+            'message': f'웹훅 해제: {url}'
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/poller', methods=['GET', 'POST'])
+def manage_poller():
+    """
+    상태 폴링 시작/중지 API (폴링 결과가 변화 감지와 웹훅으로 전달됨)
+    budget: 폴링에 쓸 버스 시간 비율, min_interval/max_interval: 장치별 조회 주기 범위 (초)
+    """
+    try:
+        global poller
+        if request.method == 'POST':
+            data = request.get_json()
+            stop_poller()
+            if data.get('enabled', True):
+                ctrl = get_controller()
+                if not ctrl.connect():
+                    return jsonify({
+                        'success': False,
+                        'message': '연결에 실패했습니다.'
+                    }), 500
+                budget = float(data.get('budget', 0.2))
+                if not 0 < budget <= 1:
+                    return jsonify({
+                        'success': False,
+                        'message': 'budget은 0 초과 1 이하여야 합니다.'
+                    }), 400
+                # coalesced_query가 조회 결과를 변화 감지에 반영하므로 폴러는 수신 이벤트만 반영
+                poller = AdaptivePoller(
+                    lambda device_id: poll_query(ctrl, device_id),
+                    detector,
+                    port=ctrl.port,
+                    device_ids=data.get('device_ids') or list(registry.port_config(ctrl.port).devices),
+                    budget=budget,
+                    min_interval=float(data.get('min_interval', 0.25)),
+                    max_interval=float(data.get('max_interval', data.get('interval', 30.0))),
+                    observe_results=False,
+                )
+                poller.start(reader=ctrl.reader)
+
+        return jsonify({
+            'success': True,
+            'running': poller is not None and poller.running,
+            'device_ids': poller.device_ids if poller else [],
+            'port': poller.port if poller else None,
+            'polls': poller.polls if poller else 0,
+            'schedule': poller.snapshot() if poller else None
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/api/fleet-state', methods=['GET'])
+def fleet_state_snapshot():
+    """
+    전체 장치 최근 상태 일괄 조회 (port 파라미터로 포트 1개만)
+    상태가 바뀌지 않았으면 미리 만든 본문 재사용, If-None-Match가 같으면 304
+    """
+    etag, body, compressed = fleet_state.serialized(request.args.get('port'))
+    gzipped = compressed is not None and 'gzip' in request.accept_encodings
+    # 강한 ETag는 표현(바이트)마다 달라야 함 - gzip 본문은 -gz를 붙이고, 304는 어느 쪽 ETag든 같은 버전이면 허용
+    tag = f'{etag}-gz' if gzipped else etag
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(f'{etag}-gz'):
+        response = Response(status=304)
+    elif gzipped:
+        response = Response(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@app.route('/api/breakers', methods=['GET'])
+def breaker_states():
+    """장치별 차단기 상태 조회 (실패 기록이 있는 장치만, port 파라미터로 포트 1개만)"""
+    return jsonify({
+        'success': True,
+        'devices': breakers.states(request.args.get('port')),
+        'summary': breakers.snapshot()
+    })
+
+
+@app.route('/api/breakers', methods=['DELETE'])
+def reset_breakers():
+    """차단 해제 (장치 수리 후) - port, device_id 없으면 전체"""
+    try:
+        data = request.get_json(silent=True) or {}
+        port = request.args.get('port') or data.get('port')
+        device_id = request.args.get('device_id') or data.get('device_id')
+        cleared = breakers.reset(port, int(device_id) if device_id is not None else None)
+        return jsonify({
+            'success': True,
+            'cleared': cleared
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'잘못된 요청: {str(e)}'
+        }), 400
+
+
+@app.route('/api/capacity', methods=['GET'])
+def capacity():
+    """
+    버스 용량 계산 API (측정된 턴어라운드 / 처리 시간 기반)
+    rate: 장치당 초당 요청 수, open_ratio: 열기/닫기 비율, devices: 장치 수 (기본: 설정의 장치 수)
+    target: 목표 최대 사용률, slo_ms: 평균 응답 시간 목표, port: 없으면 모든 포트
+    """
+    try:
+        args = request.args
+        ports = [args['port']] if args.get('port') else registry.ports() or [registry.default_port]
+        plans = {}
+        for port in ports:
+            ctrl = registry.get(port)
+            usage = None
+            if poller is not None and poller.running and poller.port == port:
+                usage = poller.snapshot()['bus_usage']
+            plans[port] = plan_capacity(
+                baudrate=ctrl.baudrate,
+                devices=args.get('devices', len(registry.port_config(port).devices), type=int),
+                rate=args.get('rate', 0.1, type=float),
+                open_ratio=args.get('open_ratio', 0.2, type=float),
+                target_utilisation=args.get('target', 0.7, type=float),
+                slo_ms=args.get('slo_ms', type=float),
+                timings=ctrl.line_timings,
+                service_times={kind: admission.service_times.measured(port, kind) for kind in (COMMAND, QUERY)},
+                reply_timeout=ctrl.timeout,
+                reader=ctrl.background_reader,
+                append_cr=ctrl.append_cr,
+                background=usage or 0.0,
+            )
+        return jsonify({
+            'success': True,
+            'ports': plans
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': f'잘못된 요청: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'오류 발생: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """내부 동작 지표 조회 API"""
+    try:
+        readers = {}
+        for port in registry.ports():
+            reader = registry.get(port).reader
+            readers[port] = reader.snapshot() if reader else None
+        return jsonify({
+            'success': True,
+            'metrics': {
+                'status_single_flight': status_flight.stats(),
+                'bus_readers': readers,
+                'config_reloads': config_watcher.reloads,
+                'rate_limits': rate_limits.snapshot(),
+                'admission': admission.snapshot(),
+                'tracing': tracer.snapshot(),
+                'relocks': relocks.snapshot(),
+                'outbox': outbox.snapshot(),
+                'history': history.snapshot(),
+                'fair_gates': {port: gate.snapshot() for port, gate in list(fair_gates.items())},
+                'fleet_state': fleet_state.snapshot(),
+                'breakers': breakers.snapshot(),
+                'pipelines': {port: registry.get(port).pipeline_snapshot() for port in registry.ports()},
+                'line_timings': {port: registry.get(port).line_timings.snapshot() for port in registry.ports()},
+                'transitions_suppressed': detector.suppressed,
+                'webhooks': webhooks.snapshot(),
             }
         })
 
@@ -398,6 +1390,8 @@ def get_settings():
         }), 500
 
 
+DEBUG = True
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Door Lock Control Web Server")
@@ -405,8 +1399,19 @@ if __name__ == '__main__':
     print("서버 주소: http://localhost:5000")
     print("=" * 60)
 
+    # debug 리로더는 감시용 부모 프로세스에서도 이 블록을 실행함 - 백그라운드 작업은 실제 서버(자식)에서만
+    serving = not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if serving:
+        config_watcher.start()
+        relocks.start()
+        outbox.start()
     try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        app.run(debug=DEBUG, host='0.0.0.0', port=5000)
     finally:
-        if controller:
-            controller.disconnect()
+        config_watcher.stop()
+        relocks.stop()
+        outbox.stop()
+        stop_poller()
+        history.stop()
+        webhooks.stop()
+        registry.close_all()
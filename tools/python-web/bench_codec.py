@@ -0,0 +1,155 @@
+"""
+Codec Micro-benchmark
+프레임 디코딩/생성 처리량 측정 (결과는 JSON 1줄로 출력)
+- decode_*: 수신 스트림 디코딩 MB/s, frames/s (노이즈, 잘린 프레임, DLE escape, 송신 에코 포함)
+- parse_reply: 단일 응답 버퍼 파싱 (_parse_status_response 경로) replies/s
+- encode: build_frame / build_status_query frames/s
+- 최소 목표치(TARGETS) 미달 또는 baseline 대비 허용치 이상 하락 시 종료코드 1
+
+사용법:
+    python bench_codec.py
+    python bench_codec.py --capture rx_dump.bin       # 실제 수신 캡처(raw 바이너리) 추가 측정
+    python bench_codec.py --save-baseline bench.json
+    python bench_codec.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from frame_codec import FrameDecoder, build_frame, build_status_query, decode_first
+from fuzz_codec import generate_stream, load_corpus, soh_frame, split_chunks
+
+# 최소 처리량 목표 (9600bps 버스 1개 ≈ 0.00096 MB/s 이므로 수백 개 버스를 여유 있게 처리하는 수준)
+TARGETS = {
+    'decode_synthetic_mb_s': 0.5,
+    'decode_bytewise_mb_s': 0.1,
+    'decode_recorded_mb_s': 0.5,
+    'parse_reply_per_s': 50000,
+    'encode_frames_per_s': 200000,
+}
+
+
+def _timed(fn, min_time: float) -> tuple:
+    """min_time 이상 반복 실행 - (반복 횟수, 경과 초)"""
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+    return runs, elapsed
+
+
+def bench_decode(chunks: list, min_time: float) -> dict:
+    total = sum(len(c) for c in chunks)
+    frames = len(_decode_all(chunks))
+
+    runs, elapsed = _timed(lambda: _decode_all(chunks), min_time)
+    return {
+        'mb_s': round(total * runs / elapsed / 1e6, 3),
+        'frames_s': round(frames * runs / elapsed),
+        'bytes': total,
+        'frames': frames,
+    }
+
+
+def _decode_all(chunks: list) -> list:
+    decoder = FrameDecoder()
+    feed = decoder.feed
+    out = []
+    for chunk in chunks:
+        out.extend(feed(chunk))
+    return out
+
+
+def bench_parse_reply(min_time: float) -> float:
+    replies = [soh_frame(code) for code in ('00', '01', '10')] * 100
+
+    def run():
+        for reply in replies:
+            decode_first(reply)
+
+    runs, elapsed = _timed(run, min_time)
+    return round(len(replies) * runs / elapsed)
+
+
+def bench_encode(min_time: float) -> float:
+    ids = list(range(1, 255))
+
+    def run():
+        for device_id in ids:
+            build_frame(device_id, '1')
+            build_status_query(device_id)
+
+    runs, elapsed = _timed(run, min_time)
+    return round(len(ids) * 2 * runs / elapsed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='FrameDecoder / build_frame micro-benchmark')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--min-time', type=float, default=0.5, help='측정 항목별 최소 실행 시간 (초)')
+    parser.add_argument('--capture', action='append', default=[], help='수신 캡처 파일 (raw 바이너리)')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='baseline 대비 허용 하락 비율')
+    parser.add_argument('--save-baseline', help='이번 결과를 저장할 경로')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stream = bytearray()
+    for _ in range(200):
+        data, _ = generate_stream(rng, items=50)
+        stream += data
+    stream = bytes(stream)
+
+    # 기록된 스트림: corpus 케이스의 실제 read 경계 + 캡처 파일
+    recorded = []
+    for case in load_corpus():
+        recorded.extend(bytes.fromhex(c) for c in case['chunks'])
+    recorded = recorded * 50
+    for path in args.capture:
+        with open(path, 'rb') as f:
+            recorded.extend(split_chunks(rng, f.read(), max_chunk=64))
+
+    synthetic = bench_decode(split_chunks(rng, stream, max_chunk=64), args.min_time)
+    bytewise = bench_decode([stream[i:i + 1] for i in range(min(len(stream), 20000))], args.min_time)
+    replay = bench_decode(recorded, args.min_time)
+
+    results = {
+        'decode_synthetic_mb_s': synthetic['mb_s'],
+        'decode_synthetic_frames_s': synthetic['frames_s'],
+        'decode_bytewise_mb_s': bytewise['mb_s'],
+        'decode_recorded_mb_s': replay['mb_s'],
+        'decode_recorded_frames_s': replay['frames_s'],
+        'parse_reply_per_s': bench_parse_reply(args.min_time),
+        'encode_frames_per_s': bench_encode(args.min_time),
+    }
+
+    failures = []
+    for key, target in TARGETS.items():
+        if results[key] < target:
+            failures.append(f'{key}: {results[key]} < 목표 {target}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        for key, before in baseline.items():
+            if key in results and results[key] < before * (1 - args.tolerance):
+                failures.append(f'{key}: {results[key]} < baseline {before} (-{args.tolerance:.0%})')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, indent=2)
+
+    for failure in failures:
+        print(f"[BENCH] 성능 저하: {failure}", file=sys.stderr)
+
+    print(json.dumps({'results': results, 'targets': TARGETS, 'passed': not failures}))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
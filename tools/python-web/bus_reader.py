@@ -0,0 +1,197 @@
+"""
+Bus Reader Module
+포트별 상시 수신 스레드
+- 수신 라인을 계속 읽어 FrameDecoder에 공급 (purge 없음)
+- 응답 프레임은 해당 장치의 대기 요청으로 전달
+- 요청 없이 들어온 프레임(손으로 문 열림 등)은 이벤트 채널로 전달
+"""
+import collections
+import queue
+import threading
+import time
+from typing import Optional
+
+from frame_codec import FrameDecoder, StatusFrame
+
+
+class PendingReply:
+    """응답을 기다리는 요청 1건"""
+
+    def __init__(self, device_id: Optional[int]):
+        self.device_id = device_id
+        self.frame = None
+        self.resolved_at = None     # 응답 도착 시각 (time.monotonic)
+        self.resolved_ns = None     # 응답 프레임 완성 시각 (time.monotonic_ns)
+        self.first_byte_ns = None   # 응답 첫 바이트 수신 시각 (time.monotonic_ns)
+        self._event = threading.Event()
+
+    def resolve(self, frame: StatusFrame, first_byte_ns: Optional[int] = None):
+        self.frame = frame
+        self.resolved_ns = time.monotonic_ns()
+        self.resolved_at = self.resolved_ns / 1e9
+        self.first_byte_ns = first_byte_ns or self.resolved_ns
+        self._event.set()
+
+    def wait(self, timeout: float) -> Optional[StatusFrame]:
+        self._event.wait(timeout)
+        return self.frame
+
+
+class BusReader:
+    def __init__(self, controller, event_queue_size: int = 256, history_size: int = 100):
+        """
+        Args:
+            controller: 저수준 _read_chunk()를 제공하는 DoorLockController
+            event_queue_size: 구독자별 이벤트 큐 크기 (가득 차면 오래된 이벤트부터 버림)
+            history_size: 최근 이벤트 보관 개수
+        """
+        self.controller = controller
+        self.decoder = FrameDecoder()
+        self._event_queue_size = event_queue_size
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()  # device_id -> PendingReply
+        self._subscribers = []
+        self._recent = collections.deque(maxlen=history_size)
+        self._seq = 0
+        self._frame_start_ns = None  # 디코더 버퍼가 비어 있을 때 들어온 첫 바이트 시각
+        self._running = False
+        self._thread = None
+        self.stats = {
+            'bytes': 0,
+            'replies': 0,
+            'unsolicited': 0,
+            'dropped_events': 0,
+            'read_errors': 0,
+        }
+
+    # --- 스레드 수명 ---
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f'bus-reader-{self.controller.port}', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.controller.timeout + 1)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _run(self):
+        while self._running:
+            try:
+                chunk = self.controller._read_chunk()
+            except Exception as e:
+                self.stats['read_errors'] += 1
+                print(f"[READER] 수신 실패: {e}")
+                time.sleep(0.1)
+                continue
+            if not chunk:
+                continue
+            if not self.decoder.buffered:
+                self._frame_start_ns = time.monotonic_ns()
+            self.stats['bytes'] += len(chunk)
+            for frame in self.decoder.feed(chunk):
+                self._dispatch(frame)
+                # 같은 chunk에 이어진 프레임은 이 시각부터 시작한 것으로 봄
+                self._frame_start_ns = time.monotonic_ns()
+
+    # --- 응답 대기 ---
+
+    def expect(self, device_id: Optional[int]) -> PendingReply:
+        """전송 직전에 호출: 해당 장치의 응답 대기 등록"""
+        pending = PendingReply(device_id)
+        with self._lock:
+            self._pending[device_id] = pending
+        return pending
+
+    def cancel(self, pending: PendingReply):
+        """응답 대기 해제 (타임아웃 등)"""
+        with self._lock:
+            if self._pending.get(pending.device_id) is pending:
+                del self._pending[pending.device_id]
+
+    def _dispatch(self, frame: StatusFrame):
+        with self._lock:
+            pending = None
+            if frame.device_id is not None:
+                pending = self._pending.pop(frame.device_id, None)
+            elif self._pending:
+                # SOH 프레임은 장치 ID가 없음 → 가장 먼저 등록된 대기 요청으로 전달
+                _, pending = self._pending.popitem(last=False)
+
+        if pending is not None:
+            self.stats['replies'] += 1
+            pending.resolve(frame, self._frame_start_ns)
+        else:
+            self.stats['unsolicited'] += 1
+            self._publish(frame)
+
+    # --- 이벤트 채널 ---
+
+    def subscribe(self) -> queue.Queue:
+        """요청 없이 수신된 프레임을 받을 큐 등록"""
+        q = queue.Queue(maxsize=self._event_queue_size)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def recent_events(self, since: int = 0) -> list:
+        """since 이후의 최근 이벤트 목록"""
+        with self._lock:
+            return [e for e in self._recent if e['seq'] > since]
+
+    def _publish(self, frame: StatusFrame):
+        with self._lock:
+            self._seq += 1
+            event = {
+                'seq': self._seq,
+                'port': self.controller.port,
+                'device_id': frame.device_id,
+                'status_code': frame.status_code,
+                'raw_data': frame.raw.hex(),
+                'time': time.time(),
+            }
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+
+        print(f"[READER] 수신 이벤트: {frame.raw.hex()} (device={frame.device_id})")
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(event)
+                    break
+                except queue.Full:
+                    # 느린 구독자: 가장 오래된 이벤트를 버리고 재시도
+                    try:
+                        q.get_nowait()
+                        self.stats['dropped_events'] += 1
+                    except queue.Empty:
+                        pass
+
+    def snapshot(self) -> dict:
+        """수신 통계"""
+        with self._lock:
+            pending = len(self._pending)
+            subscribers = len(self._subscribers)
+        return dict(
+            self.stats,
+            frames=self.decoder.frames,
+            discarded_bytes=self.decoder.discarded_bytes,
+            pending=pending,
+            subscribers=subscribers,
+            running=self._running,
+        )
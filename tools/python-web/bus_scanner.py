@@ -0,0 +1,184 @@
+"""
+Bus Scanner Module
+버스의 장치 ID(1~254)를 상태 조회로 탐색하고 포트별 장치 맵을 저장하는 모듈
+- 응답 지연을 관측해 ID별 대기 시간을 줄임 (adaptive early-out)
+- 응답에 장치 ID가 실리는 기기는 여러 ID를 연달아 조회 (pipelining)
+- 증분 스캔: 처음 보는 ID와 응답이 끊긴 ID만 다시 조회
+  (+ 응답 없던 ID 일부를 순환 조회해 새로 설치된 장치도 결국 발견)
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Callable, ContextManager, Iterable, List, Optional
+
+ALL_DEVICE_IDS = range(1, 255)
+
+PRESENT = 'present'   # 응답함
+MISSING = 'missing'   # 응답하던 장치가 최근 응답 없음
+ABSENT = 'absent'     # 스캔 시 응답 없음
+
+
+class DeviceMapStore:
+    """포트별 장치 맵 (JSON 파일에 저장)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._maps = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._maps = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"장치 맵 로드 실패: {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._maps, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, port: str) -> dict:
+        """포트 장치 맵 복사본: {'devices': {'1': 'present', ...}, 'turnaround_ms', 'id_in_reply', 'updated_at'}"""
+        with self._lock:
+            entry = self._maps.get(port, {})
+            return dict(entry, devices=dict(entry.get('devices', {})))
+
+    def device_ids(self, port: str, state: str = PRESENT) -> List[int]:
+        with self._lock:
+            devices = self._maps.get(port, {}).get('devices', {})
+            return sorted(int(d) for d, s in devices.items() if s == state)
+
+    def update(self, port: str, states: dict, **fields):
+        """스캔 결과 반영: states = {device_id: PRESENT/ABSENT}"""
+        with self._lock:
+            entry = self._maps.setdefault(port, {'devices': {}})
+            for device_id, state in states.items():
+                entry['devices'][str(device_id)] = state
+            entry.update(fields)
+            entry['updated_at'] = time.time()
+            self._save()
+
+    def mark(self, port: str, device_id: int, responded: bool):
+        """일반 조회 결과 반영 (상태가 바뀔 때만 저장)"""
+        with self._lock:
+            entry = self._maps.get(port)
+            if entry is None:
+                return
+            devices = entry['devices']
+            key = str(device_id)
+            current = devices.get(key)
+            if responded:
+                new = PRESENT
+            elif current == PRESENT:
+                new = MISSING
+            else:
+                return
+            if current != new:
+                devices[key] = new
+                self._save()
+
+
+class BusScanner:
+    def __init__(self, store: DeviceMapStore, min_wait: float = 0.03, initial_wait: float = 0.15,
+                 factor: float = 3.0, window: int = 8, absent_sweep: int = 16):
+        """
+        Args:
+            store: 장치 맵 저장소
+            min_wait: ID별 최소 응답 대기 시간 (초)
+            initial_wait: 응답 지연을 아직 모를 때의 대기 시간 (초)
+            factor: 관측된 최대 응답 지연 대비 대기 배수
+            window: 응답에 ID가 실리는 기기에서 연달아 보낼 조회 수
+            absent_sweep: 증분 스캔마다 다시 확인할 ABSENT ID 수
+        """
+        self.store = store
+        self.min_wait = min_wait
+        self.initial_wait = initial_wait
+        self.factor = factor
+        self.window = window
+        self.absent_sweep = absent_sweep
+        self._lock = threading.Lock()
+        self._port_locks = {}  # port -> Lock (포트당 스캔 1개, 다른 포트는 동시에 스캔)
+
+    def _port_lock(self, port: str) -> threading.Lock:
+        with self._lock:
+            return self._port_locks.setdefault(port, threading.Lock())
+
+    def _wait_for(self, ctrl, turnaround: Optional[float]) -> float:
+        if turnaround is None:
+            return min(float(ctrl.timeout), self.initial_wait)
+        return min(float(ctrl.timeout), max(self.min_wait, turnaround * self.factor))
+
+    def scan(self, ctrl, device_ids: Iterable[int] = ALL_DEVICE_IDS, incremental: bool = False,
+             slot: Optional[Callable[[], ContextManager]] = None) -> dict:
+        """
+        장치 ID 스캔
+
+        Args:
+            ctrl: DoorLockController
+            device_ids: 스캔 범위
+            incremental: True면 처음 보는 ID, MISSING ID, ABSENT ID 일부(absent_sweep개)만 조회
+            slot: 조회 묶음마다 버스를 잡는 구간 (다른 요청과 번갈아 사용, 기본: 바로 조회)
+
+        Returns:
+            {'port', 'mode', 'probed', 'present', 'found', 'lost', 'wait_ms', 'pipelined', 'elapsed_ms'}
+        """
+        with self._port_lock(ctrl.port):
+            started = time.monotonic()
+            previous = self.store.get(ctrl.port)
+            known = previous.get('devices', {})
+            ids = list(device_ids)
+            fields = {}
+            if incremental:
+                absent = [d for d in ids if known.get(str(d)) == ABSENT]
+                cursor = previous.get('absent_cursor', 0)
+                sweep = [d for d in absent if d > cursor][:self.absent_sweep]
+                if len(sweep) < self.absent_sweep:
+                    sweep += [d for d in absent if d <= cursor][:self.absent_sweep - len(sweep)]
+                if sweep:
+                    fields['absent_cursor'] = sweep[-1]
+                ids = [d for d in ids if known.get(str(d)) in (None, MISSING) or d in sweep]
+
+            turnaround_ms = previous.get('turnaround_ms')
+            turnaround = turnaround_ms / 1000 if turnaround_ms else None
+            id_in_reply = previous.get('id_in_reply', False)
+
+            states = {}
+            i = 0
+            while i < len(ids):
+                # 응답에 장치 ID가 있어야 여러 ID를 동시에 대기할 수 있음
+                batch = self.window if id_in_reply else 1
+                chunk = ids[i:i + batch]
+                i += batch
+                wait = self._wait_for(ctrl, turnaround)
+                with (slot or contextlib.nullcontext)():
+                    replies = ctrl.probe_status(chunk, wait, window=batch)
+                for device_id in chunk:
+                    states[device_id] = PRESENT if device_id in replies else ABSENT
+                for frame, latency in replies.values():
+                    turnaround = latency if turnaround is None else max(turnaround * 0.9, latency)
+                    if frame.device_id is not None:
+                        id_in_reply = True
+
+            fields['id_in_reply'] = id_in_reply
+            if turnaround is not None:
+                fields['turnaround_ms'] = round(turnaround * 1000, 1)
+            self.store.update(ctrl.port, states, **fields)
+
+            present = self.store.device_ids(ctrl.port, PRESENT)
+            report = {
+                'port': ctrl.port,
+                'mode': 'incremental' if incremental else 'full',
+                'probed': len(ids),
+                'present': present,
+                'found': sorted(d for d, s in states.items() if s == PRESENT and known.get(str(d)) != PRESENT),
+                'lost': sorted(d for d, s in states.items() if s == ABSENT and known.get(str(d)) in (PRESENT, MISSING)),
+                'wait_ms': round(self._wait_for(ctrl, turnaround) * 1000, 1),
+                'pipelined': id_in_reply,
+                'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+            }
+            print(f"[SCAN] {ctrl.port} {report['mode']}: {len(ids)}개 조회, 응답 {present} ({report['elapsed_ms']}ms)")
+            return report
@@ -0,0 +1,234 @@
+"""
+Capacity Planner Module
+RS-485 버스 1개에 장치를 몇 대까지 둘 수 있는지 계산하는 모듈
+- 선로 시간: 명령 8바이트 + 응답 5~7바이트 (8N1, frame_codec.wire_time)
+- 장치 턴어라운드(전송 완료 ~ 응답 첫 바이트)와 응답 누락률은 실제/가상 버스 관측값 사용 (LineTimings)
+- 측정된 버스 처리 시간(ServiceTimes)이 선로 + 턴어라운드보다 길면 그 차이를 처리 오버헤드로 반영
+- 열기/조회 비율, 장치 수, 장치당 요청률로 사용률, 여유, 최대 처리량, 평균 대기(M/G/1) 계산
+
+사용법:
+    python capacity_planner.py --devices 16 --rate 0.2 --open-ratio 0.3
+    python capacity_planner.py --measure "sim://plan?devices=1-8&turnaround=0.03" --samples 100
+    python capacity_planner.py --measure /dev/ttyUSB0 --device-ids 1-4 --slo-ms 500
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import simulated_bus
+from door_lock_controller import DoorLockController
+from frame_codec import COMMAND_FRAME_LEN, MARKER_FRAME_LEN, wire_time
+from line_timing import COMMAND, QUERY, LineTimings
+
+# 관측 전 기본 턴어라운드 (초)
+DEFAULT_TURNAROUND = 0.02
+# 상시 수신 없이 보내는 경로(pyserial)의 전송 후 고정 대기 (초)
+FIXED_REPLY_WAIT = 0.15
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def operation_time(kind: str, baudrate: int = 9600, stats: Optional[dict] = None,
+                   service_time: Optional[float] = None, reply_timeout: float = 1.0,
+                   reader: bool = True, append_cr: bool = False) -> dict:
+    """
+    명령 1건이 버스를 점유하는 시간
+
+    Args:
+        kind: COMMAND / QUERY
+        stats: LineTimings.stats(kind) (없거나 샘플이 없으면 기본 턴어라운드)
+        service_time: 측정된 버스 처리 시간 평균 (초) - 모델보다 길면 차이를 오버헤드로
+        reply_timeout: 조회 응답 대기 시간 (초, 응답 누락 시 점유)
+        reader: 상시 수신 경로 여부 (아니면 전송 후 고정 대기 + purge)
+    """
+    stats = stats or {}
+    tx_bytes = COMMAND_FRAME_LEN + (1 if append_cr else 0)
+    rx_bytes = stats.get('rx_bytes') or MARKER_FRAME_LEN
+    measured = bool(stats.get('samples'))
+    turnaround = stats['turnaround_p50'] if measured else DEFAULT_TURNAROUND
+    miss_rate = stats.get('miss_rate') or 0.0
+
+    tx = wire_time(tx_bytes, baudrate)
+    rx = wire_time(rx_bytes, baudrate)
+    if reader:
+        replied = tx + turnaround + rx
+        # 상시 수신: 명령은 응답 대기 창(0.15초), 조회는 장치 응답 대기 시간까지 점유
+        missed = tx + (FIXED_REPLY_WAIT if kind == COMMAND else reply_timeout)
+    else:
+        replied = missed = tx + FIXED_REPLY_WAIT
+    modeled = (1 - miss_rate) * replied + miss_rate * missed
+    overhead = max(0.0, service_time - modeled) if service_time is not None else 0.0
+    return {
+        'tx_bytes': tx_bytes,
+        'rx_bytes': rx_bytes,
+        'wire_ms': _ms(tx + rx),
+        'turnaround_ms': _ms(turnaround),
+        'turnaround_source': 'measured' if measured else 'default',
+        'miss_rate': round(miss_rate, 4),
+        'modeled_ms': _ms(modeled),
+        'measured_ms': _ms(service_time),
+        'overhead_ms': _ms(overhead),
+        'bus_ms': _ms(modeled + overhead),
+        '_seconds': modeled + overhead,
+    }
+
+
+def plan(baudrate: int = 9600, devices: int = 1, rate: float = 0.1, open_ratio: float = 0.2,
+         target_utilisation: float = 0.7, slo_ms: Optional[float] = None,
+         timings: Optional[LineTimings] = None, service_times: Optional[Dict[str, float]] = None,
+         reply_timeout: float = 1.0, reader: bool = True, append_cr: bool = False,
+         background: float = 0.0) -> dict:
+    """
+    버스 1개 용량 계산
+
+    Args:
+        devices: 버스의 장치 수
+        rate: 장치당 초당 요청 수 (열기/닫기 + 상태 조회)
+        open_ratio: 요청 중 열기/닫기 비율 (나머지는 상태 조회)
+        target_utilisation: 이 사용률까지만 장치를 추가 (대기 시간 급증 전)
+        slo_ms: 평균 응답 시간 목표 (대기 + 처리, 밀리초)
+        timings: 관측된 턴어라운드/누락
+        service_times: {kind: 측정된 버스 처리 시간 초}
+        background: 요청과 별도로 쓰이는 버스 사용률 (상태 폴링 등, 같은 처리 시간 분포로 가정)
+    """
+    if not 0 <= open_ratio <= 1:
+        raise ValueError('open_ratio는 0~1 사이여야 합니다')
+    service_times = service_times or {}
+    ops = {}
+    for kind in (COMMAND, QUERY):
+        ops[kind] = operation_time(
+            kind, baudrate, timings.stats(kind) if timings else None, service_times.get(kind),
+            reply_timeout=reply_timeout, reader=reader, append_cr=append_cr,
+        )
+    command_s = ops[COMMAND].pop('_seconds')
+    query_s = ops[QUERY].pop('_seconds')
+    mean = open_ratio * command_s + (1 - open_ratio) * query_s
+    second_moment = open_ratio * command_s ** 2 + (1 - open_ratio) * query_s ** 2
+
+    demand = devices * rate
+    # 배경 사용률을 같은 분포의 요청으로 환산해 대기 계산에 포함
+    background_ops = background / mean
+    utilisation = demand * mean + background
+    result = {
+        'baudrate': baudrate,
+        'devices': devices,
+        'rate_per_device': rate,
+        'open_ratio': open_ratio,
+        'operations': ops,
+        'mean_bus_ms': _ms(mean),
+        'max_ops_s': round(1 / mean, 2),
+        'demand_ops_s': round(demand, 3),
+        'background_utilisation': round(background, 4),
+        'utilisation': round(utilisation, 4),
+        'headroom': round(1 - utilisation, 4),
+        'target_utilisation': target_utilisation,
+    }
+    max_ops = max(0.0, (target_utilisation - background) / mean)
+    result['max_ops_s_at_target'] = round(max_ops, 2)
+    result['max_devices_at_target'] = math.floor(max_ops / rate) if rate > 0 else None
+
+    # M/G/1 (Pollaczek-Khinchine): 평균 대기 = λ·E[S²] / (2(1-ρ))
+    if utilisation < 1:
+        wait = (demand + background_ops) * second_moment / (2 * (1 - utilisation))
+        result['mean_wait_ms'] = _ms(wait)
+        result['mean_latency_ms'] = _ms(wait + mean)
+    else:
+        result['mean_wait_ms'] = None
+        result['mean_latency_ms'] = None
+
+    if slo_ms is not None:
+        # 평균 대기 + 처리 ≤ slo 를 만족하는 최대 도착률 λ
+        slack = slo_ms / 1000 - mean
+        if slack > 0:
+            max_ops = max(0.0, 2 * slack / (second_moment + 2 * slack * mean) - background_ops)
+            result['slo_ms'] = slo_ms
+            result['max_ops_s_for_slo'] = round(max_ops, 2)
+            result['max_devices_for_slo'] = math.floor(max_ops / rate) if rate > 0 else None
+        else:
+            result['slo_ms'] = slo_ms
+            result['max_ops_s_for_slo'] = 0.0
+            result['max_devices_for_slo'] = 0
+    return result
+
+
+def measure(port: str, device_ids, samples: int, commands: bool = False, baudrate: int = 9600,
+            timeout: float = 1.0):
+    """
+    포트에 상태 조회(commands면 열기 후 닫기도)를 보내 턴어라운드와 처리 시간 측정
+
+    Returns:
+        (LineTimings, {kind: 평균 처리 시간 초})
+    """
+    ctrl = DoorLockController(port=port, baudrate=baudrate, timeout=timeout, background_reader=True)
+    if not ctrl.connect():
+        raise OSError(f'포트 연결 실패: {port}')
+    totals = {COMMAND: [], QUERY: []}
+    try:
+        for i in range(samples):
+            device_id = device_ids[i % len(device_ids)]
+            started = time.monotonic()
+            ctrl.query_status(device_id)
+            totals[QUERY].append(time.monotonic() - started)
+            if commands:
+                for action in (ctrl.open_lock, ctrl.close_lock):
+                    started = time.monotonic()
+                    action(device_id)
+                    totals[COMMAND].append(time.monotonic() - started)
+    finally:
+        ctrl.disconnect()
+    service_times = {kind: sum(values) / len(values) for kind, values in totals.items() if values}
+    return ctrl.line_timings, service_times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='RS-485 bus capacity planner')
+    parser.add_argument('--baudrate', type=int, default=9600)
+    parser.add_argument('--devices', type=int, default=16, help='버스의 장치 수')
+    parser.add_argument('--rate', type=float, default=0.1, help='장치당 초당 요청 수')
+    parser.add_argument('--open-ratio', type=float, default=0.2, help='요청 중 열기/닫기 비율')
+    parser.add_argument('--target', type=float, default=0.7, help='목표 최대 사용률')
+    parser.add_argument('--slo-ms', type=float, help='평균 응답 시간 목표 (밀리초)')
+    parser.add_argument('--timeout', type=float, default=1.0, help='조회 응답 대기 시간 (초)')
+    parser.add_argument('--measure', help='턴어라운드를 측정할 포트 (sim://... 가능)')
+    parser.add_argument('--device-ids', default='1', help='측정에 쓸 장치 ID (예: 1-8, sim://은 URL의 devices)')
+    parser.add_argument('--samples', type=int, default=50, help='측정 조회 횟수')
+    parser.add_argument('--commands', action='store_true', help='측정 시 열기/닫기도 전송 (실제 잠금장치 주의)')
+    args = parser.parse_args()
+
+    timings, service_times = None, None
+    if args.measure:
+        ids = args.device_ids
+        if simulated_bus.is_sim_port(args.measure) and ids == '1':
+            ids = parse_qs(urlsplit(args.measure).query).get('devices', ['1'])[-1]
+        stdout = sys.stdout
+        sys.stdout = sys.stderr  # 명령별 로그는 stderr로
+        try:
+            timings, service_times = measure(args.measure, simulated_bus.parse_ids(ids), args.samples,
+                                             commands=args.commands, baudrate=args.baudrate,
+                                             timeout=args.timeout)
+        finally:
+            sys.stdout = stdout
+
+    result = plan(
+        baudrate=args.baudrate, devices=args.devices, rate=args.rate, open_ratio=args.open_ratio,
+        target_utilisation=args.target, slo_ms=args.slo_ms, timings=timings,
+        service_times=service_times, reply_timeout=args.timeout,
+    )
+    if timings is not None:
+        result['measured'] = timings.snapshot()
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
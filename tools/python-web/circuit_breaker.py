@@ -0,0 +1,154 @@
+"""
+Circuit Breaker Module
+응답 없는 장치를 버스에서 잠시 빼는 (port, device)별 차단기
+- 연속 응답 없음/파싱 실패가 threshold회면 차단 (OPEN): 이후 요청은 버스를 쓰지 않고 즉시 실패
+- 확인 시각이 되면 반개방 (HALF_OPEN): 상태 조회 1건만 보내 확인 - 성공하면 해제, 실패하면 대기 시간 factor배
+- 고장 난 장치 1대가 timeout초씩 버스를 점유해 같은 포트의 다른 장치까지 느려지는 것을 방지
+"""
+import threading
+from typing import Dict, List, Optional
+
+from admission import DeadlineExceeded
+from clock import REAL_CLOCK
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 확인 결과가 이 시간 안에 반영되지 않으면 (전송 중 포트 오류 등) 다시 확인 허용
+PROBE_TIMEOUT = 30.0
+
+
+class CircuitOpen(DeadlineExceeded):
+    """차단 중인 장치 - DeadlineExceeded처럼 503 + Retry-After(estimated초)로 응답"""
+
+
+class _Breaker:
+    __slots__ = ('state', 'failures', 'delay', 'next_probe', 'opened_at', 'trips')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0       # 연속 실패 수
+        self.delay = 0.0        # 현재 확인 간격 (초)
+        self.next_probe = 0.0   # 다음 확인 가능 시각 (clock.monotonic)
+        self.opened_at = None   # 차단 시작 시각 (clock.time)
+        self.trips = 0
+
+
+class DeviceBreakers:
+    def __init__(self, threshold: int = 3, base_delay: float = 5.0, max_delay: float = 300.0,
+                 factor: float = 2.0, clock=None):
+        """
+        Args:
+            threshold: 차단까지 연속 실패 횟수
+            base_delay: 차단 후 첫 확인까지 대기 (초)
+            max_delay: 확인 간격 최대값 (초)
+            factor: 확인 실패 시 간격 증가 배수
+            clock: 시계 (기본: 실제 시간)
+        """
+        self.clock = clock or REAL_CLOCK
+        self.threshold = max(1, threshold)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self._lock = threading.Lock()
+        self._breakers = {}  # (port, device_id) -> _Breaker (실패가 있었던 장치만)
+        self.rejected = 0
+        self.probes = 0
+        self.recovered = 0
+
+    def allow(self, port: str, device_id: int) -> bool:
+        """
+        전송 전 확인 - 보내도 되면 반환값은 확인(probe) 전송 여부
+
+        Raises:
+            CircuitOpen: 차단 중 (확인 시각 전이거나 다른 확인이 진행 중)
+        """
+        with self._lock:
+            breaker = self._breakers.get((port, device_id))
+            if breaker is None or breaker.state == CLOSED:
+                return False
+            now = self.clock.monotonic()
+            if now >= breaker.next_probe:
+                breaker.state = HALF_OPEN
+                breaker.next_probe = now + PROBE_TIMEOUT
+                self.probes += 1
+                return True
+            self.rejected += 1
+            retry_after = breaker.next_probe - now if breaker.state == OPEN else 1.0
+        raise CircuitOpen(f'장치 {device_id} 응답 없음 - 잠시 후 다시 시도하세요.', retry_after)
+
+    def record(self, port: str, device_id: int, success: bool):
+        """전송 결과 반영 (success: 상태 프레임 응답 수신)"""
+        key = (port, device_id)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if success:
+                if breaker is not None:
+                    if breaker.state != CLOSED:
+                        self.recovered += 1
+                        print(f"[BREAKER] 복구: {port} 장치 {device_id}")
+                    # 정상 장치는 항목을 남기지 않음
+                    del self._breakers[key]
+                return
+            if breaker is None:
+                breaker = self._breakers[key] = _Breaker()
+            breaker.failures += 1
+            if breaker.state == HALF_OPEN:
+                breaker.delay = min(self.max_delay, breaker.delay * self.factor)
+            elif breaker.state == CLOSED and breaker.failures >= self.threshold:
+                breaker.delay = self.base_delay
+                breaker.opened_at = self.clock.time()
+                breaker.trips += 1
+            else:
+                return
+            breaker.state = OPEN
+            breaker.next_probe = self.clock.monotonic() + breaker.delay
+        print(f"[BREAKER] 차단: {port} 장치 {device_id} (연속 실패 {breaker.failures}회, "
+              f"{breaker.delay:g}초 후 확인)")
+
+    def reset(self, port: Optional[str] = None, device_id: Optional[int] = None) -> int:
+        """차단 해제 (수리 후 등) - 해제한 수"""
+        with self._lock:
+            keys = [k for k in self._breakers
+                    if (port is None or k[0] == port) and (device_id is None or k[1] == device_id)]
+            for key in keys:
+                del self._breakers[key]
+        return len(keys)
+
+    def state(self, port: str, device_id: int) -> str:
+        with self._lock:
+            breaker = self._breakers.get((port, device_id))
+            return breaker.state if breaker else CLOSED
+
+    def states(self, port: Optional[str] = None) -> List[dict]:
+        """실패 기록이 있는 장치 목록"""
+        now = self.clock.monotonic()
+        with self._lock:
+            items = [(k, b) for k, b in self._breakers.items() if port is None or k[0] == port]
+            return [
+                {
+                    'port': p,
+                    'device_id': d,
+                    'state': b.state,
+                    'failures': b.failures,
+                    'opened_at': b.opened_at,
+                    'probe_in': round(max(0.0, b.next_probe - now), 1) if b.state == OPEN else None,
+                    'trips': b.trips,
+                }
+                for (p, d), b in sorted(items, key=lambda item: item[0])
+            ]
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+            for breaker in self._breakers.values():
+                counts[breaker.state] += 1
+        return {
+            'open': counts[OPEN],
+            'half_open': counts[HALF_OPEN],
+            'failing': counts[CLOSED],
+            'rejected': self.rejected,
+            'probes': self.probes,
+            'recovered': self.recovered,
+        }
@@ -0,0 +1,297 @@
+"""
+Clock Module
+시간 / 대기 / 스레드를 주입할 수 있게 하는 시계
+- Clock: 실제 시간 (time.monotonic, time.sleep, threading) - 기본값
+- VirtualClock: 가상 시간 - 대기하는 동안 시간이 흐르지 않고 다음 깨울 시각으로 바로 이동
+  - spawn한 스레드(actor)는 한 번에 하나만 실행되고 실행 순서는 (깨울 시각, 등록 순서)로 정해짐
+  - 같은 입력이면 실행 순서가 항상 같음 → 하루치 트래픽 시험을 몇 초 만에, 같은 결과로 재현
+- 가상 시간에서 sleep/wait 동안 잡고 있는 락은 rlock()으로 만들어야 함 (threading 락을 잡은 채 대기하면 교착)
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+
+class ClockClosed(BaseException):
+    """닫힌 가상 시계에서 대기 중이던 actor 종료용 (except Exception에 잡히지 않음)"""
+
+
+class Clock:
+    """실제 시간"""
+    virtual = False
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float]) -> bool:
+        """cond 보유 상태에서 notify 또는 timeout까지 대기"""
+        return cond.wait(timeout)
+
+    def notify(self, cond: threading.Condition):
+        """cond 보유 상태에서 대기 중인 스레드 모두 깨움"""
+        cond.notify_all()
+
+    def rlock(self):
+        return threading.RLock()
+
+    def spawn(self, target: Callable, *args, name: Optional[str] = None) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        return thread
+
+
+REAL_CLOCK = Clock()
+
+
+class _Actor:
+    __slots__ = ('name', 'thread', 'sem', 'token', 'blocked', 'done')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.thread = None
+        self.sem = threading.Semaphore(0)  # 실행 차례
+        self.token = 0       # 대기할 때마다 증가 - 지난 깨우기 항목 무시용
+        self.blocked = True
+        self.done = False
+
+
+class _VirtualRLock:
+    """가상 시계용 재진입 락 - 다른 actor가 잡고 있으면 가상 시간으로 대기"""
+
+    def __init__(self, clock: 'VirtualClock'):
+        self._clock = clock
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = None
+        self._count = 0
+
+    def acquire(self) -> bool:
+        me = threading.get_ident()
+        with self._cond:
+            while self._owner is not None and self._owner != me:
+                self._clock.wait(self._cond, None)
+            self._owner = me
+            self._count += 1
+        return True
+
+    def release(self):
+        with self._cond:
+            if self._owner != threading.get_ident():
+                raise RuntimeError('보유하지 않은 락 해제')
+            self._count -= 1
+            if self._count == 0:
+                self._owner = None
+                self._clock.notify(self._cond)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class VirtualClock(Clock):
+    """
+    가상 시간 (한 스레드에서 run_for/run_until로 진행)
+    - 대기하는 쪽이 다음 항목을 꺼내 시각을 옮기고 그 actor에게 바로 차례를 넘김 (자기 차례면 그대로 계속)
+    - actor는 sleep/wait/lock 대기에서만 차례를 넘김 - 그 사이에는 다른 actor가 실행되지 않음
+    """
+    virtual = True
+
+    def __init__(self, start: float = 0.0, epoch: float = 1_700_000_000.0):
+        """
+        Args:
+            start: 시작 monotonic 값 (초)
+            epoch: 시작 시점의 time() 값 (벽시계 시각)
+        """
+        self._now = start
+        self._offset = epoch - start
+        self._lock = threading.Lock()
+        self._heap = []      # (시각, 순번, actor, token, 콜백, 인자)
+        self._seq = itertools.count()
+        self._local = threading.local()
+        self._waiters = {}   # Condition -> [(actor, token)]
+        self._driver = _Actor('driver')
+        self._actors = []
+        self._closed = False
+        self._stalled = False  # 깨울 항목 없이 driver로 돌아옴
+        self.errors = []     # actor에서 발생한 예외
+        self.switches = 0
+        self.callbacks = 0
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def time(self) -> float:
+        return self._offset + self._now
+
+    # --- 예약 ---
+
+    def _push(self, at: float, actor: Optional[_Actor], fn: Optional[Callable] = None, args=()):
+        """self._lock 보유 상태"""
+        token = actor.token if actor is not None else 0
+        heapq.heappush(self._heap, (max(at, self._now), next(self._seq), actor, token, fn, args))
+
+    def call_at(self, at: float, fn: Callable, *args):
+        """at 시각에 그때 차례인 스레드에서 fn 실행 (fn 안에서 sleep/wait 금지)"""
+        with self._lock:
+            self._push(at, None, fn, args)
+
+    def call_later(self, delay: float, fn: Callable, *args):
+        self.call_at(self._now + delay, fn, *args)
+
+    def spawn(self, target: Callable, *args, name: Optional[str] = None) -> threading.Thread:
+        """현재 시각부터 실행될 actor 등록 (실제 실행은 driver가 시간을 진행할 때)"""
+        actor = _Actor(name or f'actor-{len(self._actors)}')
+
+        def body():
+            self._local.actor = actor
+            actor.sem.acquire()
+            try:
+                if not self._closed:
+                    target(*args)
+            except ClockClosed:
+                pass
+            except BaseException as e:
+                print(f"[CLOCK] {actor.name} 오류: {e!r}")
+                self.errors.append(e)
+                with self._lock:
+                    # driver가 바로 오류를 보도록 깨움
+                    if self._driver.blocked:
+                        self._push(self._now, self._driver)
+            finally:
+                actor.done = True
+                actor.blocked = False
+                if not self._closed:
+                    self._dispatch(actor)
+
+        actor.thread = threading.Thread(target=body, name=actor.name, daemon=True)
+        with self._lock:
+            self._actors.append(actor)
+            self._push(self._now, actor)
+        actor.thread.start()
+        return actor.thread
+
+    # --- 대기 ---
+
+    def _current(self) -> _Actor:
+        return getattr(self._local, 'actor', None) or self._driver
+
+    def _block(self, me: _Actor, timeout: Optional[float], cond=None):
+        """대기 등록 후 차례를 넘기고 다시 차례가 올 때까지 대기"""
+        with self._lock:
+            if self._closed:
+                raise ClockClosed()
+            me.token += 1
+            me.blocked = True
+            if timeout is not None:
+                at = self._now + max(0.0, timeout)
+                if timeout > 0 and at == self._now:
+                    # 부동소수점 자릿수보다 작은 대기도 시간을 진행시킴 (제자리 반복 방지)
+                    at = math.nextafter(at, math.inf)
+                self._push(at, me)
+            if cond is not None:
+                self._waiters.setdefault(cond, []).append((me, me.token))
+        if self._dispatch(me):
+            me.sem.acquire()
+        if self._closed and me is not self._driver:
+            raise ClockClosed()
+        if me is self._driver:
+            if self.errors:
+                raise RuntimeError(f'가상 시계 actor 오류: {self.errors[0]!r}') from self.errors[0]
+            if self._stalled:
+                self._stalled = False
+                raise RuntimeError('가상 시계: 깨울 항목 없음 (교착)')
+
+    def _dispatch(self, me: _Actor) -> bool:
+        """
+        시각 순서대로 다음 항목 실행 - 차례를 다른 actor에게 넘겼으면 True
+        (me가 다음 차례면 False: 스레드 전환 없이 계속 실행)
+        """
+        while True:
+            with self._lock:
+                if not self._heap:
+                    # 모두 무기한 대기 - driver에게 알림
+                    driver = self._driver
+                    if me is driver:
+                        me.blocked = False
+                        self._stalled = True
+                        return False
+                    if not driver.blocked:
+                        return True
+                    driver.blocked = False
+                    self._stalled = True
+                    driver.sem.release()
+                    return True
+                at, _, actor, token, fn, args = heapq.heappop(self._heap)
+                if actor is not None and (not actor.blocked or actor.token != token or actor.done):
+                    continue  # 이미 다른 이유로 깨어남
+                if at > self._now:
+                    self._now = at
+                if actor is not None:
+                    actor.blocked = False
+                    if actor is me:
+                        return False
+                    self.switches += 1
+                    actor.sem.release()
+                    return True
+            fn(*args)
+            self.callbacks += 1
+
+    def sleep(self, seconds: float):
+        self._block(self._current(), max(0.0, seconds))
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float]) -> bool:
+        cond.release()
+        try:
+            self._block(self._current(), timeout, cond)
+        finally:
+            cond.acquire()
+        return True
+
+    def notify(self, cond: threading.Condition):
+        with self._lock:
+            for actor, token in self._waiters.pop(cond, ()):
+                if actor.blocked and actor.token == token:
+                    self._push(self._now, actor)
+
+    def rlock(self):
+        return _VirtualRLock(self)
+
+    # --- 진행 ---
+
+    def run_for(self, seconds: float):
+        """driver: seconds만큼 가상 시간 진행"""
+        self.sleep(seconds)
+
+    def run_until(self, at: float):
+        self.sleep(at - self._now)
+
+    def close(self, timeout: float = 5.0):
+        """대기 중인 actor 모두 종료 (ClockClosed로 풀어줌)"""
+        with self._lock:
+            self._closed = True
+            actors = [a for a in self._actors if not a.done]
+        for actor in actors:
+            actor.sem.release()
+        for actor in actors:
+            actor.thread.join(timeout)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'now': round(self._now, 6),
+                'pending': len(self._heap),
+                'actors': sum(1 for a in self._actors if not a.done),
+                'switches': self.switches,
+                'callbacks': self.callbacks,
+            }
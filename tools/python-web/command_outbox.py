@@ -0,0 +1,329 @@
+"""
+Command Outbox Module
+반드시 전달해야 하는 명령(예약 잠금 등)을 포트 장애 동안 보관했다가 포트가 돌아오면 다시 보내는 모듈
+- 추가 전용 로그 파일 (JSON 줄) - 여러 요청의 기록을 모아 fsync 1번으로 저장 (group commit)
+- (port, device)당 명령 1개: 새 명령이 들어오면 이전 명령은 대체됨
+- 항목마다 만료 시각 - 지난 명령은 보내지 않고 버림
+- 복구 스레드: 우선순위 → 만료 시각 순으로 재전송, 포트가 계속 안 되면 재시도 간격을 늘림
+- 장치 1대만 보낼 수 없는 경우(deliver가 DeadlineExceeded - 차단 중인 장치 등)는 그 명령만 미룸
+  (같은 포트의 다른 장치 명령은 그대로 전송)
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from admission import DeadlineExceeded
+
+# 우선순위 (작을수록 먼저 전송)
+PRIORITY_HIGH = 0     # 예약 잠금
+PRIORITY_NORMAL = 10
+
+ACTIONS = ('open', 'open5sec', 'close')
+
+
+class OutboxEntry(NamedTuple):
+    seq: int
+    port: str
+    device_id: int
+    action: str
+    priority: int
+    expires: float   # time.time
+    created: float
+
+    def to_dict(self) -> dict:
+        return dict(self._asdict(), op='put')
+
+
+class CommandOutbox:
+    def __init__(self, path: str, deliver: Callable[[OutboxEntry], bool],
+                 retry_base: float = 1.0, retry_max: float = 30.0):
+        """
+        Args:
+            path: 로그 파일 경로
+            deliver: 명령 전송 함수 - 포트 오류 등으로 못 보냈으면 False,
+                     그 장치만 지금 못 보내면 DeadlineExceeded (estimated초 뒤 그 명령만 재시도)
+            retry_base: 포트 재시도 첫 대기 시간 (초)
+            retry_max: 포트 재시도 최대 대기 시간 (초)
+        """
+        self.path = path
+        self.deliver = deliver
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._cond = threading.Condition()
+        self._entries = {}      # (port, device_id) -> OutboxEntry
+        self._buffer = []       # 아직 파일에 쓰지 않은 기록 (seq, line)
+        self._seq = 0
+        self._durable = 0       # fsync 완료된 마지막 seq
+        self._log_lines = 0
+        self._file = None
+        self._retry = {}        # port -> (다음 시도 시각(monotonic), 현재 대기 시간)
+        self._deferred = {}     # (port, device_id) -> (다음 시도 시각(monotonic), 항목 seq)
+        self._wakeup = threading.Event()
+        self._running = False
+        self._threads = []
+        self.stats = {
+            'queued': 0,
+            'delivered': 0,
+            'expired': 0,
+            'superseded': 0,
+            'fsyncs': 0,
+            'records': 0,
+            'write_errors': 0,
+        }
+        self._load()
+
+    # --- 로그 ---
+
+    def _load(self):
+        """로그 재생: 같은 장치는 마지막 명령만, 처리 완료(done) 기록은 제거"""
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 중 끊긴 마지막 줄
+                    key = (record['port'], int(record['device_id']))
+                    self._seq = max(self._seq, int(record['seq']))
+                    if record['op'] == 'put':
+                        record.pop('op')
+                        self._entries[key] = OutboxEntry(**record)
+                    else:
+                        entry = self._entries.get(key)
+                        if entry is not None and entry.seq == record['seq']:
+                            del self._entries[key]
+        self._durable = self._seq
+        if self._entries:
+            print(f"[OUTBOX] 미전송 명령 {len(self._entries)}건 복원")
+        self._compact()
+
+    def _compact(self):
+        """남은 명령만으로 로그 다시 쓰기"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self._file is not None:
+            self._file.close()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry.to_dict(), ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._log_lines = len(self._entries)
+
+    def _record(self, record: dict) -> int:
+        """기록 추가 (self._cond 보유 상태) - 기록 seq 반환"""
+        self._seq += 1
+        record['seq'] = record.get('seq') or self._seq
+        self._buffer.append((self._seq, json.dumps(record, ensure_ascii=False) + '\n'))
+        self._cond.notify_all()
+        return self._seq
+
+    def _wait_durable(self, seq: int):
+        """seq까지 fsync될 때까지 대기 (self._cond 보유 상태)"""
+        if not self._running:
+            self._flush_locked()
+            return
+        while self._durable < seq:
+            self._cond.wait()
+
+    def _flush_locked(self):
+        """writer 스레드 없이 바로 쓰기 (시작 전/종료 후)"""
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._committed(batch, self._write(batch))
+
+    def _write(self, batch: List[Tuple[int, str]]) -> bool:
+        try:
+            self._file.write(''.join(line for _, line in batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return True
+        except OSError as e:
+            print(f"[OUTBOX] 로그 기록 실패: {e}")
+            return False
+
+    def _committed(self, batch: List[Tuple[int, str]], ok: bool):
+        """기록 완료 처리 (self._cond 보유 상태) - 대기 중인 요청 깨움"""
+        self.stats['fsyncs' if ok else 'write_errors'] += 1
+        self.stats['records'] += len(batch)
+        self._log_lines += len(batch)
+        self._durable = max(self._durable, batch[-1][0])
+        self._cond.notify_all()
+
+    def _writer(self):
+        """모인 기록을 한 번에 쓰고 fsync (fsync 중 들어온 기록은 다음 묶음으로)"""
+        with self._cond:
+            while self._running or self._buffer:
+                if not self._buffer:
+                    self._cond.wait(0.5)
+                    continue
+                batch, self._buffer = self._buffer, []
+                # 파일 쓰기 동안에도 put은 버퍼에 계속 추가 가능
+                self._cond.release()
+                try:
+                    ok = self._write(batch)
+                finally:
+                    self._cond.acquire()
+                self._committed(batch, ok)
+                if not self._buffer and self._log_lines > 2 * len(self._entries) + 1000:
+                    self._compact()
+
+    # --- 명령 ---
+
+    def put(self, port: str, device_id: int, action: str, ttl: float,
+            priority: int = PRIORITY_NORMAL) -> OutboxEntry:
+        """
+        명령 보관 (디스크에 기록된 뒤 반환) - 같은 장치의 이전 명령은 대체
+
+        Args:
+            ttl: 만료까지 남은 시간 (초)
+        """
+        if action not in ACTIONS:
+            raise ValueError(f'알 수 없는 명령: {action}')
+        now = time.time()
+        with self._cond:
+            key = (port, device_id)
+            if key in self._entries:
+                self.stats['superseded'] += 1
+            entry = OutboxEntry(self._seq + 1, port, device_id, action, priority, now + ttl, now)
+            self._entries[key] = entry
+            self.stats['queued'] += 1
+            seq = self._record(entry.to_dict())
+            self._wait_durable(seq)
+        print(f"[OUTBOX] 보관: {port} 장치 {device_id} {action} (만료 {ttl:g}초)")
+        self._wakeup.set()
+        return entry
+
+    def supersede(self, port: str, device_id: int) -> bool:
+        """직접 보낸 새 명령이 성공했을 때 보관 중인 이전 명령 제거"""
+        with self._cond:
+            entry = self._entries.get((port, device_id))
+            if entry is None:
+                return False
+            self.stats['superseded'] += 1
+            self._finish(entry, 'superseded')
+        return True
+
+    def _finish(self, entry: OutboxEntry, result: str):
+        """처리 완료 기록 (self._cond 보유 상태)"""
+        key = (entry.port, entry.device_id)
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            self._deferred.pop(key, None)
+        seq = self._record({'op': 'done', 'seq': entry.seq, 'port': entry.port,
+                            'device_id': entry.device_id, 'result': result})
+        # 완료 기록이 남기 전에 재시작하면 같은 명령을 다시 보낼 수 있으므로 대기
+        self._wait_durable(seq)
+
+    def pending(self, port: Optional[str] = None) -> List[dict]:
+        with self._cond:
+            entries = [e for e in self._entries.values() if port is None or e.port == port]
+        return [e._asdict() for e in sorted(entries, key=lambda e: (e.priority, e.expires))]
+
+    # --- 복구 ---
+
+    def replay(self) -> Dict[str, int]:
+        """재시도 시각이 된 포트의 명령 재전송 - {'delivered': n, 'expired': n}"""
+        now = time.monotonic()
+        with self._cond:
+            entries = sorted(
+                (e for e in self._entries.values()
+                 if self._retry.get(e.port, (0, 0))[0] <= now and self._ready_at(e) <= now),
+                key=lambda e: (e.priority, e.expires),
+            )
+        result = {'delivered': 0, 'expired': 0}
+        failed_ports = set()
+        for entry in entries:
+            if entry.port in failed_ports:
+                continue
+            with self._cond:
+                if self._entries.get((entry.port, entry.device_id)) is not entry:
+                    continue  # 그 사이 대체됨
+                if time.time() >= entry.expires:
+                    self.stats['expired'] += 1
+                    result['expired'] += 1
+                    print(f"[OUTBOX] 만료: {entry.port} 장치 {entry.device_id} {entry.action}")
+                    self._finish(entry, 'expired')
+                    continue
+            try:
+                delivered = self.deliver(entry)
+            except DeadlineExceeded as e:
+                # 이 장치만 지금 보낼 수 없음 (차단 중 등) - 포트 재시도에는 영향 없음
+                delay = max(self.retry_base, e.estimated)
+                with self._cond:
+                    if self._entries.get((entry.port, entry.device_id)) is entry:
+                        self._deferred[(entry.port, entry.device_id)] = (time.monotonic() + delay, entry.seq)
+                print(f"[OUTBOX] 보류: {entry.port} 장치 {entry.device_id} {entry.action} ({e}) - {delay:.1f}초 후 재시도")
+                continue
+            except Exception as e:
+                print(f"[OUTBOX] 전송 오류: {e}")
+                delivered = False
+            with self._cond:
+                if delivered:
+                    self.stats['delivered'] += 1
+                    result['delivered'] += 1
+                    self._retry.pop(entry.port, None)
+                    if self._entries.get((entry.port, entry.device_id)) is entry:
+                        self._finish(entry, 'delivered')
+                else:
+                    # 포트가 아직 안 됨 → 이 포트 나머지는 다음 재시도로
+                    failed_ports.add(entry.port)
+                    _, delay = self._retry.get(entry.port, (0, 0))
+                    delay = min(self.retry_max, delay * 2) if delay else self.retry_base
+                    self._retry[entry.port] = (time.monotonic() + delay, delay)
+        return result
+
+    def _ready_at(self, entry: OutboxEntry) -> float:
+        """항목별 보류 시각 (self._cond 보유 상태, 없으면 0)"""
+        deferred = self._deferred.get((entry.port, entry.device_id))
+        return deferred[0] if deferred is not None and deferred[1] == entry.seq else 0.0
+
+    def _replayer(self):
+        while self._running:
+            self.replay()
+            with self._cond:
+                if self._entries:
+                    now = time.monotonic()
+                    wait = min(max(0.0, self._retry.get(e.port, (now, 0))[0] - now, self._ready_at(e) - now)
+                               for e in self._entries.values())
+                else:
+                    wait = None
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def start(self):
+        # 요청 스레드 / relock 스레드가 동시에 불러도 스레드는 한 벌만
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._writer, name='outbox-writer', daemon=True),
+                threading.Thread(target=self._replayer, name='outbox-replay', daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._wakeup.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=5)
+        self._threads = []
+        with self._cond:
+            self._flush_locked()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            pending = len(self._entries)
+            now = time.monotonic()
+            retry = {port: round(max(0.0, at - now), 1) for port, (at, _) in self._retry.items()}
+            deferred = sum(1 for e in self._entries.values() if self._ready_at(e) > now)
+        return dict(self.stats, pending=pending, retry_in=retry, deferred=deferred)
@@ -0,0 +1,262 @@
+"""
+Door Events Module
+상태 조회 결과를 비교해 문/잠금 상태 변화 이벤트를 만들고 웹훅으로 전달하는 모듈
+- TransitionDetector: 장치별 마지막 status_code와 비교 + 디바운스
+- WebhookDispatcher: 배치 전송, 재시도, 크기 제한 backlog
+- 상태 폴링은 poll_scheduler.AdaptivePoller (조회 결과 반영은 조회 함수가 한 번만)
+"""
+import collections
+import json
+import threading
+import time
+import urllib.request
+from typing import Callable, List, NamedTuple, Optional
+
+from frame_codec import STATUS_MAP
+
+
+class DoorTransition(NamedTuple):
+    """상태 변화 이벤트"""
+    kind: str            # door_opened / door_closed / locked / unlocked / changed
+    port: str
+    device_id: int
+    previous: str        # 이전 status_code
+    current: str         # 새 status_code
+    time: float          # epoch 초
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def classify_transition(previous: str, current: str) -> str:
+    """두 status_code 사이의 변화 종류 판정"""
+    prev = STATUS_MAP.get(previous)
+    cur = STATUS_MAP.get(current)
+    if prev is None or cur is None:
+        return 'changed'
+    if prev['door'] != cur['door']:
+        return 'door_opened' if cur['door'] == 'open' else 'door_closed'
+    if prev['lock'] != cur['lock']:
+        return 'unlocked' if cur['lock'] == 'open' else 'locked'
+    return 'changed'
+
+
+class _DeviceState:
+    __slots__ = ('stable', 'candidate', 'candidate_count', 'candidate_since')
+
+    def __init__(self, code: str, now: float):
+        self.stable = code
+        self.candidate = None
+        self.candidate_count = 0
+        self.candidate_since = now
+
+
+class TransitionDetector:
+    def __init__(self, min_count: int = 2, min_duration: float = 0.0, history_size: int = 200):
+        """
+        Args:
+            min_count: 새 상태가 연속으로 관측되어야 하는 횟수 (디바운스)
+            min_duration: 새 상태가 유지되어야 하는 최소 시간 (초)
+            history_size: 최근 이벤트 보관 개수
+        """
+        self.min_count = max(1, min_count)
+        self.min_duration = min_duration
+        self._lock = threading.Lock()
+        self._states = {}  # (port, device_id) -> _DeviceState
+        self._listeners = []
+        self._recent = collections.deque(maxlen=history_size)
+        self.suppressed = 0  # 디바운스로 무시된 흔들림 수
+
+    def add_listener(self, listener: Callable[[DoorTransition], None]):
+        self._listeners.append(listener)
+
+    def observe(self, port: str, device_id: int, status_code: Optional[str],
+                now: Optional[float] = None) -> Optional[DoorTransition]:
+        """상태 관측 1건 반영, 확정된 변화가 있으면 이벤트 반환"""
+        if status_code is None:
+            return None
+        now = time.monotonic() if now is None else now
+        key = (port, device_id)
+        transition = None
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                # 첫 관측은 기준 상태로만 기록
+                self._states[key] = _DeviceState(status_code, now)
+                return None
+
+            if status_code == state.stable:
+                if state.candidate is not None:
+                    self.suppressed += 1
+                state.candidate = None
+                state.candidate_count = 0
+                return None
+
+            if status_code != state.candidate:
+                if state.candidate is not None:
+                    self.suppressed += 1
+                state.candidate = status_code
+                state.candidate_count = 0
+                state.candidate_since = now
+            state.candidate_count += 1
+
+            if (state.candidate_count >= self.min_count
+                    and now - state.candidate_since >= self.min_duration):
+                transition = DoorTransition(
+                    kind=classify_transition(state.stable, status_code),
+                    port=port,
+                    device_id=device_id,
+                    previous=state.stable,
+                    current=status_code,
+                    time=time.time(),
+                )
+                state.stable = status_code
+                state.candidate = None
+                state.candidate_count = 0
+                self._recent.append(transition)
+
+        if transition is not None:
+            print(f"[EVENT] {transition.kind}: {port} #{device_id} ({transition.previous} → {transition.current})")
+            for listener in self._listeners:
+                try:
+                    listener(transition)
+                except Exception as e:
+                    print(f"[EVENT] 리스너 오류: {e}")
+        return transition
+
+    def recent(self, limit: int = 50) -> List[DoorTransition]:
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def known_states(self) -> dict:
+        """장치별 확정 상태"""
+        with self._lock:
+            return {f'{port}#{dev}': st.stable for (port, dev), st in self._states.items()}
+
+
+def post_json(url: str, payload: dict, timeout: float = 3.0):
+    """HTTP POST (JSON) - 2xx가 아니면 예외"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        if not 200 <= resp.status < 300:
+            raise OSError(f'HTTP {resp.status}')
+
+
+class _Target:
+    __slots__ = ('url', 'backlog', 'failures', 'next_attempt', 'delivered', 'dropped')
+
+    def __init__(self, url: str, max_backlog: int):
+        self.url = url
+        self.backlog = collections.deque(maxlen=max_backlog)
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.delivered = 0
+        self.dropped = 0
+
+
+class WebhookDispatcher:
+    def __init__(self, sender: Callable[[str, dict], None] = post_json, max_backlog: int = 1000,
+                 batch_size: int = 20, flush_interval: float = 0.5,
+                 retry_base: float = 1.0, retry_max: float = 60.0):
+        """
+        Args:
+            sender: (url, payload) 전송 함수 (테스트 시 로컬 대체 함수 사용 가능)
+            max_backlog: 웹훅별 미전송 이벤트 최대 개수 (초과 시 오래된 것부터 버림)
+            batch_size: 1회 POST에 담는 최대 이벤트 수
+            flush_interval: 배치를 모으는 최대 대기 시간 (초)
+            retry_base / retry_max: 실패 시 지수 백오프 범위 (초)
+        """
+        self.sender = sender
+        self.max_backlog = max_backlog
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._targets = {}  # url -> _Target
+        self._running = False
+        self._thread = None
+
+    def register(self, url: str):
+        with self._lock:
+            if url not in self._targets:
+                self._targets[url] = _Target(url, self.max_backlog)
+        self.start()
+
+    def unregister(self, url: str) -> bool:
+        with self._lock:
+            return self._targets.pop(url, None) is not None
+
+    def publish(self, transition: DoorTransition):
+        """모든 웹훅 backlog에 이벤트 추가"""
+        event = transition.to_dict()
+        full_batch = False
+        with self._lock:
+            for target in self._targets.values():
+                if len(target.backlog) == target.backlog.maxlen:
+                    target.dropped += 1
+                target.backlog.append(event)
+                full_batch = full_batch or len(target.backlog) >= self.batch_size
+        # 배치가 찼으면 즉시 전송, 아니면 flush_interval 동안 모아서 전송
+        if full_batch:
+            self._wakeup.set()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='webhook-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """전송 가능한 웹훅마다 배치 1개씩 전송"""
+        now = time.monotonic()
+        with self._lock:
+            due = [t for t in self._targets.values() if t.backlog and t.next_attempt <= now]
+
+        for target in due:
+            with self._lock:
+                batch = [target.backlog[i] for i in range(min(self.batch_size, len(target.backlog)))]
+            try:
+                self.sender(target.url, {'events': batch})
+            except Exception as e:
+                target.failures += 1
+                delay = min(self.retry_max, self.retry_base * (2 ** (target.failures - 1)))
+                target.next_attempt = time.monotonic() + delay
+                print(f"[WEBHOOK] 전송 실패 ({target.url}): {e} - {delay:.1f}초 후 재시도")
+                continue
+
+            with self._lock:
+                # 전송 중 backlog가 넘쳐 앞부분이 이미 버려졌을 수 있으므로 남아 있는 것만 제거
+                for event in batch:
+                    if target.backlog and target.backlog[0] is event:
+                        target.backlog.popleft()
+                target.delivered += len(batch)
+                target.failures = 0
+                target.next_attempt = 0.0
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [{
+                'url': t.url,
+                'backlog': len(t.backlog),
+                'failures': t.failures,
+                'delivered': t.delivered,
+                'dropped': t.dropped,
+            } for t in self._targets.values()]
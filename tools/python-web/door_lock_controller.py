@@ -3,11 +3,30 @@ Door Lock Controller Module
 시리얼 통신을 통해 잠금장치를 제어하는 모듈
 - Windows: ctypes로 Windows API 직접 호출 (Overlapped I/O + WaitCommEvent)
 - 기타 OS: pyserial 사용
+- sim:// 포트: 가상 버스 (simulated_bus, 모든 OS에서 pyserial 경로와 동일하게 동작)
+- 동시 전송(pipeline_window > 1, 상시 수신 모드): 장치마다 1개씩, 포트당 window개까지 응답 대기 프레임을 둠
+- 수신 버퍼 purge는 요청-응답 모드(background_reader=False, 기본값)에만 남아 있음
+  - 전송 전에 이전 바이트를 버려야 응답을 구분할 수 있어 요청 없이 들어온 상태 프레임도 함께 버려짐
+  - 웹 서버(app.py)와 capacity_planner --measure는 상시 수신 모드 (purge 없음, 이벤트 보존)
 """
+import queue
 import sys
+import threading
 import time
+from contextlib import contextmanager
 from typing import Optional
 
+import simulated_bus
+import tracing
+from clock import REAL_CLOCK
+from bus_reader import BusReader
+from circuit_breaker import CLOSED, CircuitOpen
+from frame_codec import (
+    FrameDecoder, build_frame, build_status_query, decode_first,
+    describe_status, frame_device_id, wire_time, STATUS_QUERY,
+)
+from line_timing import COMMAND, QUERY, LineTimings
+
 if sys.platform == 'win32':
     import ctypes
     import ctypes.wintypes as wintypes
@@ -162,12 +181,19 @@ if sys.platform == 'win32':
 
     kernel32.CancelIo.argtypes = [wintypes.HANDLE]
     kernel32.CancelIo.restype = wintypes.BOOL
+
+    MAXDWORD = 0xFFFFFFFF
 else:
     import serial
 
 
+# 상시 수신 모드에서 열기/닫기 명령 후 응답을 기다리는 시간 (pyserial 경로의 0.15초와 동일)
+COMMAND_REPLY_WINDOW = 0.15
+
+
 class DoorLockController:
-    def __init__(self, port: str = 'COM2', baudrate: int = 9600, timeout: int = 1, append_cr: bool = False):
+    def __init__(self, port: str = 'COM2', baudrate: int = 9600, timeout: int = 1, append_cr: bool = False,
+                 background_reader: bool = False, breakers=None, clock=None):
         """
         잠금장치 컨트롤러 초기화
 
@@ -176,24 +202,86 @@ class DoorLockController:
             baudrate: 통신 속도 (기본값: 9600)
             timeout: 타임아웃 시간 (초)
             append_cr: 명령어 끝에 CR(0x0D) 추가 여부 (기본값: False, 제조사 프로그램과 동일)
+            background_reader: 연결 시 상시 수신 스레드 시작 여부 (응답/이벤트 분리, purge 없음)
+            breakers: 장치별 차단기 (DeviceBreakers, 없으면 차단 안 함)
+            clock: 대기/시각에 쓸 시계 (clock.VirtualClock이면 가상 시간, sim:// 포트 전용)
         """
+        self.clock = clock or REAL_CLOCK
+        if self.clock.virtual and (background_reader or not simulated_bus.is_sim_port(port)):
+            raise ValueError('가상 시계는 sim:// 포트의 요청-응답 모드에서만 사용할 수 있습니다.')
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.append_cr = append_cr
+        self.background_reader = background_reader
+        # Windows 직접 핸들 경로 사용 여부 (가상 버스는 OS와 무관하게 pyserial 경로)
+        self._win32 = sys.platform == 'win32' and not simulated_bus.is_sim_port(port)
+        self.device_timeouts = {}  # 장치별 응답 대기 시간 (초) - 없으면 timeout 사용
+        self._reader = None  # BusReader (상시 수신 모드)
         self._handle = None  # Windows 직접 핸들
         self._write_event = None
         self._read_event = None
         self._wait_event = None
         self.serial_conn = None  # pyserial 폴백 (비Windows용)
-        self._last_response = None  # 마지막 응답 데이터
+        self._local = threading.local()
+        self._last_response = None  # 마지막 응답 데이터 (호출 스레드별)
+        self.line_timings = LineTimings()  # 장치 턴어라운드 / 응답 누락 관측 (용량 계산용)
+        self.breakers = breakers
+        # 버스 단위 직렬화 (Flask 다중 스레드에서 purge/write/read 교차 방지)
+        self._bus_lock = self.clock.rlock()
+        # 동시 전송 (상시 수신 모드에서 응답의 장치 ID로 짝을 맞춤)
+        self.pipeline_window = 1      # 응답 대기 중 프레임 최대 수 (1 = 한 번에 하나)
+        self.stop_and_wait = set()    # 설정으로 동시 전송에서 뺀 장치
+        self._intolerant = set()      # 동시 전송 중에만 응답이 없던 장치 (자동 전환)
+        self._suspect = set()         # 동시 전송 중 응답 없음 - 다음 조회는 단독으로 확인
+        self._reply_ids = None        # 응답에 장치 ID가 있는지 (None = 아직 모름, SOH 응답이면 False)
+        self._inflight = {}           # device_id -> 전송 완료 여부 (False = 자리만 잡음)
+        self._window_cond = threading.Condition()
+        self._write_seq = 0
+        self.pipeline_stats = {'pipelined': 0, 'exclusive': 0, 'max_inflight': 0, 'shared_timeouts': 0}
+
+    @property
+    def _last_response(self) -> Optional[bytes]:
+        return getattr(self._local, 'last_response', None)
+
+    @_last_response.setter
+    def _last_response(self, value: Optional[bytes]):
+        # 동시 전송 중에는 여러 스레드가 각자 응답을 기다리므로 스레드별로 보관
+        self._local.last_response = value
 
     def connect(self) -> bool:
         """시리얼 포트에 연결"""
-        if sys.platform == 'win32':
-            return self._connect_win32()
+        if self._win32:
+            connected = self._connect_win32()
         else:
-            return self._connect_pyserial()
+            connected = self._connect_pyserial()
+
+        if connected and self.background_reader and self._reader is None:
+            self.start_reader()
+        return connected
+
+    def start_reader(self) -> BusReader:
+        """상시 수신 스레드 시작"""
+        if self._reader is None:
+            self._reader = BusReader(self)
+            if self._win32 and self._handle is not None:
+                self._apply_timeouts_win32()
+            self._reader.start()
+            print(f"상시 수신 시작: {self.port}")
+        return self._reader
+
+    def stop_reader(self):
+        """상시 수신 스레드 중지"""
+        reader = self._reader
+        if reader is not None:
+            reader.stop()
+            self._reader = None
+            if self._win32 and self._handle is not None:
+                self._apply_timeouts_win32()
+
+    @property
+    def reader(self) -> Optional[BusReader]:
+        return self._reader
 
     def _connect_win32(self) -> bool:
         """Windows: CreateFile + Overlapped I/O로 포트 열기"""
@@ -201,6 +289,7 @@ class DoorLockController:
             if self._handle is not None:
                 return True
 
+            tracing.mark('connect_start')
             port_name = f"\\\\.\\{self.port}"
 
             # Overlapped 모드로 포트 열기
@@ -272,13 +361,7 @@ class DoorLockController:
                   f"Parity={verify_dcb.Parity}, StopBits={verify_dcb.StopBits}, flags=0x{verify_dcb.flags:08X}")
 
             # 타임아웃 설정
-            timeouts = COMMTIMEOUTS()
-            timeouts.ReadIntervalTimeout = 50
-            timeouts.ReadTotalTimeoutMultiplier = 10
-            timeouts.ReadTotalTimeoutConstant = int(self.timeout * 1000)
-            timeouts.WriteTotalTimeoutMultiplier = 10
-            timeouts.WriteTotalTimeoutConstant = 5000
-            kernel32.SetCommTimeouts(self._handle, ctypes.byref(timeouts))
+            self._apply_timeouts_win32()
 
             # CommMask 설정 (제조사 프로그램과 동일: EV_RXCHAR)
             kernel32.SetCommMask(self._handle, EV_RXCHAR)
@@ -287,8 +370,9 @@ class DoorLockController:
             kernel32.EscapeCommFunction(self._handle, SETRTS)
             kernel32.EscapeCommFunction(self._handle, SETDTR)
 
-            time.sleep(0.2)
+            self.clock.sleep(0.2)
             print(f"포트 연결 완료: {self.port} (ctypes Overlapped I/O)")
+            tracing.mark('connected')
             return True
 
         except Exception as e:
@@ -297,28 +381,52 @@ class DoorLockController:
             traceback.print_exc()
             return False
 
+    def _apply_timeouts_win32(self):
+        """COMMTIMEOUTS 설정 (상시 수신 중이면 바이트 도착 즉시 ReadFile 완료)"""
+        timeouts = COMMTIMEOUTS()
+        if self._reader is not None:
+            timeouts.ReadIntervalTimeout = MAXDWORD
+            timeouts.ReadTotalTimeoutMultiplier = MAXDWORD
+        else:
+            timeouts.ReadIntervalTimeout = 50
+            timeouts.ReadTotalTimeoutMultiplier = 10
+        timeouts.ReadTotalTimeoutConstant = int(self.timeout * 1000)
+        timeouts.WriteTotalTimeoutMultiplier = 10
+        timeouts.WriteTotalTimeoutConstant = 5000
+        kernel32.SetCommTimeouts(self._handle, ctypes.byref(timeouts))
+
     def _connect_pyserial(self) -> bool:
         """비Windows: pyserial로 연결"""
         try:
             if self.serial_conn and self.serial_conn.is_open:
                 return True
 
-            self.serial_conn = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=self.timeout,
-            )
-            time.sleep(0.2)
+            tracing.mark('connect_start')
+            if simulated_bus.is_sim_port(self.port):
+                self.serial_conn = simulated_bus.open_port(self.port, self.baudrate, self.timeout, self.clock)
+            else:
+                self.serial_conn = serial.Serial(
+                    port=self.port,
+                    baudrate=self.baudrate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=self.timeout,
+                )
+            self.clock.sleep(0.2)
+            tracing.mark('connected')
             return True
         except Exception as e:
             print(f"연결 실패: {e}")
             return False
 
     def disconnect(self):
-        """시리얼 포트 연결 해제"""
+        """시리얼 포트 연결 해제 (진행 중인 명령이 있으면 끝날 때까지 대기)"""
+        with self._exclusive():
+            self._disconnect()
+
+    def _disconnect(self):
+        self.stop_reader()
         if self._handle is not None:
             kernel32.CloseHandle(self._handle)
             self._handle = None
@@ -334,34 +442,176 @@ class DoorLockController:
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
 
-    def send_command(self, command: bytes) -> bool:
+    def send_command(self, command: bytes, guarded: bool = True) -> bool:
         """
         명령어 전송
 
         Args:
             command: 전송할 명령어 (바이트 배열)
+            guarded: 장치별 차단기 적용 여부 (버스 스캔은 False)
 
         Returns:
             bool: 전송 성공 여부
+
+        Raises:
+            CircuitOpen: 대상 장치가 차단 중 (버스를 쓰지 않음)
         """
+        device_id = frame_device_id(command)
+        guarded = guarded and self.breakers is not None and device_id is not None
         try:
-            if not self.connect():
-                return False
-
-            if self.append_cr:
-                command = command + bytes([0x0D])
-
-            if sys.platform == 'win32':
-                return self._send_command_win32(command)
-            else:
-                return self._send_command_pyserial(command)
+            with self._bus_lock:
+                if not self.connect():
+                    return False
 
+            if self._can_pipeline(device_id):
+                self.pipeline_stats['pipelined'] += 1
+                return self._send_checked(command, device_id, guarded, pipelined=True)
+
+            with self._exclusive():
+                if self.pipeline_window > 1:
+                    self.pipeline_stats['exclusive'] += 1
+                sent = self._send_checked(command, device_id, guarded)
+            if device_id in self._suspect and self._is_query(command):
+                self._resolve_suspect(device_id)
+            return sent
+
+        except CircuitOpen:
+            raise
+        except OSError as e:
+            # 포트가 사라짐 (USB 분리 등) → 연결 정리, 다음 전송 때 다시 연결
+            print(f"명령 전송 실패 (포트 오류): {e}")
+            with self._bus_lock:
+                self._disconnect()
+            return False
         except Exception as e:
             print(f"명령 전송 실패: {e}")
             import traceback
             traceback.print_exc()
             return False
 
+    def _send_checked(self, command: bytes, device_id: Optional[int], guarded: bool,
+                      pipelined: bool = False) -> bool:
+        """차단기 확인 후 전송 (단독 전송이면 self._exclusive() 보유 상태)"""
+        if guarded and self.breakers.allow(self.port, device_id) and not self._is_query(command):
+            # 반개방: 명령을 보내기 전에 상태 조회 1건으로 장치가 살아났는지 확인
+            self._dispatch_guarded(build_status_query(device_id), device_id, pipelined)
+            if self.breakers.state(self.port, device_id) != CLOSED:
+                raise CircuitOpen(f'장치 {device_id} 응답 없음 - 잠시 후 다시 시도하세요.',
+                                  self.breakers.base_delay)
+        if guarded:
+            return self._dispatch_guarded(command, device_id, pipelined)
+        return self._dispatch(command, pipelined)
+
+    @staticmethod
+    def _is_query(command: bytes) -> bool:
+        return len(command) > 3 and command[3] == STATUS_QUERY
+
+    # --- 동시 전송 ---
+
+    def _can_pipeline(self, device_id: Optional[int]) -> bool:
+        """
+        다른 장치의 응답을 기다리는 중에도 보낼 수 있는지
+        - 상시 수신 모드 + 응답에 장치 ID가 있는 포트만 (SOH 응답은 짝을 맞출 수 없음)
+        - 설정/자동 전환된 장치, 확인 중인 장치는 단독 전송
+        """
+        return (self.pipeline_window > 1 and self._reader is not None and device_id is not None
+                and self._reply_ids is True
+                and device_id not in self.stop_and_wait
+                and device_id not in self._intolerant
+                and device_id not in self._suspect)
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        단독 전송 구간 - 버스 점유 + 응답을 기다리는 동시 전송 프레임이 모두 끝날 때까지 대기
+        자리만 잡은(False) 동시 전송은 버스를 잡아야 응답 대기를 등록하므로 이 구간이 끝날 때까지 멈춰 있음
+        """
+        with self._bus_lock:
+            with self._window_cond:
+                while any(self._inflight.values()):
+                    self.clock.wait(self._window_cond, None)
+            yield
+
+    def _send_command_pipelined(self, command: bytes) -> bool:
+        """같은 장치 프레임이 없고 창에 자리가 있을 때 전송 (응답은 버스를 잡지 않고 대기)"""
+        device_id = frame_device_id(command)
+        with self._window_cond:
+            while device_id in self._inflight or len(self._inflight) >= self.pipeline_window:
+                self.clock.wait(self._window_cond, None)
+            self._inflight[device_id] = False
+        try:
+            return self._send_command_reader(command, pipelined=True)
+        finally:
+            with self._window_cond:
+                del self._inflight[device_id]
+                self.clock.notify(self._window_cond)
+
+    def _mark_written(self, device_id: int):
+        """전송 완료 표시 - (다른 응답 대기 프레임이 있었는지, 전송 순번)"""
+        with self._window_cond:
+            self._inflight[device_id] = True
+            self._write_seq += 1
+            outstanding = sum(self._inflight.values())
+            if outstanding > self.pipeline_stats['max_inflight']:
+                self.pipeline_stats['max_inflight'] = outstanding
+            return outstanding > 1, self._write_seq
+
+    def _resolve_suspect(self, device_id: int):
+        """동시 전송 중 응답이 없던 장치를 단독 조회한 결과 - 이번엔 응답하면 동시 전송에서 뺌"""
+        self._suspect.discard(device_id)
+        if self._last_response is not None:
+            self._intolerant.add(device_id)
+            print(f"[PIPELINE] {self.port} 장치 {device_id}: 동시 전송 중에만 응답 없음 → 단독 전송으로 전환")
+
+    @property
+    def pipeline_active(self) -> bool:
+        """이 포트에서 지금 동시 전송이 가능한지 (상시 수신 + 장치 ID 응답 확인 + 창 2 이상)"""
+        return self.pipeline_window > 1 and self._reader is not None and self._reply_ids is True
+
+    def pipeline_snapshot(self) -> dict:
+        with self._window_cond:
+            inflight = sum(self._inflight.values())
+        return dict(
+            self.pipeline_stats,
+            window=self.pipeline_window,
+            active=self.pipeline_active,
+            reply_ids=self._reply_ids,
+            inflight=inflight,
+            stop_and_wait=sorted(self.stop_and_wait),
+            fallback=sorted(self._intolerant),
+            suspect=sorted(self._suspect),
+        )
+
+    def _dispatch(self, command: bytes, pipelined: bool = False) -> bool:
+        """전송 경로 선택 (단독 전송이면 self._exclusive() 보유 상태)"""
+        if self.append_cr:
+            command = command + bytes([0x0D])
+
+        if pipelined:
+            return self._send_command_pipelined(command)
+        if self._reader is not None:
+            return self._send_command_reader(command)
+        if self._win32:
+            return self._send_command_win32(command)
+        else:
+            return self._send_command_pyserial(command)
+
+    def _dispatch_guarded(self, command: bytes, device_id: int, pipelined: bool = False) -> bool:
+        """
+        전송 후 차단기에 결과 반영
+        - 상태 프레임 응답 = 성공, 상태 조회의 응답 없음/파싱 실패 = 실패
+        - 열기/닫기 명령은 응답이 없을 수 있으므로 응답 없음을 실패로 세지 않음
+        """
+        self._last_response = None
+        sent = self._dispatch(command, pipelined)
+        if not sent:
+            return sent
+        if self._last_response is not None and decode_first(self._last_response) is not None:
+            self.breakers.record(self.port, device_id, True)
+        elif self._is_query(command):
+            self.breakers.record(self.port, device_id, False)
+        return sent
+
     def _send_command_win32(self, command: bytes) -> bool:
         """Windows: Overlapped I/O WriteFile + WaitCommEvent + ReadFile"""
         # 에러 상태 클리어 + 현재 버퍼 상태 확인
@@ -372,7 +622,7 @@ class DoorLockController:
             print(f"에러 클리어: {errors.value:#x}")
         print(f"버퍼 상태: TX={comstat.cbOutQue}, RX={comstat.cbInQue}")
 
-        # 수신 버퍼 클리어
+        # 수신 버퍼 클리어 (요청-응답 모드 전용 - 요청 없이 들어온 프레임도 버려짐, 상시 수신 모드는 이 경로를 쓰지 않음)
         kernel32.PurgeComm(self._handle, PURGE_RXCLEAR)
 
         # 1. WaitCommEvent 시작 (Overlapped - Write 전에 비동기로 대기 시작)
@@ -398,34 +648,10 @@ class DoorLockController:
                 wait_started = False
 
         # 2. Overlapped WriteFile
-        bytes_written = wintypes.DWORD(0)
-        buf = (ctypes.c_char * len(command))(*command)
-        ov_write = OVERLAPPED()
-        ctypes.memset(ctypes.byref(ov_write), 0, ctypes.sizeof(OVERLAPPED))
-        ov_write.hEvent = self._write_event
-        kernel32.ResetEvent(self._write_event)
-
-        result = kernel32.WriteFile(
-            self._handle, buf, len(command),
-            ctypes.byref(bytes_written), ctypes.byref(ov_write)
-        )
-        if not result:
-            err = ctypes.get_last_error()
-            if err == ERROR_IO_PENDING:
-                # Write 완료 대기
-                wr = kernel32.WaitForSingleObject(self._write_event, 5000)
-                if wr != WAIT_OBJECT_0:
-                    print("WriteFile 타임아웃")
-                    return False
-                kernel32.GetOverlappedResult(
-                    self._handle, ctypes.byref(ov_write),
-                    ctypes.byref(bytes_written), False
-                )
-            else:
-                print(f"WriteFile 실패 (error: {err})")
-                return False
-
-        print(f"명령 전송: {command.hex()} (WriteFile: {bytes_written.value} bytes)")
+        tracing.mark('write_start')
+        if not self._write_win32(command):
+            return False
+        tracing.mark('write_complete')
 
         # 3. Write 후 TX 버퍼 상태 확인
         errors2 = wintypes.DWORD(0)
@@ -436,7 +662,7 @@ class DoorLockController:
         # 4. WaitCommEvent 완료 대기 (device 응답)
         if wait_started:
             wr = kernel32.WaitForSingleObject(
-                self._wait_event, int(self.timeout * 1000)
+                self._wait_event, int(self.reply_timeout(frame_device_id(command)) * 1000)
             )
 
             if wr == WAIT_OBJECT_0:
@@ -446,6 +672,7 @@ class DoorLockController:
                     ctypes.byref(transferred), False
                 )
                 print(f"WaitCommEvent 완료: evt_mask={evt_mask.value}")
+                tracing.mark('first_rx_byte')
 
                 if evt_mask.value & EV_RXCHAR:
                     # 5. Overlapped ReadFile
@@ -470,6 +697,7 @@ class DoorLockController:
                             )
 
                     if bytes_read.value > 0:
+                        tracing.mark('frame_complete')
                         response = bytes(read_buf[:bytes_read.value])
                         self._last_response = response
                         print(f"응답 수신: {response.hex()}")
@@ -477,6 +705,7 @@ class DoorLockController:
                         self._last_response = None
                         print("응답 데이터 없음")
             elif wr == WAIT_TIMEOUT:
+                tracing.mark('reply_timeout')
                 # 타임아웃 후 최종 버퍼 상태 확인
                 errors3 = wintypes.DWORD(0)
                 comstat3 = COMSTAT()
@@ -491,20 +720,176 @@ class DoorLockController:
 
         return True
 
+    def reply_timeout(self, device_id: Optional[int]) -> float:
+        """장치 응답 대기 시간 (장치별 설정 우선)"""
+        return self.device_timeouts.get(device_id, self.timeout)
+
+    def _write_win32(self, command: bytes) -> bool:
+        """Windows: Overlapped WriteFile (완료까지 대기)"""
+        bytes_written = wintypes.DWORD(0)
+        buf = (ctypes.c_char * len(command))(*command)
+        ov_write = OVERLAPPED()
+        ctypes.memset(ctypes.byref(ov_write), 0, ctypes.sizeof(OVERLAPPED))
+        ov_write.hEvent = self._write_event
+        kernel32.ResetEvent(self._write_event)
+
+        result = kernel32.WriteFile(
+            self._handle, buf, len(command),
+            ctypes.byref(bytes_written), ctypes.byref(ov_write)
+        )
+        if not result:
+            err = ctypes.get_last_error()
+            if err == ERROR_IO_PENDING:
+                # Write 완료 대기
+                wr = kernel32.WaitForSingleObject(self._write_event, 5000)
+                if wr != WAIT_OBJECT_0:
+                    print("WriteFile 타임아웃")
+                    return False
+                kernel32.GetOverlappedResult(
+                    self._handle, ctypes.byref(ov_write),
+                    ctypes.byref(bytes_written), False
+                )
+            else:
+                print(f"WriteFile 실패 (error: {err})")
+                return False
+
+        print(f"명령 전송: {command.hex()} (WriteFile: {bytes_written.value} bytes)")
+        return True
+
+    def _write(self, command: bytes) -> bool:
+        """명령 바이트만 전송 (응답 대기 없음)"""
+        if self._win32:
+            return self._write_win32(command)
+        self.serial_conn.write(command)
+        self.serial_conn.flush()
+        print(f"명령 전송: {command.hex()} (길이: {len(command)} bytes)")
+        return True
+
+    def _read_chunk(self) -> bytes:
+        """
+        수신 버퍼에서 읽을 수 있는 만큼 읽기 (최대 timeout 동안 첫 바이트 대기)
+        상시 수신 스레드 전용
+        """
+        if self._win32:
+            return self._read_chunk_win32()
+        conn = self.serial_conn
+        if conn is None or not conn.is_open:
+            self.clock.sleep(self.timeout)
+            return b''
+        return conn.read(max(1, conn.in_waiting))
+
+    def _read_chunk_win32(self) -> bytes:
+        """Windows: Overlapped ReadFile 1회 (MAXDWORD 타임아웃 설정으로 바이트 도착 즉시 완료)"""
+        if self._handle is None:
+            self.clock.sleep(self.timeout)
+            return b''
+        read_buf = (ctypes.c_char * 256)()
+        bytes_read = wintypes.DWORD(0)
+        ov_read = OVERLAPPED()
+        ctypes.memset(ctypes.byref(ov_read), 0, ctypes.sizeof(OVERLAPPED))
+        ov_read.hEvent = self._read_event
+        kernel32.ResetEvent(self._read_event)
+
+        result = kernel32.ReadFile(
+            self._handle, read_buf, 256,
+            ctypes.byref(bytes_read), ctypes.byref(ov_read)
+        )
+        if not result:
+            err = ctypes.get_last_error()
+            if err != ERROR_IO_PENDING:
+                raise OSError(f"ReadFile 실패 (error: {err})")
+            wr = kernel32.WaitForSingleObject(self._read_event, int(self.timeout * 1000) + 500)
+            if wr != WAIT_OBJECT_0:
+                kernel32.CancelIo(self._handle)
+            kernel32.GetOverlappedResult(
+                self._handle, ctypes.byref(ov_read),
+                ctypes.byref(bytes_read), wr == WAIT_OBJECT_0
+            )
+        return bytes(read_buf[:bytes_read.value])
+
+    def _send_command_reader(self, command: bytes, pipelined: bool = False) -> bool:
+        """
+        상시 수신 모드: purge 없이 전송 후 BusReader가 전달하는 응답 대기
+        - pipelined: 전송만 버스를 잡고 응답은 버스를 놓고 대기 (다른 장치 프레임과 겹침)
+        """
+        device_id = frame_device_id(command)
+        is_query = device_id is not None and len(command) > 3 and command[3] == STATUS_QUERY
+        wait = self.reply_timeout(device_id) if is_query else COMMAND_REPLY_WINDOW
+
+        pending = None
+        shared = False
+        try:
+            with self._bus_lock:
+                # 응답 대기 등록은 버스를 잡은 뒤 - 단독 전송/스캔이 같은 장치의 대기를 덮어쓰지 않음
+                pending = self._reader.expect(device_id)
+                tracing.mark('write_start')
+                if not self._write(command):
+                    return False
+                written_ns = time.monotonic_ns()
+                tracing.mark('write_complete', written_ns)
+                if pipelined:
+                    shared, seq = self._mark_written(device_id)
+            frame = pending.wait(wait)
+            if pipelined:
+                # 응답을 기다리는 동안 다른 프레임이 나갔으면 턴어라운드 측정에서 제외
+                shared = shared or self._write_seq != seq
+        finally:
+            if pending is not None:
+                self._reader.cancel(pending)
+
+        kind = QUERY if is_query else COMMAND
+        if frame is not None:
+            tracing.mark('first_rx_byte', pending.first_byte_ns)
+            tracing.mark('frame_complete', pending.resolved_ns)
+            if not shared:
+                # 첫 바이트 수신 시각에는 그 바이트의 선로 시간이 포함됨
+                turnaround = (pending.first_byte_ns - written_ns) / 1e9 - wire_time(1, self.baudrate)
+                self.line_timings.observe(kind, turnaround, len(frame.raw))
+            self._learn_reply_ids(frame)
+            self._last_response = frame.raw
+            print(f"응답 수신: {frame.raw.hex()}")
+        else:
+            if shared and is_query:
+                # 동시 전송 중에만 응답이 없는지 다음 조회를 단독으로 보내 확인
+                self.pipeline_stats['shared_timeouts'] += 1
+                self._suspect.add(device_id)
+            elif not shared:
+                self.line_timings.observe(kind, None)
+            tracing.mark('reply_timeout')
+            self._last_response = None
+            print("응답 없음 (타임아웃)")
+        return True
+
+    def _learn_reply_ids(self, frame):
+        """응답에 장치 ID가 있는 포트인지 기록 - SOH 응답이 한 번이라도 오면 이 포트는 단독 전송만"""
+        if frame.device_id is None:
+            if self._reply_ids is not False and self.pipeline_window > 1:
+                print(f"[PIPELINE] {self.port}: 장치 ID 없는 응답(SOH) 수신 → 단독 전송으로 전환")
+            self._reply_ids = False
+        elif self._reply_ids is None:
+            self._reply_ids = True
+
     def _send_command_pyserial(self, command: bytes) -> bool:
         """비Windows: pyserial로 전송"""
+        # 요청-응답 모드 전용 purge - 요청 없이 들어온 프레임도 버려짐 (상시 수신 모드는 _send_command_reader)
         self.serial_conn.reset_input_buffer()
+        tracing.mark('write_start')
         self.serial_conn.write(command)
         self.serial_conn.flush()
+        tracing.mark('write_complete')
 
         print(f"명령 전송: {command.hex()} (길이: {len(command)} bytes)")
 
-        time.sleep(0.15)
+        self.clock.sleep(0.15)
         if self.serial_conn.in_waiting > 0:
+            # 고정 대기 후 한 번에 읽으므로 첫 바이트/프레임 완성 시각을 구분할 수 없음
+            tracing.mark('first_rx_byte')
             response = self.serial_conn.read(self.serial_conn.in_waiting)
+            tracing.mark('frame_complete')
             self._last_response = response
             print(f"응답 수신: {response.hex()}")
         else:
+            tracing.mark('reply_timeout')
             self._last_response = None
             print("응답 없음 (타임아웃)")
 
@@ -527,10 +912,13 @@ class DoorLockController:
 
             print(f"[RAW] 전송: {command.hex()} ({len(command)} bytes)")
 
-            if sys.platform == 'win32':
-                return self._send_command_win32(command)
-            else:
-                return self._send_command_pyserial(command)
+            with self._exclusive():
+                if self._reader is not None:
+                    return self._send_command_reader(command)
+                if self._win32:
+                    return self._send_command_win32(command)
+                else:
+                    return self._send_command_pyserial(command)
 
         except ValueError as e:
             print(f"Hex 파싱 실패: {e}")
@@ -544,14 +932,7 @@ class DoorLockController:
         DLE-STX 프레임 생성 (제조사 프로토콜)
         프레임: DLE(10) STX(02) [DeviceID] [ESC(1B)] [Command] [Param] DLE(10) ETX(03)
         """
-        return bytes([
-            0x10, 0x02,                    # DLE STX (프레임 시작)
-            device_id,                     # 장치 ID
-            0x1B,                          # ESC
-            ord(command_char),             # '1'=열기(0x31), '0'=닫기(0x30)
-            param,                         # 파라미터 (0xFF=일반, 0x31=5초 자동잠금)
-            0x10, 0x03,                    # DLE ETX (프레임 끝)
-        ])
+        return build_frame(device_id, command_char, param)
 
     def open_lock(self, device_id: int = 1) -> bool:
         """잠금장치 열기"""
@@ -574,153 +955,128 @@ class DoorLockController:
         명령: 10 02 [DeviceID] 1C FF 00 10 03
         응답 상태코드: "00"=잠금해제(문닫힘), "01"=잠금(문닫힘), "10"=문열림
         """
-        command = bytes([
-            0x10, 0x02,        # DLE STX
-            device_id,         # 장치 ID
-            0x1C,              # 상태 조회 명령
-            0xFF, 0x00,        # 파라미터
-            0x10, 0x03,        # DLE ETX
-        ])
+        command = build_status_query(device_id)
 
+        # 응답은 호출 스레드별로 보관 - 동시 전송 중 다른 요청이 덮어쓰지 않음
         self._last_response = None
         success = self.send_command(command)
+        response = self._last_response
 
-        if not success or self._last_response is None:
+        if not success or response is None:
             return None
 
-        return self._parse_status_response(self._last_response)
+        return self._parse_status_response(response)
 
     def _parse_status_response(self, data: bytes) -> Optional[dict]:
-        """상태 조회 응답 파싱"""
-        STATUS_MAP = {
-            '00': {'lock': 'open', 'door': 'closed', 'description': '잠금 해제 (문 닫힘)'},
-            '01': {'lock': 'closed', 'door': 'closed', 'description': '잠금 (문 닫힘)'},
-            '10': {'lock': 'open', 'door': 'open', 'description': '문 열림'},
-        }
-
-        status_code = None
-
-        # SOH 프로토콜: SOH(01) + ASCII 2bytes + DLE(10) + ETX(03)
-        if len(data) >= 5:
-            for i in range(len(data) - 4):
-                if data[i] == 0x01 and data[i+3] == 0x10 and data[i+4] == 0x03:
-                    try:
-                        status_code = data[i+1:i+3].decode('ascii')
-                        break
-                    except (UnicodeDecodeError, ValueError):
-                        pass
-
-        # DLE-STX + 'S' 마커 프로토콜: STX(02) S(53) DeviceID Status1 Status2 DLE(10) ETX(03)
-        if status_code is None and len(data) >= 7:
-            for i in range(len(data) - 6):
-                if data[i] == 0x02 and data[i+1] == 0x53:
-                    try:
-                        status_code = data[i+3:i+5].decode('ascii')
-                        break
-                    except (UnicodeDecodeError, ValueError):
-                        pass
-
-        if status_code is None:
+        """상태 조회 응답 파싱 (SOH 프레임 / STX+'S' 프레임)"""
+        frame = decode_first(data)
+        if frame is None:
             print(f"상태코드 파싱 실패: {data.hex()}")
-            return {
-                'status_code': None,
-                'lock': 'unknown',
-                'door': 'unknown',
-                'description': f'파싱 실패 (raw: {data.hex()})',
-                'raw_data': data.hex()
-            }
-
-        info = STATUS_MAP.get(status_code, {
-            'lock': 'unknown',
-            'door': 'unknown',
-            'description': f'알 수 없는 상태코드: {status_code}'
-        })
-
-        return {
-            'status_code': status_code,
-            'lock': info['lock'],
-            'door': info['door'],
-            'description': info['description'],
-            'raw_data': data.hex()
-        }
+            status = describe_status(None, data)
+        else:
+            status = describe_status(frame.status_code, data)
+        tracing.mark('parsed')
+        return status
 
     def read_status(self) -> Optional[dict]:
-        """잠금장치 상태 읽기"""
+        """
+        잠금장치 상태 읽기 (장치가 스스로 보내는 상태 프레임 수신)
+        수신 버퍼를 purge하지 않음 - 상시 수신 중이면 이벤트 채널에서 대기
+        """
         try:
             if not self.connect():
                 return None
 
-            if sys.platform == 'win32':
-                kernel32.PurgeComm(self._handle, PURGE_RXCLEAR)
-
-                read_buf = (ctypes.c_char * 64)()
-                bytes_read = wintypes.DWORD(0)
-                ov_read = OVERLAPPED()
-                ctypes.memset(ctypes.byref(ov_read), 0, ctypes.sizeof(OVERLAPPED))
-                ov_read.hEvent = self._read_event
-                kernel32.ResetEvent(self._read_event)
-
-                result = kernel32.ReadFile(
-                    self._handle, read_buf, 5,
-                    ctypes.byref(bytes_read), ctypes.byref(ov_read)
-                )
-                if not result:
-                    err = ctypes.get_last_error()
-                    if err == ERROR_IO_PENDING:
-                        kernel32.WaitForSingleObject(
-                            self._read_event, int(self.timeout * 1000)
-                        )
-                        kernel32.GetOverlappedResult(
-                            self._handle, ctypes.byref(ov_read),
-                            ctypes.byref(bytes_read), False
-                        )
-
-                if bytes_read.value >= 5:
-                    data = bytes(read_buf[:bytes_read.value])
-                    if data[0] == 0x01 and data[3] == 0x10 and data[4] == 0x03:
-                        status_code = data[1:3].decode('ascii')
-                        return {
-                            'status': 'open' if status_code == '00' else 'closed',
-                            'status_code': status_code,
-                            'raw_data': data.hex()
-                        }
+            frame = None
+            if self._reader is not None:
+                events = self._reader.subscribe()
+                try:
+                    event = events.get(timeout=self.timeout)
+                    frame = decode_first(bytes.fromhex(event['raw_data']))
+                except queue.Empty:
+                    pass
+                finally:
+                    self._reader.unsubscribe(events)
             else:
-                self.serial_conn.reset_input_buffer()
-                data = self.serial_conn.read(5)
-                if len(data) >= 5:
-                    if data[0] == 0x01 and data[3] == 0x10 and data[4] == 0x03:
-                        status_code = data[1:3].decode('ascii')
-                        return {
-                            'status': 'open' if status_code == '00' else 'closed',
-                            'status_code': status_code,
-                            'raw_data': data.hex()
-                        }
-
-            return None
+                with self._bus_lock:
+                    decoder = FrameDecoder()
+                    deadline = self.clock.monotonic() + self.timeout
+                    while frame is None and self.clock.monotonic() < deadline:
+                        chunk = self._read_chunk()
+                        frames = decoder.feed(chunk)
+                        if frames:
+                            frame = frames[0]
+
+            if frame is None:
+                return None
+            return {
+                'status': 'open' if frame.status_code == '00' else 'closed',
+                'status_code': frame.status_code,
+                'raw_data': frame.raw.hex()
+            }
         except Exception as e:
             print(f"상태 읽기 실패: {e}")
             return None
 
-    def check_id(self) -> Optional[int]:
-        """장치 ID 확인"""
-        try:
-            if not self.connect():
-                return None
+    def probe_status(self, device_ids, wait: float, window: int = 1) -> dict:
+        """
+        여러 장치에 상태 조회를 연속 전송하고 응답 수집 (버스 스캔용, 150ms 대기 없음)
+        window > 1 이면 응답을 기다리지 않고 window개까지 연달아 전송
+        (SOH 응답은 장치 ID가 없으므로 응답에 ID가 실리는 기기에서만 사용)
 
-            if sys.platform == 'win32':
-                read_buf = (ctypes.c_char * 64)()
-                bytes_read = wintypes.DWORD(0)
-                ov_read = OVERLAPPED()
-                ctypes.memset(ctypes.byref(ov_read), 0, ctypes.sizeof(OVERLAPPED))
-                ov_read.hEvent = self._read_event
-                kernel32.ResetEvent(self._read_event)
-
-                kernel32.ReadFile(
-                    self._handle, read_buf, 10,
-                    ctypes.byref(bytes_read), ctypes.byref(ov_read)
-                )
+        Args:
+            device_ids: 조회할 장치 ID 목록
+            wait: 마지막 전송 후 응답을 기다리는 최대 시간 (초)
+            window: 응답 없이 연달아 보낼 수 있는 최대 프레임 수
 
-            return 1
+        Returns:
+            {device_id: (StatusFrame, 응답 지연 초)} - 응답한 장치만 포함
+        """
+        results = {}
+        ids = list(device_ids)
+        if not self.connect():
+            return results
+
+        with self._exclusive():
+            if self._reader is None:
+                for device_id in ids:
+                    started = self.clock.monotonic()
+                    self._last_response = None
+                    self.send_command(build_status_query(device_id), guarded=False)
+                    frame = decode_first(self._last_response) if self._last_response else None
+                    if frame is not None:
+                        results[device_id] = (frame, self.clock.monotonic() - started)
+                return results
+
+            window = max(1, window)
+            for i in range(0, len(ids), window):
+                sent = []
+                for device_id in ids[i:i + window]:
+                    command = build_status_query(device_id)
+                    if self.append_cr:
+                        command = command + bytes([0x0D])
+                    pending = self._reader.expect(device_id)
+                    started = self.clock.monotonic()
+                    if not self._write(command):
+                        self._reader.cancel(pending)
+                        continue
+                    sent.append((pending, started))
+
+                deadline = self.clock.monotonic() + wait
+                for pending, started in sent:
+                    frame = pending.wait(max(0.0, deadline - self.clock.monotonic()))
+                    self._reader.cancel(pending)
+                    if frame is not None:
+                        results[pending.device_id] = (frame, pending.resolved_at - started)
+        return results
+
+    def check_id(self, device_ids=range(1, 255)) -> Optional[int]:
+        """장치 ID 확인 - 상태 조회에 응답하는 첫 번째 장치 ID (없으면 None)"""
+        try:
+            for device_id in device_ids:
+                if self.probe_status([device_id], COMMAND_REPLY_WINDOW):
+                    return device_id
+            return None
         except Exception as e:
             print(f"ID 확인 실패: {e}")
             return None
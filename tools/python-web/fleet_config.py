@@ -0,0 +1,281 @@
+"""
+Fleet Config Module
+설정 파일(JSON)로 포트/장치 구성을 선언하고, 파일 변경 시 실행 중인 구성과 비교해 반영하는 모듈
+- 시리얼 파라미터(baudrate, timeout)가 바뀐 포트만 컨트롤러 재시작
+- append_cr, 장치 목록, 장치별 타임아웃, 동시 전송 창, 그룹 변경은 연결 유지한 채 반영
+
+설정 예시 (fleet.example.json 참고):
+    {
+      "default_port": "COM2",
+      "ports": {
+        "COM2": {"baudrate": 9600, "timeout": 1, "append_cr": false,
+                 "devices": [1, 2, 3], "device_timeouts": {"3": 2.0},
+                 "pipeline_window": 4, "stop_and_wait": [3]}
+      },
+      "groups": {"lobby": ["COM2:1", "COM2:2"]},
+      "clients": {"kiosk-1": {"weight": 2}}
+    }
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from bus_scanner import ALL_DEVICE_IDS
+
+
+class PortConfig(NamedTuple):
+    port: str
+    baudrate: int = 9600
+    timeout: float = 1
+    append_cr: bool = False
+    devices: Tuple[int, ...] = (1,)
+    device_timeouts: Tuple[Tuple[int, float], ...] = ()
+    pipeline_window: int = 1             # 응답 대기 중 프레임 최대 수 (1 = 한 번에 하나)
+    stop_and_wait: Tuple[int, ...] = ()  # 동시 전송하지 않을 장치
+
+    def connection_params(self) -> tuple:
+        """바뀌면 재연결이 필요한 파라미터"""
+        return (self.baudrate, self.timeout)
+
+
+class FleetConfig(NamedTuple):
+    default_port: str = 'COM2'
+    ports: Dict[str, PortConfig] = {}
+    groups: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+    client_weights: Dict[str, float] = {}  # X-Client-Id -> 버스 공정 분배 가중치
+
+    def group_members(self, name: str) -> List[Tuple[str, int]]:
+        return list(self.groups.get(name, ()))
+
+
+def _device_id(value) -> int:
+    device_id = int(value)
+    if device_id not in ALL_DEVICE_IDS:
+        raise ValueError(f'장치 ID는 1~254 사이여야 합니다: {value}')
+    return device_id
+
+
+def parse_config(data: dict) -> FleetConfig:
+    """설정 dict 검증 후 FleetConfig 생성 (잘못된 값이면 ValueError)"""
+    ports = {}
+    for port, raw in (data.get('ports') or {}).items():
+        timeouts = raw.get('device_timeouts') or {}
+        ports[port] = PortConfig(
+            port=port,
+            baudrate=int(raw.get('baudrate', 9600)),
+            timeout=float(raw.get('timeout', 1)),
+            append_cr=bool(raw.get('append_cr', False)),
+            devices=tuple(sorted({_device_id(d) for d in raw.get('devices', [1])})),
+            device_timeouts=tuple(sorted((_device_id(d), float(t)) for d, t in timeouts.items())),
+            pipeline_window=max(1, int(raw.get('pipeline_window', 1))),
+            stop_and_wait=tuple(sorted({_device_id(d) for d in raw.get('stop_and_wait', [])})),
+        )
+
+    groups = {}
+    for name, members in (data.get('groups') or {}).items():
+        parsed = []
+        for member in members:
+            port, _, device = str(member).rpartition(':')
+            if port not in ports:
+                raise ValueError(f'그룹 {name}: 설정에 없는 포트 {port!r}')
+            parsed.append((port, _device_id(device)))
+        groups[name] = tuple(parsed)
+
+    client_weights = {}
+    for client, raw in (data.get('clients') or {}).items():
+        weight = float(raw.get('weight', 1.0))
+        if weight <= 0:
+            raise ValueError(f'클라이언트 {client}: weight는 0보다 커야 합니다')
+        client_weights[client] = weight
+
+    default_port = data.get('default_port') or (next(iter(ports)) if ports else 'COM2')
+    return FleetConfig(default_port=default_port, ports=ports, groups=groups, client_weights=client_weights)
+
+
+def load_config(path: str) -> FleetConfig:
+    with open(path, encoding='utf-8') as f:
+        return parse_config(json.load(f))
+
+
+class ControllerRegistry:
+    """포트별 DoorLockController 모음 - 설정 변경을 diff로 반영"""
+
+    def __init__(self, factory: Callable[[PortConfig], object]):
+        """
+        Args:
+            factory: PortConfig로 컨트롤러를 만드는 함수
+        """
+        self.factory = factory
+        self.config = FleetConfig()
+        self._lock = threading.RLock()
+        self._controllers = {}
+        self._retiring = {}   # port -> Event (이전 컨트롤러가 포트를 놓으면 set)
+        self._listeners = []  # (port, old_controller) - 컨트롤러가 교체/제거될 때 호출
+
+    def add_listener(self, listener: Callable[[str, object], None]):
+        self._listeners.append(listener)
+
+    @property
+    def default_port(self) -> str:
+        return self.config.default_port
+
+    def ports(self) -> List[str]:
+        with self._lock:
+            return list(self._controllers)
+
+    def known(self, port: str) -> bool:
+        """설정 파일에 있는 포트 또는 기본 포트인지 (요청으로 임의 포트를 열지 않도록)"""
+        config = self.config
+        return port == config.default_port or port in config.ports
+
+    def port_config(self, port: str) -> PortConfig:
+        return self.config.ports.get(port) or PortConfig(port=port)
+
+    def get(self, port: Optional[str] = None):
+        """포트 컨트롤러 (설정에 없는 포트는 기본값으로 생성)"""
+        port = port or self.config.default_port
+        with self._lock:
+            ctrl = self._controllers.get(port)
+            if ctrl is None:
+                ctrl = self._create(self.port_config(port))
+                self._controllers[port] = ctrl
+            retiring = self._retiring.get(port)
+        # 재시작 중인 포트는 이전 연결이 닫힐 때까지 대기 (다른 포트는 영향 없음)
+        if retiring is not None:
+            retiring.wait()
+        return ctrl
+
+    def set_default_port(self, port: str):
+        with self._lock:
+            self.config = self.config._replace(default_port=port)
+        return self.get(port)
+
+    def _create(self, cfg: PortConfig):
+        ctrl = self.factory(cfg)
+        self._configure(ctrl, cfg)
+        return ctrl
+
+    @staticmethod
+    def _configure(ctrl, cfg: PortConfig):
+        """연결 유지한 채 바꿀 수 있는 항목 반영"""
+        ctrl.append_cr = cfg.append_cr
+        ctrl.device_timeouts = dict(cfg.device_timeouts)
+        ctrl.pipeline_window = cfg.pipeline_window
+        ctrl.stop_and_wait = set(cfg.stop_and_wait)
+
+    def _retire(self, port: str, ctrl):
+        for listener in self._listeners:
+            try:
+                listener(port, ctrl)
+            except Exception as e:
+                print(f"[CONFIG] 리스너 오류: {e}")
+        # disconnect는 진행 중인 명령이 끝날 때까지 기다림
+        ctrl.disconnect()
+
+    def apply(self, config: FleetConfig) -> dict:
+        """
+        새 설정 반영 - 바뀐 포트만 재시작
+
+        Returns:
+            {'added': [...], 'removed': [...], 'restarted': [...], 'updated': [...]}
+        """
+        report = {'added': [], 'removed': [], 'restarted': [], 'updated': []}
+        retired = []
+        with self._lock:
+            old = self.config
+            for port, cfg in config.ports.items():
+                ctrl = self._controllers.get(port)
+                if ctrl is None:
+                    self._controllers[port] = self._create(cfg)
+                    report['added'].append(port)
+                    continue
+                before = old.ports.get(port) or PortConfig(port=port, baudrate=ctrl.baudrate, timeout=ctrl.timeout)
+                if before.connection_params() != cfg.connection_params():
+                    self._controllers[port] = self._create(cfg)
+                    self._retiring[port] = threading.Event()
+                    retired.append((port, ctrl))
+                    report['restarted'].append(port)
+                elif before != cfg:
+                    self._configure(ctrl, cfg)
+                    report['updated'].append(port)
+
+            # 설정에서 빠진 포트 (기본 포트는 유지)
+            for port in list(self._controllers):
+                if port in old.ports and port not in config.ports and port != config.default_port:
+                    retired.append((port, self._controllers.pop(port)))
+                    report['removed'].append(port)
+
+            self.config = config
+
+        for port, ctrl in retired:
+            self._retire(port, ctrl)
+            with self._lock:
+                retiring = self._retiring.pop(port, None)
+            if retiring is not None:
+                retiring.set()
+
+        if any(report.values()):
+            print(f"[CONFIG] 설정 반영: {report}")
+        return report
+
+    def close_all(self):
+        with self._lock:
+            controllers = list(self._controllers.items())
+            self._controllers.clear()
+        for port, ctrl in controllers:
+            self._retire(port, ctrl)
+
+
+class ConfigWatcher:
+    """설정 파일 변경 감시 (mtime 폴링) → ControllerRegistry.apply"""
+
+    def __init__(self, path: str, registry: ControllerRegistry, interval: float = 2.0):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._mtime = None
+        self._running = False
+        self._thread = None
+        self.last_report = None
+        self.last_error = None
+        self.reloads = 0
+
+    def reload(self, force: bool = False) -> Optional[dict]:
+        """파일이 바뀌었으면(또는 force) 다시 읽어 반영 - 실패 시 기존 설정 유지"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if not force and mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            config = load_config(self.path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.last_error = str(e)
+            print(f"[CONFIG] 설정 파일 오류 (기존 설정 유지): {e}")
+            return None
+        self.last_error = None
+        self.last_report = self.registry.apply(config)
+        self.reloads += 1
+        return self.last_report
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        self._thread = None
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            self.reload()
@@ -0,0 +1,192 @@
+"""
+Fleet State Module
+전체 잠금장치의 최근 상태를 작은 메모리로 보관하고 대시보드용 일괄 스냅샷을 제공하는 모듈
+- 장치 1대 = 행 1개, 열은 array 기반 (상태코드/잠금/문 enum, 마지막 수신 ns, 성공/오류 횟수)
+- 키는 (포트 번호 << 8) | 장치 ID 정수 - 장치마다 dict/문자열을 만들지 않음
+- 상태/오류가 바뀔 때만 version 증가 → 스냅샷 JSON(열 단위)은 version이 같으면 미리 만든 바이트 재사용 (ETag)
+- 상태 변화 없이 수신 시각만 바뀐 경우는 seen_refresh초마다 한 번만 새 스냅샷
+"""
+import gzip
+import json
+import threading
+import time
+from array import array
+from typing import Dict, Optional, Tuple
+
+from frame_codec import STATUS_MAP
+
+# 잠금/문 enum (0 = 알 수 없음)
+UNKNOWN = 0
+OPEN = 1
+CLOSED = 2
+_STATE_NAMES = ('unknown', 'open', 'closed')
+_STATE_VALUES = {'open': OPEN, 'closed': CLOSED}
+
+
+class FleetStateTable:
+    def __init__(self, seen_refresh: float = 5.0, gzip_min_bytes: int = 1024):
+        """
+        Args:
+            seen_refresh: 상태 변화 없이 수신 시각만 바뀌었을 때 스냅샷을 새로 만드는 최소 간격 (초)
+            gzip_min_bytes: 이 크기 이상인 스냅샷은 gzip 본문도 미리 만들어 둠
+        """
+        self.seen_refresh = seen_refresh
+        self.gzip_min_bytes = gzip_min_bytes
+        self._lock = threading.Lock()
+        self._ports = []            # 포트 번호 -> 포트 이름
+        self._port_index = {}       # 포트 이름 -> 번호
+        self._codes = [None]        # 상태코드 번호 -> 상태코드 (0 = 없음)
+        self._code_index = {}
+        self._rows = {}             # (포트 번호 << 8) | 장치 ID -> 행 번호
+        self._keys = array('l')
+        self._code = array('B')
+        self._lock_state = array('B')
+        self._door = array('B')
+        self._seen_ns = array('q')  # time.time_ns (0 = 수신 없음)
+        self._ok = array('L')
+        self._errors = array('L')
+        self.version = 0
+        self._seen_dirty = False    # version 변경 없이 수신 시각만 바뀜
+        self._cache = {}            # port(None=전체) -> (version, 생성 시각, etag, body, gzip body)
+        self.stats = {'updates': 0, 'errors': 0, 'builds': 0, 'cache_hits': 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _row(self, port: str, device_id: int) -> int:
+        """행 번호 (없으면 추가, self._lock 보유 상태)"""
+        port_no = self._port_index.get(port)
+        if port_no is None:
+            port_no = self._port_index[port] = len(self._ports)
+            self._ports.append(port)
+        key = (port_no << 8) | device_id
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._code.append(0)
+            self._lock_state.append(UNKNOWN)
+            self._door.append(UNKNOWN)
+            self._seen_ns.append(0)
+            self._ok.append(0)
+            self._errors.append(0)
+            self.version += 1
+        return row
+
+    def _code_no(self, status_code: str) -> int:
+        code_no = self._code_index.get(status_code)
+        if code_no is None:
+            code_no = self._code_index[status_code] = len(self._codes)
+            self._codes.append(status_code)
+        return code_no
+
+    def update(self, port: str, device_id: int, status_code: Optional[str], now_ns: Optional[int] = None):
+        """상태 수신 1건 반영 (status_code가 None이면 오류로 집계)"""
+        if status_code is None:
+            self.record_error(port, device_id)
+            return
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        with self._lock:
+            row = self._row(port, device_id)
+            code_no = self._code_no(status_code)
+            if self._code[row] != code_no:
+                info = STATUS_MAP.get(status_code) or {}
+                self._code[row] = code_no
+                self._lock_state[row] = _STATE_VALUES.get(info.get('lock'), UNKNOWN)
+                self._door[row] = _STATE_VALUES.get(info.get('door'), UNKNOWN)
+                self.version += 1
+            else:
+                self._seen_dirty = True
+            self._seen_ns[row] = now_ns
+            self._ok[row] += 1
+            self.stats['updates'] += 1
+
+    def record_error(self, port: str, device_id: int):
+        """응답 없음 / 파싱 실패"""
+        with self._lock:
+            row = self._row(port, device_id)
+            self._errors[row] += 1
+            self.version += 1
+            self.stats['errors'] += 1
+
+    def get(self, port: str, device_id: int) -> Optional[dict]:
+        with self._lock:
+            port_no = self._port_index.get(port)
+            row = None if port_no is None else self._rows.get((port_no << 8) | device_id)
+            if row is None:
+                return None
+            values = {name: column[0] for name, column in self._columns([row]).items()}
+        values['port'] = port
+        return values
+
+    def _columns(self, rows: Optional[list]) -> dict:
+        """열 단위 목록 (rows=None이면 전체 행, self._lock 보유 상태)"""
+        def pick(column):
+            return column.tolist() if rows is None else [column[row] for row in rows]
+
+        names = _STATE_NAMES
+        codes = self._codes
+        return {
+            'port': [key >> 8 for key in pick(self._keys)],
+            'device_id': [key & 0xFF for key in pick(self._keys)],
+            'status_code': [codes[c] for c in pick(self._code)],
+            'lock': [names[v] for v in pick(self._lock_state)],
+            'door': [names[v] for v in pick(self._door)],
+            'last_seen': [round(ns / 1e9, 3) if ns else None for ns in pick(self._seen_ns)],
+            'ok': pick(self._ok),
+            'errors': pick(self._errors),
+        }
+
+    def serialized(self, port: Optional[str] = None) -> Tuple[str, bytes, Optional[bytes]]:
+        """
+        일괄 스냅샷 - (etag, JSON 바이트, gzip 바이트 또는 None)
+        열 단위 형식: {"ports": [포트 이름], "columns": {"port": [포트 번호], "device_id": [...], ...}}
+        version이 그대로면 이전에 만든 바이트를 그대로 반환
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._seen_dirty:
+                cached = self._cache.get(port)
+                if cached is None or now - cached[1] >= self.seen_refresh:
+                    self.version += 1
+                    self._seen_dirty = False
+            version = self.version
+            cached = self._cache.get(port)
+            if cached is not None and cached[0] == version:
+                self.stats['cache_hits'] += 1
+                return cached[2], cached[3], cached[4]
+
+            port_no = self._port_index.get(port) if port is not None else None
+            rows = None
+            if port is not None:
+                rows = [row for row, key in enumerate(self._keys) if key >> 8 == port_no]
+            columns = self._columns(rows)
+            ports = list(self._ports)
+            self.stats['builds'] += 1
+
+        count = len(columns['device_id'])
+        body = json.dumps({
+            'version': version,
+            'generated': round(time.time(), 3),
+            'count': count,
+            'ports': ports,
+            'columns': columns,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = gzip.compress(body, compresslevel=5) if len(body) >= self.gzip_min_bytes else None
+        etag = f'{version}-{count}' if port is None else f'{version}-{count}-{port_no}'
+        if port is not None and port_no is None:
+            return etag, body, compressed  # 모르는 포트는 캐시하지 않음
+        with self._lock:
+            current = self._cache.get(port)
+            if current is None or current[0] <= version:
+                self._cache[port] = (version, now, etag, body, compressed)
+        return etag, body, compressed
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            rows = len(self._keys)
+            nbytes = sum(a.itemsize * len(a) for a in (
+                self._keys, self._code, self._lock_state, self._door, self._seen_ns, self._ok, self._errors
+            ))
+            cached = sum(len(c[3]) + len(c[4] or b'') for c in self._cache.values())
+        return dict(self.stats, rows=rows, version=self.version, column_bytes=nbytes, cached_bytes=cached)
@@ -0,0 +1,192 @@
+"""
+Frame Codec Module
+잠금장치 프레임 생성 및 수신 바이트 스트림 디코딩 모듈
+- 송신: DLE(10) STX(02) [DeviceID] [Cmd...] DLE(10) ETX(03)
+- 수신: SOH 프레임 / STX+'S' 프레임 (연속 스트림에서 잘린 프레임, 노이즈 처리)
+"""
+from typing import List, NamedTuple, Optional
+
+DLE = 0x10
+STX = 0x02
+ETX = 0x03
+SOH = 0x01
+ESC = 0x1B
+STATUS_QUERY = 0x1C
+STATUS_MARKER = 0x53  # 'S'
+
+SOH_FRAME_LEN = 5     # SOH + ASCII 2bytes + DLE + ETX
+MARKER_FRAME_LEN = 7  # STX + 'S' + DeviceID + ASCII 2bytes + DLE + ETX
+COMMAND_FRAME_LEN = 8  # DLE + STX + DeviceID + Cmd + Param 2bytes + DLE + ETX (송신 에코)
+
+BITS_PER_BYTE = 10    # 8N1: start 1 + data 8 + stop 1
+
+STATUS_MAP = {
+    '00': {'lock': 'open', 'door': 'closed', 'description': '잠금 해제 (문 닫힘)'},
+    '01': {'lock': 'closed', 'door': 'closed', 'description': '잠금 (문 닫힘)'},
+    '10': {'lock': 'open', 'door': 'open', 'description': '문 열림'},
+}
+
+
+class StatusFrame(NamedTuple):
+    """수신된 상태 프레임 (SOH 프레임은 장치 ID가 없으므로 device_id=None)"""
+    device_id: Optional[int]
+    status_code: str
+    raw: bytes
+
+
+def build_frame(device_id: int, command_char: str, param: int = 0xFF) -> bytes:
+    """
+    DLE-STX 명령 프레임 생성
+    프레임: DLE(10) STX(02) [DeviceID] [ESC(1B)] [Command] [Param] DLE(10) ETX(03)
+    """
+    return bytes([
+        DLE, STX,                      # DLE STX (프레임 시작)
+        device_id,                     # 장치 ID
+        ESC,                           # ESC
+        ord(command_char),             # '1'=열기(0x31), '0'=닫기(0x30)
+        param,                         # 파라미터 (0xFF=일반, 0x31=5초 자동잠금)
+        DLE, ETX,                      # DLE ETX (프레임 끝)
+    ])
+
+
+def build_status_query(device_id: int) -> bytes:
+    """상태 조회 프레임 생성: 10 02 [DeviceID] 1C FF 00 10 03"""
+    return bytes([DLE, STX, device_id, STATUS_QUERY, 0xFF, 0x00, DLE, ETX])
+
+
+def wire_time(nbytes: int, baudrate: int = 9600) -> float:
+    """nbytes가 선로를 지나는 시간 (초)"""
+    return nbytes * BITS_PER_BYTE / baudrate
+
+
+def frame_device_id(command: bytes) -> Optional[int]:
+    """송신 프레임에서 대상 장치 ID 추출 (DLE-STX 프레임이 아니면 None)"""
+    if len(command) >= 3 and command[0] == DLE and command[1] == STX:
+        return command[2]
+    return None
+
+
+def _ascii_code(hi: int, lo: int) -> Optional[str]:
+    if hi < 0x80 and lo < 0x80:
+        return chr(hi) + chr(lo)
+    return None
+
+
+class FrameDecoder:
+    """
+    연속 수신 스트림 디코더
+    feed()로 들어온 바이트를 누적하고 완성된 상태 프레임만 반환
+    (프레임 사이 노이즈는 버리고, 잘린 프레임은 다음 feed까지 보관)
+    RS-485 송신 에코(우리가 보낸 명령 프레임)는 통째로 건너뜀 -
+    예: 장치 0x53 대상 5초 열기 에코 10 02 53 1B 31 31 10 03 을 상태 프레임으로 오인하지 않도록
+    """
+
+    def __init__(self, max_buffer: int = 4096):
+        self._buf = bytearray()
+        self._max_buffer = max_buffer
+        self.frames = 0           # 디코딩된 프레임 수
+        self.echoes = 0           # 건너뛴 송신 에코 프레임 수
+        self.discarded_bytes = 0  # 버려진 노이즈/에코 바이트 수
+
+    @property
+    def buffered(self) -> int:
+        """다음 feed를 기다리는 잔여 바이트 수"""
+        return len(self._buf)
+
+    def reset(self):
+        """보관 중인 잔여 바이트 폐기"""
+        self.discarded_bytes += len(self._buf)
+        self._buf.clear()
+
+    def feed(self, data: bytes) -> List[StatusFrame]:
+        """수신 바이트 추가 후 완성된 프레임 목록 반환"""
+        buf = self._buf
+        buf += data
+        frames = []
+        n = len(buf)
+        i = 0
+        while i < n:
+            b = buf[i]
+            if b == DLE:
+                if n - i < 2:
+                    break
+                if buf[i + 1] == STX:
+                    if n - i < 4:
+                        break
+                    if buf[i + 3] not in (ESC, STATUS_QUERY):
+                        i += 1
+                        continue
+                    if n - i < COMMAND_FRAME_LEN:
+                        break
+                    if buf[i + 6] == DLE and buf[i + 7] == ETX:
+                        # 'S' 마커 + 알려진 상태코드면 상태 프레임으로 처리 (장치 ID가 1B/1C인 응답)
+                        if not (buf[i + 2] == STATUS_MARKER
+                                and _ascii_code(buf[i + 4], buf[i + 5]) in STATUS_MAP):
+                            self.echoes += 1
+                            i += COMMAND_FRAME_LEN
+                            continue
+            elif b == SOH:
+                if n - i < SOH_FRAME_LEN:
+                    break
+                if buf[i + 3] == DLE and buf[i + 4] == ETX:
+                    code = _ascii_code(buf[i + 1], buf[i + 2])
+                    if code is not None:
+                        frames.append(StatusFrame(None, code, bytes(buf[i:i + SOH_FRAME_LEN])))
+                        i += SOH_FRAME_LEN
+                        continue
+            elif b == STX:
+                if n - i < 2:
+                    break
+                if buf[i + 1] == STATUS_MARKER:
+                    if n - i < MARKER_FRAME_LEN:
+                        break
+                    if buf[i + 5] == DLE and buf[i + 6] == ETX:
+                        code = _ascii_code(buf[i + 3], buf[i + 4])
+                        if code is not None:
+                            frames.append(StatusFrame(buf[i + 2], code, bytes(buf[i:i + MARKER_FRAME_LEN])))
+                            i += MARKER_FRAME_LEN
+                            continue
+            i += 1
+
+        # 처리 완료분 제거 (프레임 외 바이트는 노이즈로 집계)
+        consumed = sum(len(f.raw) for f in frames)
+        self.discarded_bytes += i - consumed
+        del buf[:i]
+        if len(buf) > self._max_buffer:
+            self.discarded_bytes += len(buf)
+            buf.clear()
+
+        self.frames += len(frames)
+        return frames
+
+
+def decode_first(data: bytes) -> Optional[StatusFrame]:
+    """단일 응답 버퍼에서 첫 번째 상태 프레임 추출"""
+    frames = FrameDecoder().feed(data)
+    return frames[0] if frames else None
+
+
+def describe_status(status_code: Optional[str], raw: bytes) -> dict:
+    """상태코드를 API 응답용 dict로 변환"""
+    if status_code is None:
+        return {
+            'status_code': None,
+            'lock': 'unknown',
+            'door': 'unknown',
+            'description': f'파싱 실패 (raw: {raw.hex()})',
+            'raw_data': raw.hex()
+        }
+
+    info = STATUS_MAP.get(status_code, {
+        'lock': 'unknown',
+        'door': 'unknown',
+        'description': f'알 수 없는 상태코드: {status_code}'
+    })
+
+    return {
+        'status_code': status_code,
+        'lock': info['lock'],
+        'door': info['door'],
+        'description': info['description'],
+        'raw_data': raw.hex()
+    }
@@ -0,0 +1,193 @@
+"""
+Codec Fuzz Harness
+FrameDecoder 속성 기반 퍼즈 테스트
+- 정답이 알려진 스트림(프레임 + 노이즈 + 명령 에코)을 임의 경계로 잘라 공급 → 정확히 같은 프레임만 나와야 함
+- 완전 임의 바이트 공급 → 예외 없음 + 출력 프레임은 입력에 실제로 존재하는 구조여야 함
+- corpus/codec_corpus.jsonl 의 저장된 케이스를 먼저 재생
+
+사용법:
+    python fuzz_codec.py                 # corpus + 임의 케이스 2000개
+    python fuzz_codec.py --cases 50000 --seed 7
+    python fuzz_codec.py --save-failures # 실패 케이스를 corpus에 추가
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import List, Tuple
+
+from frame_codec import (
+    DLE, ETX, SOH, STX, STATUS_MARKER, FrameDecoder, build_frame, build_status_query,
+)
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'codec_corpus.jsonl')
+
+STATUS_CODES = ['00', '01', '10']
+# SOH/STX는 프레임 시작 바이트이므로 정답 스트림의 노이즈에서는 제외
+NOISE_BYTES = bytes(b for b in range(256) if b not in (SOH, STX))
+
+Expected = List[Tuple[object, str]]
+
+
+def soh_frame(code: str) -> bytes:
+    return bytes([SOH]) + code.encode('ascii') + bytes([DLE, ETX])
+
+
+def marker_frame(device_id: int, code: str) -> bytes:
+    return bytes([STX, STATUS_MARKER, device_id]) + code.encode('ascii') + bytes([DLE, ETX])
+
+
+def generate_stream(rng: random.Random, items: int = 20) -> Tuple[bytes, Expected]:
+    """정답이 알려진 수신 스트림 생성 - (바이트, [(device_id, status_code), ...])"""
+    out = bytearray()
+    expected = []
+    for _ in range(items):
+        kind = rng.random()
+        if kind < 0.35:
+            code = rng.choice(STATUS_CODES)
+            out += soh_frame(code)
+            expected.append((None, code))
+        elif kind < 0.6:
+            device_id = rng.randint(1, 254)
+            code = rng.choice(STATUS_CODES)
+            out += marker_frame(device_id, code)
+            expected.append((device_id, code))
+        elif kind < 0.8:
+            # RS-485 에코: 송신 명령 프레임 (DLE와 같은 값의 장치 ID 포함)
+            device_id = rng.choice([1, 2, 3, DLE, rng.randint(1, 254)])
+            out += rng.choice([
+                build_status_query(device_id),
+                build_frame(device_id, '1'),
+                build_frame(device_id, '0'),
+                build_frame(device_id, '1', param=0x31),
+            ])
+        elif kind < 0.9:
+            # DLE 이중화(escape)된 노이즈 구간
+            out += bytes([DLE, DLE]) * rng.randint(1, 3) + bytes([ETX])
+        else:
+            out += bytes(rng.choice(NOISE_BYTES) for _ in range(rng.randint(1, 12)))
+    return bytes(out), expected
+
+
+def split_chunks(rng: random.Random, data: bytes, max_chunk: int = 16) -> List[bytes]:
+    """임의 경계로 분할 (프레임이 여러 read에 걸쳐 들어오는 상황)"""
+    chunks = []
+    i = 0
+    while i < len(data):
+        n = rng.randint(1, max_chunk)
+        chunks.append(data[i:i + n])
+        i += n
+    return chunks
+
+
+def decode_chunks(chunks: List[bytes]) -> Expected:
+    decoder = FrameDecoder()
+    frames = []
+    for chunk in chunks:
+        frames.extend((f.device_id, f.status_code) for f in decoder.feed(chunk))
+    return frames
+
+
+def check_exact(chunks: List[bytes], expected: Expected) -> str:
+    """정답 스트림: 프레임 순서/장치/상태가 정확히 일치해야 함"""
+    got = decode_chunks(chunks)
+    if got != [tuple(e) for e in expected]:
+        return f'expected {expected}, got {got}'
+    return ''
+
+
+def check_sound(chunks: List[bytes]) -> str:
+    """임의 스트림: 출력 프레임이 입력에 순서대로 실제 존재하고 구조가 맞아야 함"""
+    data = b''.join(chunks)
+    decoder = FrameDecoder()
+    pos = 0
+    for chunk in chunks:
+        for frame in decoder.feed(chunk):
+            raw = frame.raw
+            at = data.find(raw, pos)
+            if at < 0:
+                return f'frame {raw.hex()} not found after offset {pos}'
+            pos = at + len(raw)
+            if raw[0] == SOH:
+                ok = len(raw) == 5 and frame.device_id is None and raw[3:] == bytes([DLE, ETX])
+            else:
+                ok = (len(raw) == 7 and raw[1] == STATUS_MARKER and frame.device_id == raw[2]
+                      and raw[5:] == bytes([DLE, ETX]))
+            if not ok:
+                return f'malformed frame {raw.hex()} (device_id={frame.device_id})'
+    return ''
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    cases = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    cases.append(json.loads(line))
+    return cases
+
+
+def run_case(case: dict) -> str:
+    chunks = [bytes.fromhex(c) for c in case['chunks']]
+    try:
+        if case.get('frames') is None:
+            return check_sound(chunks)
+        return check_exact(chunks, case['frames'])
+    except Exception as e:
+        return f'exception: {e!r}'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='FrameDecoder fuzz harness')
+    parser.add_argument('--cases', type=int, default=2000, help='임의 케이스 수')
+    parser.add_argument('--seed', type=int, default=None, help='재현용 시드')
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='corpus 파일 경로')
+    parser.add_argument('--save-failures', action='store_true', help='실패 케이스를 corpus에 추가')
+    args = parser.parse_args()
+
+    failures = []
+
+    corpus = load_corpus(args.corpus)
+    for case in corpus:
+        error = run_case(case)
+        if error:
+            failures.append((case, error))
+
+    seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+    rng = random.Random(seed)
+    for n in range(args.cases):
+        if n % 2 == 0:
+            data, expected = generate_stream(rng, items=rng.randint(1, 30))
+            case = {'name': f'seed{seed}-{n}', 'chunks': [c.hex() for c in split_chunks(rng, data)],
+                    'frames': expected}
+        else:
+            data = bytes(rng.randrange(256) for _ in range(rng.randint(0, 200)))
+            case = {'name': f'seed{seed}-{n}', 'chunks': [c.hex() for c in split_chunks(rng, data)],
+                    'frames': None}
+        error = run_case(case)
+        if error:
+            failures.append((case, error))
+
+    for case, error in failures[:10]:
+        print(f"[FUZZ] 실패 {case['name']}: {error}")
+
+    if failures and args.save_failures:
+        with open(args.corpus, 'a', encoding='utf-8') as f:
+            for case, _ in failures:
+                if case not in corpus:
+                    f.write(json.dumps(case) + '\n')
+
+    print(json.dumps({
+        'seed': seed,
+        'corpus_cases': len(corpus),
+        'random_cases': args.cases,
+        'failures': len(failures),
+    }))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
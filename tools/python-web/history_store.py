@@ -0,0 +1,243 @@
+"""
+History Store Module
+명령 결과와 문 상태 변화를 SQLite(WAL)에 기록하고 기간/장치별로 조회하는 모듈
+- record*()는 큐에 넣기만 함 (명령 처리 경로를 막지 않음, 큐가 가득 차면 버리고 집계)
+- 백그라운드 writer가 모아서 트랜잭션 1번으로 저장
+- 인덱스: (port, device_id, time), (type, time)
+- 보관 기간이 지난 기록은 주기적으로 나눠서 삭제
+"""
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+COMMAND = 'command'
+TRANSITION = 'transition'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    port TEXT NOT NULL,
+    device_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    type TEXT NOT NULL,
+    outcome TEXT,
+    client TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_device_time ON events (port, device_id, time);
+CREATE INDEX IF NOT EXISTS idx_events_type_time ON events (type, time);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (time);
+"""
+
+_COLUMNS = ('id', 'time', 'port', 'device_id', 'category', 'type', 'outcome', 'client', 'detail')
+
+
+class HistoryStore:
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue: int = 10000, retention_days: Optional[float] = 180,
+                 compact_interval: float = 3600):
+        """
+        Args:
+            path: SQLite 파일 경로
+            batch_size: 트랜잭션 1번에 저장할 최대 기록 수
+            flush_interval: 기록이 적을 때 저장 주기 (초)
+            max_queue: 저장 대기 최대 기록 수 (초과 시 버림)
+            retention_days: 보관 기간 (None이면 삭제 안 함)
+            compact_interval: 보관 기간 정리 주기 (초)
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self._queue = collections.deque()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._lock = threading.Lock()  # writer 스레드 시작/정지
+        self._running = False
+        self._thread = None
+        self._last_compact = time.monotonic()
+        self.stats = {'written': 0, 'dropped': 0, 'batches': 0, 'compacted': 0, 'write_errors': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 연결 (WAL: 읽기는 쓰기를 기다리지 않음)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    # --- 기록 ---
+
+    def record(self, port: str, device_id: int, category: str, type_: str,
+               outcome: Optional[str] = None, client: Optional[str] = None, **detail):
+        """기록 1건 추가 (저장은 writer 스레드에서)"""
+        if len(self._queue) >= self.max_queue:
+            self.stats['dropped'] += 1
+            return
+        self._queue.append((
+            time.time(), port, device_id, category, type_, outcome, client,
+            json.dumps(detail, ensure_ascii=False) if detail else None,
+        ))
+        if not self._running:
+            self.start()
+        elif len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def record_command(self, port: str, device_id: int, action: str, outcome: str,
+                       client: Optional[str] = None, **detail):
+        """명령 결과 (outcome: ok / failed / queued)"""
+        self.record(port, device_id, COMMAND, action, outcome, client, **detail)
+
+    def record_transition(self, transition):
+        """DoorTransition (TransitionDetector 리스너로 등록)"""
+        self.record(
+            transition.port, transition.device_id, TRANSITION, transition.kind, transition.current,
+            previous=transition.previous,
+        )
+
+    def flush(self) -> int:
+        """대기 중인 기록 저장 - 저장한 수 반환"""
+        total = 0
+        conn = self._connect()
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            try:
+                with conn:
+                    conn.executemany(
+                        'INSERT INTO events (time, port, device_id, category, type, outcome, client, detail) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch
+                    )
+            except sqlite3.Error as e:
+                self.stats['write_errors'] += 1
+                print(f"[HISTORY] 저장 실패: {e}")
+                return total
+            total += len(batch)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        return total
+
+    # --- 조회 ---
+
+    def query(self, port: Optional[str] = None, device_id: Optional[int] = None,
+              type_: Optional[str] = None, category: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        최신순 조회
+
+        Args:
+            since, until: epoch 초 범위 [since, until)
+            cursor: 이전 조회의 next_cursor ("time:id")
+
+        Returns:
+            (기록 목록, 다음 페이지 cursor 또는 None)
+        """
+        where, params = [], []
+        for column, value in (('port', port), ('device_id', device_id), ('type', type_), ('category', category)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            where.append('time >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('time < ?')
+            params.append(until)
+        if cursor:
+            cursor_time, _, cursor_id = cursor.partition(':')
+            where.append('(time < ? OR (time = ? AND id < ?))')
+            params += [float(cursor_time), float(cursor_time), int(cursor_id)]
+
+        sql = f'SELECT {", ".join(_COLUMNS)} FROM events'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY time DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        events = []
+        for row in rows[:limit]:
+            event = dict(zip(_COLUMNS, row))
+            event['detail'] = json.loads(event['detail']) if event['detail'] else {}
+            events.append(event)
+        next_cursor = None
+        if len(rows) > limit:
+            last = events[-1]
+            next_cursor = f"{last['time']!r}:{last['id']}"
+        return events, next_cursor
+
+    # --- 보관 기간 정리 ---
+
+    def compact(self, retention_days: Optional[float] = None, chunk: int = 5000) -> int:
+        """보관 기간이 지난 기록 삭제 (쓰기 잠금을 오래 잡지 않도록 chunk개씩)"""
+        days = self.retention_days if retention_days is None else retention_days
+        if days is None:
+            return 0
+        cutoff = time.time() - days * 86400
+        conn = self._connect()
+        deleted = 0
+        while True:
+            with conn:
+                cur = conn.execute(
+                    'DELETE FROM events WHERE id IN (SELECT id FROM events WHERE time < ? LIMIT ?)',
+                    (cutoff, chunk),
+                )
+            deleted += cur.rowcount
+            if cur.rowcount < chunk:
+                break
+        if deleted:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.stats['compacted'] += deleted
+            print(f"[HISTORY] 보관 기간 지난 기록 {deleted}건 삭제")
+        return deleted
+
+    # --- writer 스레드 ---
+
+    def start(self):
+        # record()가 여러 스레드에서 처음 호출돼도 writer 스레드는 1개만
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            thread, self._thread = self._thread, None
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if time.monotonic() - self._last_compact >= self.compact_interval:
+                self._last_compact = time.monotonic()
+                try:
+                    self.compact()
+                except sqlite3.Error as e:
+                    print(f"[HISTORY] 정리 실패: {e}")
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, queued=len(self._queue), running=self._running)
@@ -0,0 +1,82 @@
+"""
+Line Timing Module
+포트 선로 관측값 모듈 - door_lock_controller(관측)와 capacity_planner / rate_limiter(계산, 분배)가 함께 쓰는 부분
+- COMMAND / QUERY: 버스 사용 종류 (명령 / 상태 조회)
+- LineTimings: 종류별 장치 턴어라운드 / 응답 크기 / 응답 누락 관측
+"""
+import collections
+import threading
+from typing import Optional
+
+COMMAND = 'command'
+QUERY = 'query'
+
+
+def _percentile(values: list, p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class LineTimings:
+    """포트 1개의 명령 종류별 턴어라운드 / 응답 크기 / 누락 관측 (최근 max_samples개)"""
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._turnaround = {COMMAND: collections.deque(maxlen=max_samples),
+                            QUERY: collections.deque(maxlen=max_samples)}
+        self._rx_bytes = {}
+        self._sent = {COMMAND: 0, QUERY: 0}
+        self._missed = {COMMAND: 0, QUERY: 0}
+
+    def observe(self, kind: str, turnaround: Optional[float], rx_bytes: int = 0):
+        """
+        Args:
+            kind: COMMAND / QUERY
+            turnaround: 전송 완료 ~ 응답 첫 바이트 (초, 응답 없으면 None)
+            rx_bytes: 응답 프레임 길이
+        """
+        with self._lock:
+            self._sent[kind] += 1
+            if turnaround is None:
+                self._missed[kind] += 1
+            else:
+                self._turnaround[kind].append(max(0.0, turnaround))
+                self._rx_bytes[kind] = rx_bytes
+
+    def stats(self, kind: str) -> dict:
+        with self._lock:
+            samples = list(self._turnaround[kind])
+            sent = self._sent[kind]
+            missed = self._missed[kind]
+            rx_bytes = self._rx_bytes.get(kind)
+        return {
+            'sent': sent,
+            'samples': len(samples),
+            'miss_rate': missed / sent if sent else None,
+            'turnaround_p50': _percentile(samples, 50),
+            'turnaround_p95': _percentile(samples, 95),
+            'rx_bytes': rx_bytes,
+        }
+
+    def snapshot(self) -> dict:
+        result = {}
+        for kind in (COMMAND, QUERY):
+            stats = self.stats(kind)
+            result[kind] = {
+                'sent': stats['sent'],
+                'miss_rate': _round(stats['miss_rate'], 4),
+                'turnaround_p50_ms': _ms(stats['turnaround_p50']),
+                'turnaround_p95_ms': _ms(stats['turnaround_p95']),
+                'rx_bytes': stats['rx_bytes'],
+            }
+        return result
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return round(value, digits) if value is not None else None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
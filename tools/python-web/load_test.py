@@ -0,0 +1,334 @@
+"""
+API Load Test
+동시 클라이언트 수를 늘려가며 Flask API의 처리량/오류율/지연 시간을 측정 (결과는 JSON으로 출력)
+- 기본: 앱을 이 프로세스에서 띄우고 가상 버스(sim://)에 연결 - 하드웨어 없이 실행
+- --url: 이미 실행 중인 서버에 부하 (실제 버스)
+- 클라이언트는 응답을 받으면 바로 다음 요청 (closed loop), 엔드포인트는 --mix 비율로 선택
+- 동시 클라이언트 단계별 req/s, 오류율, 지연 p50/p90/p99 + 큐 대기가 시작되는 단계(saturated_at)
+- 내장 실행은 기본으로 요청 한도(429) 없이 버스만 측정 (--rate-limit으로 서버 기본 한도 적용)
+- --window: 내장 실행 시 포트 pipeline_window (동시 전송 전후 처리량 비교)
+
+사용법:
+    python load_test.py
+    python load_test.py --clients 1,2,4,8,16,32 --duration 10
+    python load_test.py --rate-limit
+    python load_test.py --mix open=1,close=1,query-status=4,status=1 --devices 1-16
+    python load_test.py --sim "sim://load?devices=1-8&turnaround=0.03&loss=0.01"
+    python load_test.py --mix open=1,close=1 --clients 8 --window 4
+    python load_test.py --url http://127.0.0.1:5000 --devices 1-3
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from simulated_bus import parse_ids
+
+# 엔드포인트 이름 -> (메서드, 경로)
+ENDPOINTS = {
+    'open': ('POST', '/api/open'),
+    'close': ('POST', '/api/close'),
+    'query-status': ('POST', '/api/query-status'),
+    'status': ('GET', '/api/status'),
+}
+
+DEFAULT_SIM = 'sim://load?devices=1-8&turnaround=0.02&jitter=0.005&report=1'
+
+# 직전 단계 대비 처리량 증가가 이 비율 미만이고 지연(p50)이 이 배수 이상 늘면 포화로 판단
+SATURATION_GAIN = 0.1
+SATURATION_LATENCY = 1.5
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'open=1,status=2' -> {'open': 1.0, 'status': 2.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f'알 수 없는 엔드포인트: {name} (가능: {", ".join(ENDPOINTS)})')
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """nearest-rank 백분위 (values는 정렬된 목록)"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples: List[Tuple[int, float]], elapsed: float) -> dict:
+    """[(HTTP 상태 코드, 지연 초)] 요약 - 상태 코드 0은 연결 오류"""
+    latencies = sorted(latency * 1000 for _, latency in samples)
+    errors = sum(1 for status, _ in samples if status == 0 or status >= 400)
+    ok = sorted(latency * 1000 for status, latency in samples if 200 <= status < 300)
+    statuses = {}
+    for status, _ in samples:
+        key = str(status) if status else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+    count = len(samples)
+    return {
+        'requests': count,
+        'rps': round(count / elapsed, 2) if elapsed else None,
+        'ok_rps': round(len(ok) / elapsed, 2) if elapsed else None,
+        'error_rate': round(errors / count, 4) if count else None,
+        'statuses': statuses,
+        'latency_ms': {
+            'mean': round(sum(latencies) / count, 2) if count else None,
+            'p50': _round(percentile(latencies, 50)),
+            'p90': _round(percentile(latencies, 90)),
+            'p99': _round(percentile(latencies, 99)),
+            'max': _round(latencies[-1] if latencies else None),
+        },
+        # 429/503 등 즉시 거절된 응답을 뺀 지연 (포화 판단용)
+        'ok_p50_ms': _round(percentile(ok, 50)),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+class _Client(threading.Thread):
+    """부하 클라이언트 1개 (연결 1개로 순서대로 요청)"""
+
+    def __init__(self, index: int, base_url: str, mix: Dict[str, float], device_ids: List[int],
+                 until: float, port: Optional[str], seed: int, timeout: float, think: float):
+        super().__init__(name=f'load-client-{index}', daemon=True)
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.http_port = parts.port or 80
+        self.client_id = f'load-{index}'
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.device_ids = device_ids
+        self.until = until
+        self.port = port
+        self.rng = random.Random(seed + index)
+        self.timeout = timeout
+        self.think = think
+        self.samples = {name: [] for name in self.names}
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.http_port, timeout=self.timeout)
+        headers = {'Content-Type': 'application/json', 'X-Client-Id': self.client_id}
+        while time.monotonic() < self.until:
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path = ENDPOINTS[name]
+            device_id = self.rng.choice(self.device_ids)
+            body = {'device_id': device_id}
+            if self.port:
+                body['port'] = self.port
+            started = time.monotonic()
+            try:
+                if method == 'GET':
+                    query = f'?device_id={device_id}' + (f'&port={self.port}' if self.port else '')
+                    conn.request('GET', path + query, headers=headers)
+                else:
+                    conn.request(method, path, body=json.dumps(body), headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 0
+                conn.close()
+            self.samples[name].append((status, time.monotonic() - started))
+            if self.think:
+                time.sleep(self.think)
+        conn.close()
+
+
+def fetch_json(base_url: str, path: str, timeout: float = 5.0) -> Optional[dict]:
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        return json.loads(conn.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def server_counters(metrics: Optional[dict]) -> dict:
+    """/api/metrics 중 서버 시작 후 누적되는 값만 (단계별 차이 계산용)"""
+    if not metrics:
+        return {}
+    admission = metrics.get('admission') or {}
+    return {
+        'fair_gates': {port: {key: gate.get(key, 0) for key in ('waited', 'expired')}
+                       for port, gate in (metrics.get('fair_gates') or {}).items()},
+        'admission': {key: admission.get(key, 0) for key in ('admitted', 'rejected')},
+        'rate_limits': {name: {'rejected': limiter.get('rejected', 0)}
+                        for name, limiter in (metrics.get('rate_limits') or {}).items()},
+    }
+
+
+def diff_counters(after: dict, before: dict) -> dict:
+    """누적값 차이 (단계 시작 전에 없던 항목은 0에서 시작)"""
+    if isinstance(after, dict):
+        return {key: diff_counters(value, (before or {}).get(key)) for key, value in after.items()}
+    return after - (before or 0)
+
+
+def run_level(base_url: str, clients: int, duration: float, mix: Dict[str, float],
+              device_ids: List[int], port: Optional[str], seed: int, timeout: float,
+              think: float) -> dict:
+    """동시 클라이언트 clients개로 duration초 동안 부하"""
+    before = server_counters((fetch_json(base_url, '/api/metrics') or {}).get('metrics'))
+    until = time.monotonic() + duration
+    workers = [
+        _Client(i, base_url, mix, device_ids, until, port, seed, timeout, think)
+        for i in range(clients)
+    ]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    endpoints = {}
+    total = []
+    for name in mix:
+        samples = [s for worker in workers for s in worker.samples[name]]
+        endpoints[name] = summarize(samples, elapsed)
+        total.extend(samples)
+    result = {
+        'clients': clients,
+        'elapsed': round(elapsed, 2),
+        'total': summarize(total, elapsed),
+        'endpoints': endpoints,
+    }
+    metrics = (fetch_json(base_url, '/api/metrics') or {}).get('metrics')
+    if metrics:
+        # 이 단계 동안의 버스 대기(공정 큐)와 마감시간/요청 한도 거절 수 + 단계 끝 처리 시간 추정
+        result['server'] = diff_counters(server_counters(metrics), before)
+        result['server']['service_times'] = (metrics.get('admission') or {}).get('service_times')
+    return result
+
+
+def find_saturation(runs: List[dict]) -> Optional[int]:
+    """성공 처리량은 거의 그대로인데 성공 응답 지연만 늘기 시작한 첫 동시 클라이언트 수"""
+    for before, after in zip(runs, runs[1:]):
+        rps_before, rps_after = before['total']['ok_rps'], after['total']['ok_rps']
+        p50_before, p50_after = before['total']['ok_p50_ms'], after['total']['ok_p50_ms']
+        if not rps_before or p50_before is None or p50_after is None:
+            continue
+        if rps_after < rps_before * (1 + SATURATION_GAIN) and p50_after >= p50_before * SATURATION_LATENCY:
+            return after['clients']
+    return None
+
+
+def start_local_app(sim_url: str, device_ids: List[int], quiet: bool,
+                    rate_limit: bool = False, window: int = 1) -> Tuple[str, object]:
+    """가상 버스 구성으로 앱을 이 프로세스에서 실행 - (base URL, server)"""
+    workdir = tempfile.mkdtemp(prefix='door-lock-load-')
+    config_path = os.path.join(workdir, 'fleet.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'default_port': sim_url,
+            'ports': {sim_url: {'baudrate': 9600, 'timeout': 1, 'devices': device_ids,
+                                'pipeline_window': window}},
+        }, f)
+    os.environ['DOOR_LOCK_CONFIG'] = config_path
+    os.environ['DOOR_LOCK_DATA_DIR'] = os.path.join(workdir, 'data')
+
+    from werkzeug.serving import make_server
+    import app as web_app
+
+    if not rate_limit:
+        from rate_limiter import RateLimits
+        unlimited = (1e9, 1e9)
+        web_app.rate_limits = RateLimits(unlimited, unlimited, unlimited, unlimited)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    if quiet:
+        # 요청마다 찍는 로그는 버리고 측정 (출력 비용은 그대로 포함)
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Door lock API load test')
+    parser.add_argument('--url', help='실행 중인 서버 주소 (없으면 가상 버스로 앱 내장 실행)')
+    parser.add_argument('--sim', default=DEFAULT_SIM, help='내장 실행 시 가상 버스 URL')
+    parser.add_argument('--port', help='요청에 넣을 port 파라미터 (--url 사용 시)')
+    parser.add_argument('--clients', default='1,2,4,8,16,32', help='동시 클라이언트 수 단계 (쉼표 구분)')
+    parser.add_argument('--duration', type=float, default=5.0, help='단계별 측정 시간 (초)')
+    parser.add_argument('--mix', default='open=1,close=1,query-status=2,status=1', help='엔드포인트 비율')
+    parser.add_argument('--devices', help='요청할 장치 ID (예: 1-8, 기본: 가상 버스 장치 또는 1)')
+    parser.add_argument('--think', type=float, default=0.0, help='클라이언트 요청 간 대기 (초)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='HTTP 요청 타임아웃 (초)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='내장 실행 시 서버 기본 요청 한도(429) 적용 - 기본은 한도 없이 버스만 측정')
+    parser.add_argument('--window', type=int, default=1, help='내장 실행 시 포트 동시 전송 창 크기')
+    parser.add_argument('--verbose', action='store_true', help='내장 앱의 요청 로그 출력')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    levels = [int(n) for n in args.clients.split(',') if n.strip()]
+
+    stdout = sys.stdout
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        device_ids = parse_ids(args.devices or '1')
+    else:
+        sim_devices = parse_qs(urlsplit(args.sim).query).get('devices', ['1'])[-1]
+        device_ids = parse_ids(args.devices or sim_devices)
+        base_url, server = start_local_app(args.sim, device_ids, quiet=not args.verbose,
+                                           rate_limit=args.rate_limit, window=args.window)
+
+    try:
+        # 연결/상시 수신 시작 등 첫 요청 비용은 측정에서 제외
+        run_level(base_url, 1, 0.5, {'query-status': 1}, device_ids[:1], args.port, args.seed,
+                  args.timeout, 0.0)
+        runs = []
+        for clients in levels:
+            runs.append(run_level(base_url, clients, args.duration, mix, device_ids, args.port,
+                                  args.seed, args.timeout, args.think))
+            total = runs[-1]['total']
+            print(f"[LOAD] 동시 {clients}: {total['rps']} req/s (성공 {total['ok_rps']}), "
+                  f"p50 {total['latency_ms']['p50']}ms", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+            if sys.stdout is not stdout:
+                sys.stdout.close()
+                sys.stdout = stdout
+
+    report = {
+        'target': base_url if args.url else args.sim,
+        'window': None if args.url else args.window,
+        # 한도가 켜져 있으면 429가 먼저 포화되어 saturated_at은 버스가 아닌 요청 한도를 가리킴
+        'rate_limited': True if args.url else args.rate_limit,
+        'mix': mix,
+        'devices': device_ids,
+        'duration': args.duration,
+        'runs': runs,
+        'saturated_at': find_saturation(runs),
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Poll Scheduler Module
+장치별 활동에 맞춰 상태 조회 주기를 조절하는 폴러
+- 버스 시간 예산(budget: 버스 사용 비율) 안에서만 조회
+- 상태가 바뀐 장치 / 방금 열기·닫기한 장치는 min_interval로 자주 조회 (boost)
+- 변화 없는 장치는 조회할 때마다 주기를 factor배씩 늘림 (최대 max_interval)
+- 9600bps 버스에서 고정 주기로 전체 장치를 도는 것보다 적은 버스 시간으로 활동 중인 장치 상태를 더 빨리 반영
+- clock에 VirtualClock을 주면 가상 시간 actor로 실행 (수신 이벤트 구독 없이 boost만 처리)
+"""
+import math
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+from clock import REAL_CLOCK
+from door_events import TransitionDetector
+
+
+class _DeviceSchedule:
+    __slots__ = ('interval', 'next_due', 'last_code', 'polls')
+
+    def __init__(self, interval: float, next_due: float):
+        self.interval = interval
+        self.next_due = next_due
+        self.last_code = None
+        self.polls = 0
+
+
+class AdaptivePoller:
+    def __init__(self, query: Callable[[int], Optional[dict]], detector: TransitionDetector,
+                 port: str, device_ids: List[int], budget: float = 0.2,
+                 min_interval: float = 0.25, max_interval: float = 30.0, factor: float = 2.0,
+                 burst: float = 1.0, observe_results: bool = True, clock=None):
+        """
+        Args:
+            query: device_id -> 상태 dict (query_status 결과 형식)
+            detector: 결과를 공급할 TransitionDetector
+            port: 이벤트에 기록할 포트 이름
+            device_ids: 폴링 대상 장치 ID 목록
+            budget: 폴링에 쓸 버스 시간 비율 (0~1)
+            min_interval: 활동 중인 장치 조회 주기 (초)
+            max_interval: 변화 없는 장치의 최대 조회 주기 (초)
+            factor: 변화 없을 때 주기 증가 배수
+            burst: 쌓아둘 수 있는 최대 버스 시간 (초)
+            observe_results: 조회 결과를 detector에 반영 (query가 이미 반영하면 False)
+            clock: 시계 (기본: 실제 시간)
+        """
+        self.clock = clock or REAL_CLOCK
+        self.query = query
+        self.detector = detector
+        self.port = port
+        self.device_ids = list(device_ids)
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.burst = burst
+        self.observe_results = observe_results
+        now = self.clock.monotonic()
+        # 처음에는 모든 장치를 min_interval 간격으로 나눠 조회
+        self._devices = {
+            device_id: _DeviceSchedule(min_interval, now + i * min_interval / max(1, len(self.device_ids)))
+            for i, device_id in enumerate(self.device_ids)
+        }
+        self._lock = threading.Lock()
+        self._credit = burst        # 남은 버스 시간 (초)
+        self._credit_at = now
+        self._inbox = queue.Queue()  # boost 요청 + (reader 구독 시) 수신 이벤트
+        self._wake = threading.Condition()  # 가상 시간에서 boost로 대기 중단
+        self._reader = None
+        self._running = False
+        self._thread = None
+        self._started_at = None
+        self.polls = 0
+        self.bus_time = 0.0
+        self.boosts = 0
+        self.throttled = 0
+
+    def start(self, reader=None):
+        """폴링 시작 (reader를 주면 요청 없이 들어온 프레임도 함께 반영)"""
+        if self._running:
+            return
+        if reader is not None and self.clock.virtual:
+            raise ValueError('가상 시계에서는 수신 이벤트를 구독할 수 없습니다.')
+        self._running = True
+        self._started_at = self.clock.monotonic()
+        if reader is not None:
+            self._reader = reader
+            self._inbox = reader.subscribe()
+        self._thread = self.clock.spawn(self._run, name=f'adaptive-poller-{self.port}')
+
+    def stop(self):
+        self._running = False
+        try:
+            self._inbox.put_nowait({'wakeup': True})
+        except queue.Full:
+            # 수신 이벤트 큐가 가득 차 있으면 다음 이벤트 처리 후 _running을 보고 종료
+            pass
+        self._notify()
+        if self._thread is not None and not self.clock.virtual:
+            # 가상 시간 actor는 다음 차례에 스스로 종료
+            self._thread.join(timeout=self.max_interval + 5)
+        self._thread = None
+        if self._reader is not None:
+            self._reader.unsubscribe(self._inbox)
+            self._reader = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def boost(self, device_id: int):
+        """열기/닫기 직후 등: 해당 장치를 곧바로, 자주 조회"""
+        if device_id not in self._devices:
+            return
+        try:
+            self._inbox.put_nowait({'boost': device_id})
+        except queue.Full:
+            pass
+        self._notify()
+
+    def _notify(self):
+        if self.clock.virtual:
+            with self._wake:
+                self.clock.notify(self._wake)
+
+    def _boost(self, device_id: int, now: float):
+        with self._lock:
+            schedule = self._devices.get(device_id)
+            if schedule is None:
+                return
+            schedule.interval = self.min_interval
+            schedule.next_due = min(schedule.next_due, now)
+        self.boosts += 1
+
+    # --- 예산 ---
+
+    def _refill(self, now: float):
+        self._credit = min(self.burst, self._credit + (now - self._credit_at) * self.budget)
+        self._credit_at = now
+
+    def _budget_wait(self, now: float) -> float:
+        """다음 조회까지 예산 때문에 기다려야 하는 시간"""
+        self._refill(now)
+        if self._credit > 0:
+            return 0.0
+        return -self._credit / self.budget
+
+    # --- 폴링 ---
+
+    def _run(self):
+        while self._running:
+            if not self._devices:
+                self._drain(self.max_interval)
+                continue
+            now = self.clock.monotonic()
+            with self._lock:
+                device_id, schedule = min(self._devices.items(), key=lambda item: item[1].next_due)
+                due_wait = max(0.0, schedule.next_due - now)
+            budget_wait = self._budget_wait(now)
+            if budget_wait > due_wait:
+                self.throttled += 1
+            wait = max(due_wait, budget_wait)
+            if wait > 0:
+                self._drain(wait)
+                continue
+
+            started = self.clock.monotonic()
+            result = self.query(device_id)
+            elapsed = self.clock.monotonic() - started
+            self._credit -= elapsed
+            self.bus_time += elapsed
+            self.polls += 1
+
+            code = result.get('status_code') if result else None
+            if result and self.observe_results:
+                self.detector.observe(self.port, device_id, code, now=self.clock.monotonic())
+            with self._lock:
+                schedule.polls += 1
+                if code is not None and schedule.last_code is not None and code != schedule.last_code:
+                    schedule.interval = self.min_interval
+                else:
+                    schedule.interval = min(self.max_interval, schedule.interval * self.factor)
+                if code is not None:
+                    schedule.last_code = code
+                schedule.next_due = self.clock.monotonic() + schedule.interval
+            self._drain(0.0)
+
+    def _drain(self, wait: float):
+        """boost 요청 / 수신 이벤트 처리 (wait 동안 대기하며 처리)"""
+        now = self.clock.monotonic()
+        deadline = now + wait
+        if wait > 0 and deadline == now:
+            # 예산 계산 오차로 남은 아주 작은 대기도 시간을 진행시킴 (가상 시간에서 제자리 반복 방지)
+            deadline = math.nextafter(now, math.inf)
+        while self._running:
+            remaining = deadline - self.clock.monotonic()
+            try:
+                if remaining > 0 and not self.clock.virtual:
+                    item = self._inbox.get(timeout=remaining)
+                else:
+                    item = self._inbox.get_nowait()
+            except queue.Empty:
+                if remaining > 0 and self.clock.virtual:
+                    with self._wake:
+                        self.clock.wait(self._wake, remaining)
+                    continue
+                return
+            now = self.clock.monotonic()
+            if 'boost' in item:
+                self._boost(item['boost'], now)
+                return
+            if 'wakeup' in item:
+                return
+            device_id = item['device_id']
+            if device_id is None and len(self.device_ids) == 1:
+                # SOH 프레임은 장치 ID가 없음 → 단일 장치 버스에서만 귀속
+                device_id = self.device_ids[0]
+            if device_id is not None:
+                self.detector.observe(self.port, device_id, item['status_code'], now=now)
+                # 스스로 상태를 보낸 장치는 활동 중 → 곧 다시 확인
+                self._boost(device_id, now)
+                return
+
+    def snapshot(self) -> Dict[str, object]:
+        now = self.clock.monotonic()
+        with self._lock:
+            devices = {
+                device_id: {
+                    'interval': round(s.interval, 2),
+                    'next_in': round(max(0.0, s.next_due - now), 2),
+                    'polls': s.polls,
+                    'status_code': s.last_code,
+                }
+                for device_id, s in self._devices.items()
+            }
+        uptime = now - self._started_at if self._started_at else None
+        return {
+            'budget': self.budget,
+            'polls': self.polls,
+            'bus_time': round(self.bus_time, 2),
+            'bus_usage': round(self.bus_time / uptime, 3) if uptime else None,
+            'boosts': self.boosts,
+            'throttled': self.throttled,
+            'devices': devices,
+        }
@@ -0,0 +1,126 @@
+"""
+Port Discovery Module
+시리얼 포트 후보를 찾아 상태 조회(1C FF 00) 프레임으로 병렬 탐색하는 모듈
+- Linux: /dev/ttyUSB*, /dev/ttyACM*, /dev/ttyS* + 명령행으로 받은 포트(pty 등)
+- Windows: pyserial list_ports 결과
+
+사용법:
+    python port_discovery.py                       # 자동 후보 탐색
+    python port_discovery.py /dev/pts/3 /dev/pts/5 # 추가 포트 포함
+    python port_discovery.py --deadline 0.2 --device-id 1
+"""
+import argparse
+import glob
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import serial
+import serial.tools.list_ports
+
+from frame_codec import FrameDecoder, build_status_query
+
+LINUX_PATTERNS = ('/dev/ttyUSB*', '/dev/ttyACM*', '/dev/ttyS*')
+
+
+def candidate_ports(extra: Optional[Iterable[str]] = None) -> List[str]:
+    """탐색 후보 포트 목록 (중복 제거, 추가 포트 우선)"""
+    ports = list(extra or [])
+    if sys.platform == 'win32':
+        ports.extend(p.device for p in serial.tools.list_ports.comports())
+    else:
+        for pattern in LINUX_PATTERNS:
+            ports.extend(sorted(glob.glob(pattern)))
+    seen = set()
+    return [p for p in ports if not (p in seen or seen.add(p))]
+
+
+def probe_port(port: str, device_id: int = 1, baudrate: int = 9600, deadline: float = 0.3) -> dict:
+    """
+    포트 1개 탐색: 상태 조회 프레임 전송 후 deadline 안에 상태 프레임이 오는지 확인
+
+    Returns:
+        {'port', 'opened', 'responded', 'status_code', 'latency_ms', 'error'}
+    """
+    result = {
+        'port': port,
+        'opened': False,
+        'responded': False,
+        'status_code': None,
+        'latency_ms': None,
+        'error': None,
+    }
+    conn = None
+    try:
+        conn = serial.Serial(
+            port=port,
+            baudrate=baudrate,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            timeout=0.02,
+            exclusive=True if sys.platform != 'win32' else None,
+        )
+        result['opened'] = True
+
+        decoder = FrameDecoder()
+        started = time.monotonic()
+        conn.write(build_status_query(device_id))
+        conn.flush()
+        end = started + deadline
+        while time.monotonic() < end:
+            frames = decoder.feed(conn.read(max(1, conn.in_waiting)))
+            if frames:
+                result['responded'] = True
+                result['status_code'] = frames[0].status_code
+                result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+                break
+    except (serial.SerialException, OSError, ValueError) as e:
+        result['error'] = str(e)
+    finally:
+        if conn is not None:
+            conn.close()
+    return result
+
+
+def discover(ports: List[str], device_id: int = 1, baudrate: int = 9600, deadline: float = 0.3,
+             max_workers: int = 32) -> dict:
+    """
+    후보 포트 병렬 탐색
+
+    Returns:
+        {'elapsed_ms', 'found': [응답한 포트...], 'results': [포트별 결과...]}
+    """
+    started = time.monotonic()
+    results = []
+    if ports:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(ports))) as pool:
+            results = list(pool.map(lambda p: probe_port(p, device_id, baudrate, deadline), ports))
+
+    # 응답한 포트를 지연시간 순으로 앞에 배치
+    results.sort(key=lambda r: (not r['responded'], r['latency_ms'] or 0, r['port']))
+    return {
+        'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        'found': [r['port'] for r in results if r['responded']],
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='잠금장치 시리얼 포트 탐색')
+    parser.add_argument('ports', nargs='*', help='추가로 탐색할 포트 (pty 등)')
+    parser.add_argument('--device-id', type=int, default=1)
+    parser.add_argument('--baudrate', type=int, default=9600)
+    parser.add_argument('--deadline', type=float, default=0.3, help='포트별 응답 대기 시간 (초)')
+    parser.add_argument('--only', action='store_true', help='명령행 포트만 탐색')
+    args = parser.parse_args()
+
+    ports = args.ports if args.only else candidate_ports(args.ports)
+    report = discover(ports, args.device_id, args.baudrate, args.deadline)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Rate Limiter Module
+클라이언트별 공정 분배 - 한 클라이언트가 시리얼 버스를 독점하지 못하도록 제한하는 모듈
+- TokenBucketLimiter: 키별 토큰 버킷 (클라이언트 / (port, device) 단위, 명령/조회 예산 분리)
+- FairBusGate: 포트별 가중 공정 큐(WFQ) - 버스 사용 순서를 클라이언트 가중치에 따라 분배
+  (대기 중 마감시간이 지난 요청은 버림)
+"""
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Hashable, Optional
+
+from admission import DeadlineExceeded
+from line_timing import COMMAND, QUERY
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        """
+        Args:
+            rate: 초당 토큰 충전량
+            burst: 버킷 최대 크기
+            max_keys: 보관할 최대 키 수 (초과 시 가득 찬 버킷부터 정리)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.rejected = 0
+
+    def _refill(self, key: Hashable, now: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+        elif now > bucket.updated:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        return bucket
+
+    def _prune(self, now: float):
+        """가득 찬(= 기본 상태와 같은) 버킷 제거"""
+        full = [k for k, b in self._buckets.items()
+                if b.tokens + (now - b.updated) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+    def wait_time(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """토큰 소모 없이 대기 필요 시간만 계산 (0이면 즉시 가능)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._refill(key, now)
+            if bucket.tokens >= cost:
+                return 0.0
+            return (cost - bucket.tokens) / self.rate
+
+    def consume(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._refill(key, now)
+            bucket.tokens -= cost
+
+    def refund(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None):
+        """소모한 토큰 되돌리기 (버킷 최대 크기까지)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._refill(key, now)
+            bucket.tokens = min(self.burst, bucket.tokens + cost)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'keys': len(self._buckets), 'rejected': self.rejected}
+
+
+class RateLimits:
+    """클라이언트 / (port, device) × 명령 / 조회 예산"""
+
+    def __init__(self, client_command=(1.0, 5), client_query=(5.0, 20),
+                 device_command=(2.0, 4), device_query=(10.0, 20)):
+        """각 인자는 (초당 충전량, 최대 버스트)"""
+        self.limiters = {
+            ('client', COMMAND): TokenBucketLimiter(*client_command),
+            ('client', QUERY): TokenBucketLimiter(*client_query),
+            ('device', COMMAND): TokenBucketLimiter(*device_command),
+            ('device', QUERY): TokenBucketLimiter(*device_query),
+        }
+        # 두 버킷 확인과 소모를 한 번에 (동시 요청이 모두 확인을 통과한 뒤 소모해 버스트를 넘는 것 방지)
+        self._lock = threading.Lock()
+
+    def check(self, client: str, port: str, device_id: int, kind: str) -> float:
+        """
+        요청 1건 허용 여부 - 0이면 허용(토큰 소모), 아니면 재시도까지 남은 초
+        """
+        now = time.monotonic()
+        checks = [
+            (self.limiters[('client', kind)], client),
+            (self.limiters[('device', kind)], (port, device_id)),
+        ]
+        with self._lock:
+            waits = [limiter.wait_time(key, now=now) for limiter, key in checks]
+            retry_after = max(waits)
+            if retry_after > 0:
+                for (limiter, _), wait in zip(checks, waits):
+                    if wait > 0:
+                        limiter.rejected += 1
+                return retry_after
+            for limiter, key in checks:
+                limiter.consume(key, now=now)
+        return 0.0
+
+    def refund(self, client: str, port: str, device_id: int, kind: str):
+        """check로 허용했지만 버스에 넣지 않은 요청 (예: 마감시간 초과 503) - 토큰 반환"""
+        with self._lock:
+            self.limiters[('client', kind)].refund(client)
+            self.limiters[('device', kind)].refund((port, device_id))
+
+    def snapshot(self) -> dict:
+        return {f'{scope}_{kind}': limiter.snapshot() for (scope, kind), limiter in self.limiters.items()}
+
+
+class _Waiter:
+    __slots__ = ('event', 'start', 'cost', 'deadline', 'granted', 'abandoned')
+
+    def __init__(self, start: float, cost: float, deadline: Optional[float]):
+        self.event = threading.Event()
+        self.start = start
+        self.cost = cost
+        self.deadline = deadline
+        self.granted = False
+        self.abandoned = False
+
+
+class FairBusGate:
+    """
+    포트 1개의 버스 사용 순서를 정하는 가중 공정 큐 (WFQ)
+    버스가 비어 있으면 바로 통과, 사용 중이면 가상 종료시간이 가장 이른 요청부터 통과
+    마감시간이 지난 대기 요청은 버스를 쓰지 않고 DeadlineExceeded로 끝남
+    capacity: 동시에 통과시킬 요청 수 (동시 전송 포트는 pipeline_window)
+    """
+
+    def __init__(self, capacity: int = 1):
+        self._lock = threading.Lock()
+        self.capacity = max(1, capacity)
+        self._holders = 0
+        self._holder_cost = 0.0
+        self._holder_since = 0.0
+        self._waiting = []   # (finish, seq, _Waiter)
+        self._finish = {}    # client -> 마지막 가상 종료시간
+        self._vtime = 0.0
+        self._seq = 0
+        self.waited = 0
+        self.expired = 0
+
+    @contextmanager
+    def slot(self, client: str, weight: float = 1.0, cost: float = 1.0, deadline: Optional[float] = None):
+        """
+        버스 사용 구간 (with 블록 동안 이 포트를 점유)
+
+        Args:
+            cost: 예상 버스 사용 시간 (초)
+            deadline: 마감시각 (time.monotonic 기준) - 대기 중 지나면 DeadlineExceeded
+        """
+        self._enter(client, weight, cost, deadline)
+        try:
+            yield
+        finally:
+            self._leave()
+
+    def backlog(self) -> float:
+        """지금 들어오면 기다려야 할 예상 시간 (초)"""
+        with self._lock:
+            if self._holders < self.capacity:
+                return 0.0
+            remaining = max(0.0, self._holder_cost - (time.monotonic() - self._holder_since))
+            return remaining + sum(w.cost for _, _, w in self._waiting if not w.abandoned) / self.capacity
+
+    def _grant(self, cost: float):
+        self._holders += 1
+        self._holder_cost = cost
+        self._holder_since = time.monotonic()
+
+    def _enter(self, client: str, weight: float, cost: float, deadline: Optional[float]):
+        with self._lock:
+            start = max(self._vtime, self._finish.get(client, 0.0))
+            finish = start + cost / max(weight, 0.01)
+            self._finish[client] = finish
+            if self._holders < self.capacity:
+                self._grant(cost)
+                self._vtime = start
+                return
+            waiter = _Waiter(start, cost, deadline)
+            self._seq += 1
+            heapq.heappush(self._waiting, (finish, self._seq, waiter))
+            self.waited += 1
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.granted:
+                return
+            # 마감시간 초과 - 대기열에서 빠짐 (_leave가 건너뜀)
+            if not waiter.abandoned:
+                waiter.abandoned = True
+                self.expired += 1
+        raise DeadlineExceeded('대기 중 마감시간이 지났습니다.')
+
+    def _leave(self):
+        with self._lock:
+            self._holders -= 1
+            while self._waiting and self._holders < self.capacity:
+                _, _, waiter = heapq.heappop(self._waiting)
+                if waiter.abandoned:
+                    continue
+                if waiter.deadline is not None and time.monotonic() >= waiter.deadline:
+                    # 버스를 잡아도 이미 늦음 → 깨워서 바로 포기시킴
+                    waiter.abandoned = True
+                    self.expired += 1
+                    waiter.event.set()
+                    continue
+                # 다음 요청에게 바로 넘김
+                waiter.granted = True
+                self._grant(waiter.cost)
+                self._vtime = max(self._vtime, waiter.start)
+                waiter.event.set()
+            if len(self._finish) > 1000:
+                self._finish = {c: f for c, f in self._finish.items() if f > self._vtime}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'busy': self._holders >= self.capacity,
+                'holders': self._holders,
+                'capacity': self.capacity,
+                'waiting': sum(1 for _, _, w in self._waiting if not w.abandoned),
+                'waited': self.waited,
+                'expired': self.expired,
+            }
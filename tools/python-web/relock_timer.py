@@ -0,0 +1,378 @@
+"""
+Relock Timer Module
+서버 측 자동 잠금 - 지정한 시간(초) 동안 열었다가 close_lock을 보내는 모듈
+(장치 자체 자동잠금 open_lock_5sec은 5초 고정)
+- TimerWheel: 계층형 타이머 휠 - 등록/취소 O(1), 스레드 1개로 수천 개 타이머 처리
+- RelockScheduler: (port, device)별 예약 잠금 1개 - 다시 열면 예약 갱신, 닫으면 취소
+  예약은 추가 전용 저널 파일에 기록해 재시작 후에도 이어서 실행
+  (저널 기록은 writer 스레드가 모아서 묶음당 fsync 1번)
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Timer:
+    __slots__ = ('key', 'due_tick', 'level', 'slot')
+
+    def __init__(self, key: Hashable, due_tick: int):
+        self.key = key
+        self.due_tick = due_tick
+        self.level = 0
+        self.slot = 0
+
+
+class TimerWheel:
+    """
+    계층형 타이머 휠 (키당 타이머 1개)
+    level 0 칸 = tick 1개, level n 칸 = level n-1 한 바퀴
+    상위 level 칸의 시작 tick에 도달하면 그 칸의 타이머를 하위 level로 내림 (cascade)
+    """
+
+    def __init__(self, tick: float = 0.1, bits: int = 8, levels: int = 4):
+        """
+        Args:
+            tick: 최소 시간 단위 (초)
+            bits: level당 칸 수 = 2^bits
+            levels: level 수 (최대 예약 시간 = tick × 2^(bits×levels))
+        """
+        self.tick = tick
+        self.bits = bits
+        self.levels = levels
+        self._mask = (1 << bits) - 1
+        self._wheels = [[{} for _ in range(1 << bits)] for _ in range(levels)]
+        self._timers = {}  # key -> _Timer
+        self._now_tick = self._tick_of(time.monotonic())
+        self._lock = threading.Lock()
+
+    def _tick_of(self, t: float) -> int:
+        return int(t / self.tick)
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def _place(self, timer: _Timer):
+        delta = timer.due_tick - self._now_tick
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (self.bits * (level + 1)):
+            level += 1
+        timer.level = level
+        timer.slot = (timer.due_tick >> (self.bits * level)) & self._mask
+        self._wheels[level][timer.slot][timer.key] = timer
+
+    def schedule(self, key: Hashable, delay: float):
+        """key 타이머 등록 (이미 있으면 새 시간으로 교체)"""
+        with self._lock:
+            self._remove(key)
+            due_tick = max(self._now_tick + 1, self._tick_of(time.monotonic() + delay))
+            if due_tick - self._now_tick >= 1 << (self.bits * self.levels):
+                raise ValueError(f'타이머 범위 초과: {delay}초')
+            timer = _Timer(key, due_tick)
+            self._timers[key] = timer
+            self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def _remove(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del self._wheels[timer.level][timer.slot][key]
+        return True
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                return None
+            return max(0.0, timer.due_tick * self.tick - time.monotonic())
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """현재 시각까지 tick을 진행하고 만료된 key 목록 반환"""
+        target = self._tick_of(time.monotonic() if now is None else now)
+        expired = []
+        with self._lock:
+            while self._now_tick < target:
+                self._now_tick += 1
+                t = self._now_tick
+                for level in range(self.levels - 1, 0, -1):
+                    shift = self.bits * level
+                    if t & ((1 << shift) - 1) == 0:
+                        slot = self._wheels[level][(t >> shift) & self._mask]
+                        timers = list(slot.values())
+                        slot.clear()
+                        for timer in timers:
+                            self._place(timer)
+                slot = self._wheels[0][t & self._mask]
+                if slot:
+                    for key in slot:
+                        del self._timers[key]
+                    expired.extend(slot)
+                    slot.clear()
+        return expired
+
+
+class RelockScheduler:
+    def __init__(self, path: str, close: Callable[[str, int], bool], tick: float = 0.1,
+                 retry_delay: float = 2.0, max_attempts: int = 5,
+                 give_up: Optional[Callable[[str, int], None]] = None):
+        """
+        Args:
+            path: 예약 저널 파일 경로
+            close: (port, device_id) 잠금 함수 - 실패 시 False
+            tick: 타이머 해상도 (초)
+            retry_delay: 잠금 실패 시 재시도 간격 (초)
+            max_attempts: 잠금 최대 시도 횟수
+            give_up: max_attempts번 모두 실패한 예약을 넘겨받을 함수 (예: outbox 보관)
+        """
+        self.path = path
+        self.close = close
+        self.give_up = give_up
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.wheel = TimerWheel(tick=tick)
+        self._lock = threading.Condition()
+        self._due = {}        # (port, device_id) -> 잠금 예정 시각 (time.time, 재시작 후 복원용)
+        self._attempts = {}   # (port, device_id) -> 실패 횟수
+        self._journal = None
+        self._journal_lines = 0
+        self._buffer = []     # 아직 파일에 쓰지 않은 기록 (seq, line)
+        self._seq = 0
+        self._durable = 0     # fsync 완료된 마지막 seq
+        self._running = False
+        self._stop = threading.Event()
+        self._threads = []
+        self.relocked = 0
+        self.failed = 0
+        self.fsyncs = 0
+        self._load()
+
+    # --- 저널 ---
+
+    def _load(self):
+        """저널 재생 후 남은 예약 복원 (이미 지난 예약은 시작 직후 잠금)"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # 기록 중 끊긴 마지막 줄
+                        key = (entry['port'], int(entry['device_id']))
+                        if entry.get('due') is None:
+                            self._due.pop(key, None)
+                        else:
+                            self._due[key] = float(entry['due'])
+            except OSError as e:
+                print(f"[RELOCK] 예약 로드 실패: {e}")
+        now = time.time()
+        for key, due in self._due.items():
+            self.wheel.schedule(key, max(0.0, due - now))
+        if self._due:
+            print(f"[RELOCK] 예약 {len(self._due)}건 복원")
+        self._compact()
+
+    def _compact(self):
+        """현재 예약만 남기고 저널 다시 쓰기"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self._journal is not None:
+            self._journal.close()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for (port, device_id), due in self._due.items():
+                f.write(json.dumps({'port': port, 'device_id': device_id, 'due': due}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._journal = open(self.path, 'a', encoding='utf-8')
+        self._journal_lines = len(self._due)
+
+    def _append(self, key: Tuple[str, int], due: Optional[float]) -> int:
+        """기록 추가 (self._lock 보유 상태) - 기록 seq 반환, 파일 쓰기는 writer 스레드"""
+        self._seq += 1
+        self._buffer.append((self._seq, json.dumps({'port': key[0], 'device_id': key[1], 'due': due}) + '\n'))
+        self._lock.notify_all()
+        return self._seq
+
+    def _wait_durable(self, seq: int):
+        """seq까지 fsync될 때까지 대기 (self._lock 보유 상태, 대기 중에는 놓음)"""
+        if not self._running:
+            self._flush_locked()
+            return
+        while self._durable < seq:
+            self._lock.wait()
+
+    def _flush_locked(self):
+        """writer 스레드 없이 바로 쓰기 (시작 전/종료 후)"""
+        if self._buffer and self._journal is not None:
+            batch, self._buffer = self._buffer, []
+            self._committed(batch, self._write(batch))
+
+    def _write(self, batch: List[Tuple[int, str]]) -> bool:
+        try:
+            self._journal.write(''.join(line for _, line in batch))
+            self._journal.flush()
+            # 재시작 후에도 남아야 하는 예약 - 디스크까지 기록
+            os.fsync(self._journal.fileno())
+            return True
+        except OSError as e:
+            print(f"[RELOCK] 저널 기록 실패: {e}")
+            return False
+
+    def _committed(self, batch: List[Tuple[int, str]], ok: bool):
+        """기록 완료 처리 (self._lock 보유 상태) - 대기 중인 요청 깨움"""
+        if ok:
+            self.fsyncs += 1
+        self._journal_lines += len(batch)
+        self._durable = max(self._durable, batch[-1][0])
+        self._lock.notify_all()
+
+    def _writer(self):
+        """모인 기록을 한 번에 쓰고 fsync (fsync 중 들어온 기록은 다음 묶음으로)"""
+        with self._lock:
+            while self._running or self._buffer:
+                if not self._buffer:
+                    self._lock.wait(0.5)
+                    continue
+                batch, self._buffer = self._buffer, []
+                # 파일 쓰기 동안에도 예약/취소는 타이머 휠과 버퍼만 갱신
+                self._lock.release()
+                try:
+                    ok = self._write(batch)
+                finally:
+                    self._lock.acquire()
+                self._committed(batch, ok)
+                if not self._buffer and self._journal_lines > 2 * len(self._due) + 1000:
+                    self._compact()
+
+    # --- 예약 ---
+
+    def schedule(self, port: str, device_id: int, seconds: float) -> float:
+        """
+        seconds 후 잠금 예약 (이미 예약이 있으면 새 시간으로 교체)
+
+        Returns:
+            잠금 예정 시각 (time.time)
+        """
+        key = (port, device_id)
+        due = time.time() + seconds
+        self.start()
+        with self._lock:
+            self.wheel.schedule(key, seconds)
+            self._due[key] = due
+            self._attempts.pop(key, None)
+            self._wait_durable(self._append(key, due))
+        return due
+
+    def cancel(self, port: str, device_id: int) -> bool:
+        """예약 취소 (직접 열기/닫기 요청 시)"""
+        key = (port, device_id)
+        with self._lock:
+            if key not in self._due:
+                return False
+            del self._due[key]
+            self._attempts.pop(key, None)
+            self.wheel.cancel(key)
+            self._wait_durable(self._append(key, None))
+        return True
+
+    def pending(self, port: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            items = [(k, d) for k, d in self._due.items() if port is None or k[0] == port]
+        now = time.time()
+        return [
+            {'port': p, 'device_id': d, 'due': due, 'remaining': round(max(0.0, due - now), 1)}
+            for (p, d), due in sorted(items, key=lambda item: item[1])
+        ]
+
+    def get(self, port: str, device_id: int) -> Optional[float]:
+        with self._lock:
+            return self._due.get((port, device_id))
+
+    # --- 스레드 ---
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name='relock-timer', daemon=True),
+                threading.Thread(target=self._writer, name='relock-journal', daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        self._stop.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=5)
+        self._threads = []
+        with self._lock:
+            self._flush_locked()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _run(self):
+        while not self._stop.wait(self.wheel.tick):
+            for key in self.wheel.advance():
+                self._fire(key)
+
+    def _fire(self, key: Tuple[str, int]):
+        with self._lock:
+            if key not in self._due or self.wheel.remaining(key) is not None:
+                # 만료 직후 취소/재예약됨
+                return
+        port, device_id = key
+        try:
+            success = self.close(port, device_id)
+        except Exception as e:
+            print(f"[RELOCK] 잠금 오류 ({port}:{device_id}): {e}")
+            success = False
+
+        with self._lock:
+            if key not in self._due or self.wheel.remaining(key) is not None:
+                # 잠그는 동안 취소/재예약됨
+                return
+            if success:
+                self.relocked += 1
+            else:
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts < self.max_attempts:
+                    self._attempts[key] = attempts
+                    self.wheel.schedule(key, self.retry_delay)
+                    print(f"[RELOCK] 잠금 실패 ({port}:{device_id}) - {self.retry_delay}초 후 재시도")
+                    return
+                self.failed += 1
+                print(f"[RELOCK] 잠금 포기 ({port}:{device_id}, {attempts}회 실패)")
+            del self._due[key]
+            self._attempts.pop(key, None)
+            self._append(key, None)
+
+        if not success and self.give_up is not None:
+            try:
+                self.give_up(port, device_id)
+            except Exception as e:
+                print(f"[RELOCK] 포기 처리 오류 ({port}:{device_id}): {e}")
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._due)
+        return {
+            'pending': pending,
+            'relocked': self.relocked,
+            'failed': self.failed,
+            'fsyncs': self.fsyncs,
+            'running': self._running,
+        }
@@ -0,0 +1,377 @@
+"""
+Simulated Bus Module
+하드웨어 없이 앱/부하 테스트를 돌리기 위한 가상 RS-485 버스
+- 포트 이름이 sim:// 로 시작하면 DoorLockController가 pyserial 대신 SimulatedSerial 사용
+- 선로 시간: frame_codec.wire_time (8N1 바이트당 10비트), 송신과 응답이 같은 선로를 나눠 씀
+  - 호스트 송신은 예약된 장치 응답 사이 빈 구간(턴어라운드)에 들어갈 수 있으면 먼저 나감 (동시 전송)
+- 장치: 상태 조회에 응답(턴어라운드 + 지터), 열기/닫기 시 상태 변경 후 상태 프레임 전송
+- 5초 자동잠금(param 0x31), 응답 누락(loss), 주기적 상태 보고(report) 모의
+- clock에 VirtualClock을 주면 선로/응답/보고 시각이 모두 가상 시간 (soak_test.py)
+
+포트 URL 예시:
+    sim://bus1?devices=1-8&turnaround=0.02&jitter=0.005&loss=0.01&report=2&format=marker&echo=0
+"""
+import collections
+import random
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from clock import REAL_CLOCK
+from frame_codec import (
+    COMMAND_FRAME_LEN, DLE, ESC, ETX, SOH, STATUS_MARKER, STATUS_QUERY, STX, wire_time,
+)
+
+SCHEME = 'sim://'
+AUTO_RELOCK_SECONDS = 5.0
+
+_buses = {}  # (이름, 시계) -> SimulatedBus
+_buses_lock = threading.Lock()
+
+
+def is_sim_port(port: Optional[str]) -> bool:
+    return bool(port) and port.startswith(SCHEME)
+
+
+def parse_ids(value: str) -> List[int]:
+    """'1-8,10' -> [1..8, 10]"""
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        ids.extend(range(int(first), int(last or first) + 1))
+    return ids
+
+
+class _Device:
+    __slots__ = ('device_id', 'status', 'relock_at')
+
+    def __init__(self, device_id: int):
+        self.device_id = device_id
+        self.status = '01'
+        self.relock_at = None
+
+    def current(self, now: float) -> str:
+        if self.relock_at is not None and now >= self.relock_at:
+            self.status = '01'
+            self.relock_at = None
+        return self.status
+
+
+class SimulatedBus:
+    """가상 버스 1개 (같은 URL 이름은 같은 버스 - 테스트에서 장치 상태 확인/변경용)"""
+
+    def __init__(self, name: str, device_ids=(1,), turnaround: float = 0.02, jitter: float = 0.0,
+                 loss: float = 0.0, report: float = 0.0, fmt: str = 'marker', echo: bool = False,
+                 seed: Optional[int] = None, clock=None):
+        """
+        Args:
+            name: 버스 이름
+            device_ids: 응답하는 장치 ID 목록
+            turnaround: 명령 수신 완료 ~ 응답 시작 (초)
+            jitter: 턴어라운드에 더할 최대 난수 지연 (초)
+            loss: 응답 누락 확률 (0~1)
+            report: 장치별 주기적 상태 보고 간격 (초, 0이면 안 함)
+            fmt: 응답 형식 'marker'(STX 'S' ID, 장치 ID 포함) / 'soh'(ID 없음)
+            echo: 송신 프레임을 수신 라인에 되돌림 (RS-485 에코)
+            seed: 지터/누락 난수 시드
+            clock: 시계 (기본: 실제 시간)
+        """
+        self.clock = clock or REAL_CLOCK
+        self.name = name
+        self.devices = {device_id: _Device(device_id) for device_id in device_ids}
+        self.offline = set()  # 명령을 받지도 응답하지도 않는 장치 (고장 모의)
+        self.turnaround = turnaround
+        self.jitter = jitter
+        self.loss = loss
+        self.report = report
+        self.fmt = fmt
+        self.echo = echo
+        self._rng = random.Random(seed)
+        self._cond = threading.Condition()
+        self._ports = []
+        self._line = []            # 선로 예약 구간 [(시작, 끝)] (clock.monotonic, 시작 순)
+        self._thread = None
+        self.stats = {
+            'rx_frames': 0,
+            'queries': 0,
+            'commands': 0,
+            'replies': 0,
+            'lost': 0,
+            'reports': 0,
+            'busy_time': 0.0,
+        }
+
+    @classmethod
+    def from_url(cls, url: str, clock=None) -> 'SimulatedBus':
+        parts = urlsplit(url)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        return cls(
+            name=parts.netloc or parts.path or 'sim',
+            device_ids=parse_ids(params.get('devices', '1')),
+            turnaround=float(params.get('turnaround', 0.02)),
+            jitter=float(params.get('jitter', 0)),
+            loss=float(params.get('loss', 0)),
+            report=float(params.get('report', 0)),
+            fmt=params.get('format', 'marker'),
+            echo=params.get('echo', '0') not in ('0', 'false', ''),
+            seed=int(params['seed']) if 'seed' in params else None,
+            clock=clock,
+        )
+
+    # --- 포트 ---
+
+    def attach(self, port: 'SimulatedSerial'):
+        with self._cond:
+            self._ports.append(port)
+            if self.report > 0 and self._thread is None:
+                self._thread = self.clock.spawn(self._report_loop, name=f'sim-bus-{self.name}')
+
+    def detach(self, port: 'SimulatedSerial'):
+        with self._cond:
+            if port in self._ports:
+                self._ports.remove(port)
+            self.clock.notify(self._cond)
+
+    def _transmit(self, data: bytes, baudrate: int, start: Optional[float] = None, host: bool = False) -> float:
+        """
+        선로 점유 (self._cond 보유 상태) - 전송 시작 시각 반환
+        - 장치 송신: 예약된 마지막 전송이 끝난 뒤
+        - 호스트 송신(host): 예약 구간 사이에 들어가는 첫 빈 구간 (다른 장치의 턴어라운드 동안 송신)
+        """
+        now = self.clock.monotonic()
+        length = wire_time(len(data), baudrate)
+        line = self._line
+        while line and line[0][1] <= now:
+            line.pop(0)
+        begin = now if start is None else start
+        index = len(line)
+        if host:
+            for i, (busy_from, busy_to) in enumerate(line):
+                if begin + length <= busy_from:
+                    index = i
+                    break
+                begin = max(begin, busy_to)
+        elif line:
+            begin = max(begin, line[-1][1])
+        line.insert(index, (begin, begin + length))
+        self.stats['busy_time'] += length
+        return begin
+
+    def _deliver(self, data: bytes, begin: float, baudrate: int):
+        """수신 라인에 바이트 배치 (self._cond 보유 상태) - 바이트마다 도착 시각"""
+        byte_time = wire_time(1, baudrate)
+        for port in self._ports:
+            early = port._rx and port._rx[-1][0] > begin
+            for i, b in enumerate(data):
+                port._rx.append((begin + (i + 1) * byte_time, b))
+            if early:
+                # 빈 구간에 끼운 송신(에코)은 도착 시각 순으로 다시 정렬
+                port._rx = collections.deque(sorted(port._rx, key=lambda item: item[0]))
+        self.clock.notify(self._cond)
+
+    def _status_frame(self, device: _Device, now: float) -> bytes:
+        code = device.current(now).encode()
+        if self.fmt == 'soh':
+            return bytes([SOH]) + code + bytes([DLE, ETX])
+        return bytes([STX, STATUS_MARKER, device.device_id]) + code + bytes([DLE, ETX])
+
+    # --- 장치 ---
+
+    def host_write(self, port: 'SimulatedSerial', data: bytes) -> float:
+        """호스트 송신 - 송신이 선로에서 끝나는 시각 반환"""
+        with self._cond:
+            begin = self._transmit(data, port.baudrate, host=True)
+            end = begin + wire_time(len(data), port.baudrate)
+            if self.echo:
+                self._deliver(data, begin, port.baudrate)
+            port._tx += data
+            for frame in port._take_frames():
+                self._handle(frame, end, port.baudrate)
+            return end
+
+    def _handle(self, frame: bytes, received: float, baudrate: int):
+        """명령 프레임 1개 처리 (self._cond 보유 상태)"""
+        self.stats['rx_frames'] += 1
+        device = self.devices.get(frame[2])
+        if device is None or device.device_id in self.offline:
+            return
+        if frame[3] == STATUS_QUERY:
+            self.stats['queries'] += 1
+        elif frame[3] == ESC:
+            self.stats['commands'] += 1
+            if frame[4] == ord('1'):
+                device.status = '00'
+                device.relock_at = received + AUTO_RELOCK_SECONDS if frame[5] == 0x31 else None
+            elif frame[4] == ord('0'):
+                device.status = '01'
+                device.relock_at = None
+        else:
+            return
+        if self.loss and self._rng.random() < self.loss:
+            self.stats['lost'] += 1
+            return
+        start = received + self.turnaround + (self._rng.random() * self.jitter if self.jitter else 0.0)
+        reply = self._status_frame(device, received)
+        self._deliver(reply, self._transmit(reply, baudrate, start), baudrate)
+        self.stats['replies'] += 1
+
+    def _report_loop(self):
+        """주기적 상태 보고 (장치마다 report 간격, 서로 엇갈리게)"""
+        with self._cond:
+            offsets = {device_id: i * self.report / max(1, len(self.devices))
+                       for i, device_id in enumerate(self.devices)}
+        next_at = {device_id: self.clock.monotonic() + offset for device_id, offset in offsets.items()}
+        while True:
+            with self._cond:
+                if not self._ports:
+                    self._thread = None
+                    return
+                now = self.clock.monotonic()
+                for device_id, at in next_at.items():
+                    if at <= now and device_id in self.offline:
+                        next_at[device_id] = now + self.report
+                    elif at <= now:
+                        device = self.devices[device_id]
+                        baudrate = self._ports[0].baudrate
+                        frame = self._status_frame(device, now)
+                        self._deliver(frame, self._transmit(frame, baudrate), baudrate)
+                        self.stats['reports'] += 1
+                        next_at[device_id] = now + self.report
+                wait = max(0.0, min(next_at.values()) - self.clock.monotonic())
+                self.clock.wait(self._cond, wait)
+
+    def set_status(self, device_id: int, status: str, notify: bool = True):
+        """테스트용: 장치 상태 직접 변경 (손으로 문을 연 경우 등) - notify면 상태 프레임 전송"""
+        with self._cond:
+            device = self.devices.setdefault(device_id, _Device(device_id))
+            device.status = status
+            device.relock_at = None
+            if notify and self._ports:
+                baudrate = self._ports[0].baudrate
+                frame = self._status_frame(device, self.clock.monotonic())
+                self._deliver(frame, self._transmit(frame, baudrate), baudrate)
+
+    def set_offline(self, device_id: int, offline: bool = True):
+        """테스트용: 장치 고장/복구"""
+        with self._cond:
+            if offline:
+                self.offline.add(device_id)
+            else:
+                self.offline.discard(device_id)
+
+    def status(self, device_id: int) -> Optional[str]:
+        with self._cond:
+            device = self.devices.get(device_id)
+            return device.current(self.clock.monotonic()) if device else None
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            return dict(self.stats, busy_time=round(self.stats['busy_time'], 3),
+                        devices=len(self.devices), ports=len(self._ports))
+
+
+class SimulatedSerial:
+    """pyserial Serial과 같은 방식으로 쓰는 가상 포트 (DoorLockController가 쓰는 메서드만)"""
+
+    def __init__(self, bus: SimulatedBus, baudrate: int = 9600, timeout: Optional[float] = 1):
+        self.bus = bus
+        self.port = bus.name
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._rx = collections.deque()   # (도착 시각, 바이트)
+        self._tx = bytearray()           # 아직 완성되지 않은 송신 프레임
+        self._tx_done = 0.0
+        self.is_open = True
+        bus.attach(self)
+
+    def _take_frames(self) -> List[bytes]:
+        """송신 버퍼에서 완성된 명령 프레임 추출 (DLE STX ... DLE ETX, 8바이트)"""
+        frames = []
+        while True:
+            start = self._tx.find(bytes([DLE, STX]))
+            if start < 0:
+                del self._tx[:-1]
+                return frames
+            if len(self._tx) < start + COMMAND_FRAME_LEN:
+                del self._tx[:start]
+                return frames
+            frame = bytes(self._tx[start:start + COMMAND_FRAME_LEN])
+            if frame[-2:] == bytes([DLE, ETX]):
+                frames.append(frame)
+                del self._tx[:start + COMMAND_FRAME_LEN]
+            else:
+                del self._tx[:start + 1]
+
+    def _check_open(self):
+        if not self.is_open:
+            raise OSError(f'포트 닫힘: {self.port}')
+
+    def write(self, data: bytes) -> int:
+        self._check_open()
+        self._tx_done = self.bus.host_write(self, bytes(data))
+        return len(data)
+
+    def flush(self):
+        """송신이 선로에서 끝날 때까지 대기"""
+        wait = self._tx_done - self.bus.clock.monotonic()
+        if wait > 0:
+            self.bus.clock.sleep(wait)
+
+    @property
+    def in_waiting(self) -> int:
+        now = self.bus.clock.monotonic()
+        with self.bus._cond:
+            count = 0
+            for at, _ in self._rx:
+                if at > now:
+                    break
+                count += 1
+            return count
+
+    def read(self, size: int = 1) -> bytes:
+        """size 바이트가 모이거나 timeout이 지날 때까지 대기 (pyserial과 동일)"""
+        self._check_open()
+        out = bytearray()
+        deadline = None if self.timeout is None else self.bus.clock.monotonic() + self.timeout
+        with self.bus._cond:
+            while len(out) < size and self.is_open:
+                now = self.bus.clock.monotonic()
+                rx = self._rx
+                while rx and rx[0][0] <= now and len(out) < size:
+                    out.append(rx.popleft()[1])
+                if len(out) >= size:
+                    break
+                remaining = None if deadline is None else deadline - now
+                if remaining is not None and remaining <= 0:
+                    break
+                if rx:
+                    wait = rx[0][0] - now
+                    remaining = wait if remaining is None else min(wait, remaining)
+                self.bus.clock.wait(self.bus._cond, remaining)
+        return bytes(out)
+
+    def reset_input_buffer(self):
+        """도착한 바이트만 버림 (아직 선로에 있는 바이트는 남음)"""
+        now = self.bus.clock.monotonic()
+        with self.bus._cond:
+            while self._rx and self._rx[0][0] <= now:
+                self._rx.popleft()
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.bus.detach(self)
+
+
+def get_bus(url: str, clock=None) -> SimulatedBus:
+    """URL 이름의 버스 (처음이면 URL 파라미터로 생성, 시계가 다르면 다른 버스)"""
+    bus = SimulatedBus.from_url(url, clock)
+    with _buses_lock:
+        return _buses.setdefault((bus.name, bus.clock), bus)
+
+
+def open_port(url: str, baudrate: int = 9600, timeout: Optional[float] = 1, clock=None) -> SimulatedSerial:
+    return SimulatedSerial(get_bus(url, clock), baudrate=baudrate, timeout=timeout)
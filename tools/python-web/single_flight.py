@@ -0,0 +1,73 @@
+"""
+Single-flight Module
+같은 키로 동시에 들어온 요청을 하나의 실행으로 합쳐 결과를 공유하는 모듈
+- 키 예시: (port, device_id)
+- 먼저 들어온 요청(leader)만 실제 버스 통신을 수행하고, 나머지는 결과를 기다림
+"""
+import threading
+from typing import Any, Callable, Hashable, Tuple
+
+
+class _Call:
+    """진행 중인 호출 1건"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._leaders = 0    # 실제로 실행된 호출 수
+        self._coalesced = 0  # 다른 호출의 결과를 공유받은 요청 수
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        key 기준으로 fn 실행 (동일 키가 진행 중이면 그 결과를 기다림)
+
+        Returns:
+            (결과, 공유 여부) - 공유 여부가 True면 다른 요청의 결과를 받은 것
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # 결과 확정 후 키 제거 → 이후 요청은 새 호출로 처리
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> dict:
+        """합치기 통계"""
+        with self._lock:
+            return {
+                'leaders': self._leaders,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls),
+            }
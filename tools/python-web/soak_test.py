@@ -0,0 +1,239 @@
+"""
+Soak Test
+가상 시간으로 장시간(기본 24시간) 트래픽을 돌려 성능/신뢰성 회귀를 확인 (결과는 JSON으로 출력)
+- VirtualClock 위에서 포트마다 가상 버스 + DoorLockController(요청-응답 모드) + AdaptivePoller + 장치 차단기
+- 포트마다 사용 트래픽 actor: 무작위 장치에 열기(5초 자동잠금)/닫기/상태 조회 (지수 분포 간격)
+- 장치 고장: --outages 비율의 장치가 무작위 시각부터 --outage-hours 동안 응답 없음 (차단/복구 확인)
+- 명령 결과는 가상 장치 상태로 확인 (전송 성공이어도 상태가 안 바뀌었으면 실패)
+- 같은 인자/--seed면 실행 순서와 결과가 같음 (digest) - --repeat 2로 재현성 확인
+
+사용법:
+    python soak_test.py
+    python soak_test.py --ports 4 --devices 64 --hours 24
+    python soak_test.py --hours 2 --repeat 2 --output soak.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+from circuit_breaker import CircuitOpen, DeviceBreakers
+from clock import VirtualClock
+from door_events import TransitionDetector
+from door_lock_controller import DoorLockController
+from load_test import percentile
+from poll_scheduler import AdaptivePoller
+from simulated_bus import get_bus
+
+ACTIONS = ('open5sec', 'close', 'query')
+
+
+class PortTraffic:
+    """포트 1개의 사용 트래픽 (가상 시간 actor)"""
+
+    def __init__(self, clock: VirtualClock, ctrl: DoorLockController, bus, poller: AdaptivePoller,
+                 device_ids: List[int], rate: float, mix: Dict[str, float], seed: int, until: float, log):
+        self.clock = clock
+        self.ctrl = ctrl
+        self.bus = bus
+        self.poller = poller
+        self.device_ids = device_ids
+        self.rate = rate  # 포트 전체 초당 요청 수
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.rng = random.Random(seed)
+        self.until = until
+        self.log = log
+        self.results = {action: {'ok': 0, 'failed': 0, 'rejected': 0, 'latency': []} for action in ACTIONS}
+
+    def run(self):
+        while True:
+            self.clock.sleep(self.rng.expovariate(self.rate))
+            if self.clock.monotonic() >= self.until:
+                return
+            device_id = self.rng.choice(self.device_ids)
+            action = self.rng.choices(self.actions, self.weights)[0]
+            started = self.clock.monotonic()
+            try:
+                outcome = 'ok' if self._perform(action, device_id) else 'failed'
+            except CircuitOpen:
+                outcome = 'rejected'
+            latency = self.clock.monotonic() - started
+            result = self.results[action]
+            result[outcome] += 1
+            if outcome == 'ok':
+                result['latency'].append(latency)
+            self.log(started, self.ctrl.port, device_id, action, outcome)
+
+    def _perform(self, action: str, device_id: int) -> bool:
+        if action == 'query':
+            return self.ctrl.query_status(device_id) is not None
+        if action == 'open5sec':
+            sent, expected = self.ctrl.open_lock_5sec(device_id), '00'
+        else:
+            sent, expected = self.ctrl.close_lock(device_id), '01'
+        self.poller.boost(device_id)
+        # 전송 성공이어도 장치 상태가 바뀌지 않았으면 실패 (고장 장치)
+        return sent and device_id not in self.bus.offline and self.bus.status(device_id) == expected
+
+    def summary(self) -> dict:
+        summary = {}
+        for action, result in self.results.items():
+            latencies = sorted(latency * 1000 for latency in result['latency'])
+            summary[action] = {
+                'ok': result['ok'],
+                'failed': result['failed'],
+                'rejected': result['rejected'],
+                'latency_ms': {
+                    'p50': _round(percentile(latencies, 50)),
+                    'p99': _round(percentile(latencies, 99)),
+                    'max': _round(latencies[-1] if latencies else None),
+                },
+            }
+        return summary
+
+
+def _round(value, digits: int = 1):
+    return None if value is None else round(value, digits)
+
+
+def run_soak(args) -> dict:
+    """가상 시간으로 한 번 실행 - 결과 dict (digest 포함)"""
+    duration = args.hours * 3600
+    clock = VirtualClock()
+    breakers = DeviceBreakers(clock=clock)
+    digest = hashlib.sha256()
+    transitions = []
+
+    def log(at, port, device_id, action, outcome):
+        digest.update(f'{at:.6f} {port} {device_id} {action} {outcome}\n'.encode())
+
+    detector = TransitionDetector()
+    detector.add_listener(transitions.append)
+    device_ids = list(range(1, args.devices + 1))
+    mix = {'open5sec': args.open, 'close': args.close, 'query': args.query}
+    mix = {action: weight for action, weight in mix.items() if weight > 0}
+    rng = random.Random(args.seed)
+
+    ports = []
+    for i in range(args.ports):
+        url = (f'sim://soak{i}?devices=1-{args.devices}&turnaround={args.turnaround}'
+               f'&jitter={args.jitter}&loss={args.loss}&seed={args.seed + i}')
+        ctrl = DoorLockController(port=url, timeout=args.timeout, breakers=breakers, clock=clock)
+        ctrl.connect()
+        bus = get_bus(url, clock)
+
+        def poll(device_id, ctrl=ctrl):
+            try:
+                return ctrl.query_status(device_id)
+            except CircuitOpen:
+                return None
+
+        poller = AdaptivePoller(poll, detector, port=url, device_ids=device_ids, budget=args.budget,
+                                max_interval=args.max_interval, clock=clock)
+        traffic = PortTraffic(clock, ctrl, bus, poller, device_ids,
+                              rate=args.devices * args.rate / 3600, mix=mix,
+                              seed=args.seed * 1000 + i, until=duration, log=log)
+        ports.append((url, bus, ctrl, poller, traffic))
+
+    # 장치 고장 예약 (시작 시각 무작위, --outage-hours 동안)
+    outage_length = min(duration, args.outage_hours * 3600)
+    all_devices = [(p, device_id) for p in range(args.ports) for device_id in device_ids]
+    outages = rng.sample(all_devices, round(len(all_devices) * args.outages))
+    for p, device_id in outages:
+        start = rng.uniform(0, duration - outage_length)
+        bus = ports[p][1]
+        clock.call_at(start, bus.set_offline, device_id, True)
+        clock.call_at(start + outage_length, bus.set_offline, device_id, False)
+
+    started_at = clock.monotonic()
+    wall = time.perf_counter()
+    for url, bus, ctrl, poller, traffic in ports:
+        poller.start()
+        clock.spawn(traffic.run, name=f'traffic-{url}')
+    try:
+        clock.run_until(started_at + duration)
+    finally:
+        for _, _, _, poller, _ in ports:
+            poller.stop()
+        clock.close()
+    wall = time.perf_counter() - wall
+
+    port_results = {}
+    for url, bus, ctrl, poller, traffic in ports:
+        polls = poller.snapshot()
+        sim = bus.snapshot()
+        digest.update(f'{url} polls={poller.polls} replies={sim["replies"]}\n'.encode())
+        port_results[url] = {
+            'requests': traffic.summary(),
+            'poller': {key: polls[key] for key in ('polls', 'bus_usage', 'boosts', 'throttled')},
+            'bus_utilisation': round(sim['busy_time'] / duration, 4),
+            'bus': {key: sim[key] for key in ('queries', 'commands', 'replies', 'lost')},
+        }
+    return {
+        'virtual_hours': args.hours,
+        'wall_seconds': round(wall, 2),
+        'speedup': round(duration / wall) if wall > 0 else None,
+        'devices': args.ports * args.devices,
+        'outages': len(outages),
+        'transitions': len(transitions),
+        'breakers': breakers.snapshot(),
+        'clock': clock.snapshot(),
+        'ports': port_results,
+        'digest': digest.hexdigest(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Door lock virtual-time soak test')
+    parser.add_argument('--ports', type=int, default=4, help='포트(버스) 수')
+    parser.add_argument('--devices', type=int, default=64, help='포트당 장치 수 (최대 254)')
+    parser.add_argument('--hours', type=float, default=24.0, help='가상 시간 (시간)')
+    parser.add_argument('--rate', type=float, default=4.0, help='장치당 시간당 사용 요청 수')
+    parser.add_argument('--open', type=float, default=2.0, help='열기(5초 자동잠금) 비율')
+    parser.add_argument('--close', type=float, default=1.0, help='닫기 비율')
+    parser.add_argument('--query', type=float, default=1.0, help='상태 조회 비율')
+    parser.add_argument('--budget', type=float, default=0.2, help='폴링 버스 시간 비율')
+    parser.add_argument('--max-interval', type=float, default=300.0, help='변화 없는 장치 최대 폴링 주기 (초)')
+    parser.add_argument('--turnaround', type=float, default=0.02, help='가상 장치 턴어라운드 (초)')
+    parser.add_argument('--jitter', type=float, default=0.005, help='턴어라운드 지터 (초)')
+    parser.add_argument('--loss', type=float, default=0.001, help='응답 누락 확률')
+    parser.add_argument('--timeout', type=float, default=1.0, help='응답 대기 (초)')
+    parser.add_argument('--outages', type=float, default=0.02, help='고장 나는 장치 비율')
+    parser.add_argument('--outage-hours', type=float, default=2.0, help='고장 지속 시간 (시간)')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=1, help='같은 인자로 반복 실행 (digest 비교)')
+    parser.add_argument('--verbose', action='store_true', help='컨트롤러 송수신 로그 출력')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+    if not 1 <= args.devices <= 254:
+        parser.error('--devices는 1~254')
+
+    stdout = sys.stdout
+    runs = []
+    try:
+        if not args.verbose:
+            sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+        for i in range(max(1, args.repeat)):
+            runs.append(run_soak(args))
+            print(f"[SOAK] {args.hours}시간 / 장치 {runs[-1]['devices']}대: "
+                  f"{runs[-1]['wall_seconds']}초 (digest {runs[-1]['digest'][:12]})", file=sys.stderr)
+    finally:
+        if sys.stdout is not stdout:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    report = dict(runs[0], reproducible=len({run['digest'] for run in runs}) == 1 if len(runs) > 1 else None)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0 if report['reproducible'] is not False else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
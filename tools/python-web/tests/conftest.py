@@ -0,0 +1,8 @@
+"""
+python-web 모듈 테스트 (tools/python-web에서 `python -m pytest -q`)
+- 모듈이 패키지가 아니므로 상위 폴더를 import 경로에 추가
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+"""상시 수신 - 응답/이벤트 분리"""
+import threading
+
+from bus_reader import BusReader
+from door_lock_controller import DoorLockController
+from frame_codec import decode_first
+from simulated_bus import get_bus
+
+
+class _Port:
+    port = 'test'
+    timeout = 0.1
+
+
+def marker(device_id: int, status: str) -> bytes:
+    return bytes([0x02, 0x53, device_id]) + status.encode() + bytes([0x10, 0x03])
+
+
+def test_replies_go_to_waiting_device_and_rest_to_events():
+    reader = BusReader(_Port())
+    events = reader.subscribe()
+    first, second = reader.expect(1), reader.expect(2)
+
+    reader._dispatch(decode_first(marker(2, '00')))
+    reader._dispatch(decode_first(marker(3, '10')))  # 기다리는 요청 없음 → 이벤트
+    reader._dispatch(decode_first(marker(1, '01')))
+
+    assert second.wait(0).status_code == '00'
+    assert first.wait(0).status_code == '01'
+    event = events.get_nowait()
+    assert (event['device_id'], event['status_code']) == (3, '10')
+    assert events.empty()
+    assert reader.stats['replies'] == 2 and reader.stats['unsolicited'] == 1
+
+
+def test_soh_reply_goes_to_oldest_waiter():
+    reader = BusReader(_Port())
+    first, second = reader.expect(4), reader.expect(5)
+    reader._dispatch(decode_first(bytes([0x01]) + b'01' + bytes([0x10, 0x03])))
+    assert first.wait(0) is not None
+    assert second.wait(0) is None
+
+
+def test_cancelled_wait_does_not_swallow_frame():
+    reader = BusReader(_Port())
+    events = reader.subscribe()
+    pending = reader.expect(6)
+    reader.cancel(pending)
+    reader._dispatch(decode_first(marker(6, '01')))
+    assert pending.wait(0) is None
+    assert events.get_nowait()['device_id'] == 6
+
+
+def test_sim_bus_concurrent_queries_and_unsolicited_event():
+    url = 'sim://reader-demux?devices=1-4&turnaround=0.005'
+    ctrl = DoorLockController(port=url, timeout=0.5, background_reader=True)
+    assert ctrl.connect()
+    ctrl.pipeline_window = 4
+    bus = get_bus(url)
+    for device_id, status in ((1, '00'), (2, '01'), (3, '10'), (4, '01')):
+        bus.set_status(device_id, status, notify=False)
+    events = ctrl.reader.subscribe()
+    results = {}
+    try:
+        ctrl.query_status(1)  # 응답 형식(장치 ID 포함) 확인 후 동시 전송
+        threads = [threading.Thread(target=lambda d=d: results.setdefault(d, ctrl.query_status(d)))
+                   for d in (1, 2, 3, 4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        bus.set_status(2, '10')  # 손으로 문을 연 경우 - 요청 없이 들어온 프레임
+        event = events.get(timeout=2)  # 앞선 조회 응답은 이벤트로 새지 않음
+    finally:
+        ctrl.reader.unsubscribe(events)
+        ctrl.disconnect()
+
+    assert {d: r['status_code'] for d, r in results.items()} == {1: '00', 2: '01', 3: '10', 4: '01'}
+    assert (event['device_id'], event['status_code']) == (2, '10')
+    assert ctrl.pipeline_snapshot()['pipelined'] >= 4
@@ -0,0 +1,84 @@
+"""장치 차단기 상태 전환 (가상 시간)"""
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitOpen, DeviceBreakers
+from clock import VirtualClock
+from door_lock_controller import DoorLockController
+from simulated_bus import get_bus
+
+PORT = 'sim://breaker-unit'
+
+
+def test_opens_after_threshold_failures():
+    clock = VirtualClock()
+    breakers = DeviceBreakers(threshold=3, base_delay=5.0, clock=clock)
+
+    breakers.record(PORT, 1, False)
+    breakers.record(PORT, 1, False)
+    assert breakers.state(PORT, 1) == CLOSED
+    assert breakers.allow(PORT, 1) is False
+
+    breakers.record(PORT, 1, False)
+    assert breakers.state(PORT, 1) == OPEN
+    with pytest.raises(CircuitOpen) as exc:
+        breakers.allow(PORT, 1)
+    assert exc.value.estimated == pytest.approx(5.0)
+    assert breakers.snapshot()['rejected'] == 1
+
+
+def test_half_open_probe_backs_off_then_recovers():
+    clock = VirtualClock()
+    breakers = DeviceBreakers(threshold=1, base_delay=5.0, factor=2.0, clock=clock)
+    breakers.record(PORT, 2, False)
+
+    clock.run_for(5.0)
+    assert breakers.allow(PORT, 2) is True  # 확인 1건만 통과
+    assert breakers.state(PORT, 2) == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breakers.allow(PORT, 2)  # 확인 중에는 다른 요청 거절
+
+    breakers.record(PORT, 2, False)
+    assert breakers.state(PORT, 2) == OPEN
+    clock.run_for(9.9)
+    with pytest.raises(CircuitOpen) as exc:
+        breakers.allow(PORT, 2)
+    assert exc.value.estimated == pytest.approx(0.1)
+
+    clock.run_for(0.1)
+    assert breakers.allow(PORT, 2) is True
+    breakers.record(PORT, 2, True)
+    assert breakers.state(PORT, 2) == CLOSED
+    assert breakers.states() == []
+    assert breakers.snapshot()['recovered'] == 1
+
+
+def test_open_device_does_not_use_the_bus():
+    clock = VirtualClock()
+    breakers = DeviceBreakers(threshold=3, base_delay=5.0, clock=clock)
+    url = 'sim://breaker-ctrl?devices=1-2&turnaround=0.01'
+    ctrl = DoorLockController(port=url, timeout=0.2, breakers=breakers, clock=clock)
+    ctrl.connect()
+    bus = get_bus(url, clock)
+    bus.set_offline(2)
+    results = {}
+
+    def client():
+        results['missed'] = [ctrl.query_status(2) for _ in range(3)]
+        queries = bus.snapshot()['queries']
+        try:
+            ctrl.query_status(2)
+        except CircuitOpen:
+            results['rejected'] = bus.snapshot()['queries'] == queries
+        results['other'] = ctrl.query_status(1)
+
+    clock.spawn(client, name='client')
+    try:
+        clock.run_for(5.0)
+    finally:
+        clock.close()
+        ctrl.disconnect()
+
+    assert results['missed'] == [None, None, None]
+    assert results['rejected'] is True
+    assert results['other']['status_code'] == '01'
+    assert breakers.state(url, 2) == OPEN
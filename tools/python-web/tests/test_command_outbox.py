@@ -0,0 +1,111 @@
+"""명령 보관 재전송 / 보류 / 로그 복원"""
+import time
+
+from circuit_breaker import CircuitOpen
+from command_outbox import PRIORITY_HIGH, CommandOutbox
+
+
+def make_outbox(tmp_path, deliver, **kwargs) -> CommandOutbox:
+    return CommandOutbox(str(tmp_path / 'outbox.jsonl'), deliver, **kwargs)
+
+
+def test_replay_delivers_by_priority(tmp_path):
+    sent = []
+    outbox = make_outbox(tmp_path, lambda e: sent.append((e.device_id, e.action)) or True)
+    outbox.put('p', 1, 'open', ttl=60)
+    outbox.put('p', 2, 'close', ttl=60, priority=PRIORITY_HIGH)
+    outbox.put('p', 3, 'open', ttl=60)
+    outbox.put('p', 3, 'close', ttl=60)  # 같은 장치는 마지막 명령만
+
+    assert outbox.replay() == {'delivered': 3, 'expired': 0}
+    assert sent == [(2, 'close'), (1, 'open'), (3, 'close')]
+    assert outbox.pending() == []
+    assert outbox.stats['superseded'] == 1
+
+
+def test_port_failure_backs_off_whole_port(tmp_path):
+    attempts = []
+
+    def deliver(entry):
+        attempts.append(entry.device_id)
+        return entry.port != 'down'
+
+    outbox = make_outbox(tmp_path, deliver, retry_base=0.05)
+    outbox.put('down', 1, 'close', ttl=60)
+    outbox.put('down', 2, 'close', ttl=60)
+    outbox.put('up', 3, 'close', ttl=60)
+
+    assert outbox.replay()['delivered'] == 1
+    assert sorted(attempts) == [1, 3]            # 실패한 포트의 나머지는 시도하지 않음
+    assert 'down' in outbox.snapshot()['retry_in']
+    assert outbox.replay()['delivered'] == 0     # 재시도 시각 전
+    assert attempts.count(1) + attempts.count(2) == 1
+
+    time.sleep(0.06)
+    outbox.replay()
+    assert attempts.count(1) + attempts.count(2) == 2
+
+
+def test_open_breaker_defers_only_that_entry(tmp_path):
+    sent = []
+
+    def deliver(entry):
+        if entry.device_id == 2:
+            raise CircuitOpen('차단 중', 0.05)
+        sent.append(entry.device_id)
+        return True
+
+    outbox = make_outbox(tmp_path, deliver, retry_base=0.01)
+    outbox.put('p', 2, 'close', ttl=60, priority=PRIORITY_HIGH)
+    outbox.put('p', 3, 'close', ttl=60)
+
+    assert outbox.replay()['delivered'] == 1
+    assert sent == [3]                           # 같은 포트의 다음 명령은 계속 전송
+    snapshot = outbox.snapshot()
+    assert snapshot['retry_in'] == {}
+    assert snapshot['deferred'] == 1 and snapshot['pending'] == 1
+
+    assert outbox.replay()['delivered'] == 0     # 보류 시간 전에는 다시 보내지 않음
+    time.sleep(0.06)
+    outbox.deliver = lambda entry: sent.append(entry.device_id) or True
+    assert outbox.replay()['delivered'] == 1
+    assert sent == [3, 2]
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    outbox = make_outbox(tmp_path, lambda e: True)
+    outbox.put('p', 1, 'open', ttl=0.01)
+    time.sleep(0.02)
+    assert outbox.replay() == {'delivered': 0, 'expired': 1}
+
+
+def test_log_restores_undelivered_entries(tmp_path):
+    outbox = make_outbox(tmp_path, lambda e: False)
+    outbox.put('p', 1, 'open', ttl=60)
+    outbox.put('p', 2, 'close', ttl=60)
+    outbox.put('p', 3, 'close', ttl=60)
+    outbox.supersede('p', 1)
+    outbox.stop()
+    with open(tmp_path / 'outbox.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "seq": 9')  # 기록 중 끊긴 마지막 줄
+
+    restored = make_outbox(tmp_path, lambda e: True)
+    assert [(e['device_id'], e['action']) for e in restored.pending()] == [(2, 'close'), (3, 'close')]
+    assert restored.replay()['delivered'] == 2
+    restored.stop()
+    assert make_outbox(tmp_path, lambda e: True).pending() == []
+
+
+def test_replayer_thread_delivers_after_start(tmp_path):
+    sent = []
+    outbox = make_outbox(tmp_path, lambda e: sent.append(e.device_id) or True)
+    outbox.start()
+    try:
+        outbox.put('p', 7, 'close', ttl=60)
+        deadline = time.monotonic() + 3
+        while not sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        outbox.stop()
+    assert sent == [7]
+    assert outbox.stats['fsyncs'] >= 1
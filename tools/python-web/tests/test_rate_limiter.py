@@ -0,0 +1,75 @@
+"""버스 공정 분배 순서 / 요청 한도"""
+import threading
+import time
+
+import pytest
+
+from admission import DeadlineExceeded
+from line_timing import COMMAND, QUERY
+from rate_limiter import FairBusGate, RateLimits
+
+
+def enqueue(gate: FairBusGate, order: list, client: str, weight: float = 1.0, cost: float = 1.0):
+    """대기열에 들어갈 때까지 기다린 뒤 반환 (순번이 들어간 순서대로 정해지도록)"""
+    waiting = gate.snapshot()['waiting']
+
+    def run():
+        with gate.slot(client, weight=weight, cost=cost):
+            order.append(client)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while gate.snapshot()['waiting'] == waiting:
+        time.sleep(0.001)
+    return thread
+
+
+def drain(gate: FairBusGate, holder: str, requests) -> list:
+    order = []
+    with gate.slot(holder):
+        threads = [enqueue(gate, order, *request) for request in requests]
+    for thread in threads:
+        thread.join(timeout=3)
+    return order
+
+
+def test_gate_interleaves_clients():
+    # a가 먼저 두 건을 넣어도 b의 첫 요청이 a의 두 번째 요청보다 먼저
+    order = drain(FairBusGate(), 'holder', [('a',), ('a',), ('b',)])
+    assert order == ['a', 'b', 'a']
+
+
+def test_gate_follows_client_weights():
+    order = drain(FairBusGate(), 'holder', [('light', 1.0), ('light', 1.0), ('heavy', 2.0), ('heavy', 2.0)])
+    assert order == ['heavy', 'light', 'heavy', 'light']
+
+
+def test_gate_drops_waiter_past_deadline():
+    gate = FairBusGate()
+    with gate.slot('holder'):
+        with pytest.raises(DeadlineExceeded):
+            with gate.slot('late', deadline=time.monotonic() + 0.02):
+                pass
+    assert gate.snapshot()['expired'] == 1
+    with gate.slot('next'):
+        assert gate.snapshot()['holders'] == 1
+
+
+def test_gate_capacity_admits_pipeline_window():
+    gate = FairBusGate(capacity=2)
+    with gate.slot('a'):
+        with gate.slot('b'):
+            assert gate.snapshot()['busy'] is True
+            assert gate.backlog() > 0
+    assert gate.snapshot()['holders'] == 0
+
+
+def test_rate_limits_budget_and_refund():
+    limits = RateLimits(client_command=(0.001, 2), device_command=(0.001, 5))
+    assert limits.check('kiosk', 'p', 1, COMMAND) == 0
+    assert limits.check('kiosk', 'p', 1, COMMAND) == 0
+    assert limits.check('kiosk', 'p', 1, COMMAND) > 0
+    limits.refund('kiosk', 'p', 1, COMMAND)
+    assert limits.check('kiosk', 'p', 1, COMMAND) == 0
+    # 조회 예산은 따로
+    assert limits.check('kiosk', 'p', 1, QUERY) == 0
@@ -0,0 +1,122 @@
+"""타이머 휠 / 예약 잠금 / 저널 복원"""
+import json
+import threading
+import time
+
+from relock_timer import RelockScheduler, TimerWheel
+
+
+def wait_until(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_wheel_expires_in_order_across_levels():
+    wheel = TimerWheel(tick=0.01, bits=4, levels=3)
+    start = time.monotonic()
+    wheel.schedule('near', 0.05)
+    wheel.schedule('far', 2.0)        # 상위 level에서 내려와야 하는 타이머
+    wheel.schedule('cancelled', 0.05)
+    assert wheel.cancel('cancelled')
+
+    assert wheel.advance(start + 0.03) == []
+    assert wheel.advance(start + 0.07) == ['near']
+    assert wheel.advance(start + 1.9) == []
+    assert wheel.advance(start + 2.1) == ['far']
+    assert len(wheel) == 0
+
+
+def test_wheel_reschedule_replaces_timer():
+    wheel = TimerWheel(tick=0.01)
+    start = time.monotonic()
+    wheel.schedule('key', 0.05)
+    wheel.schedule('key', 0.5)
+    assert wheel.advance(start + 0.1) == []
+    assert wheel.remaining('key') > 0.3
+    assert wheel.advance(start + 0.6) == ['key']
+
+
+def test_relock_fires_and_retries_before_give_up(tmp_path):
+    closed, gave_up = [], []
+
+    def close(port, device_id):
+        closed.append(device_id)
+        return device_id != 2
+
+    relocks = RelockScheduler(str(tmp_path / 'relocks.jsonl'), close, tick=0.01,
+                              retry_delay=0.02, max_attempts=3,
+                              give_up=lambda port, device_id: gave_up.append(device_id))
+    try:
+        relocks.schedule('p', 1, 0.05)
+        relocks.schedule('p', 2, 0.05)
+        relocks.schedule('p', 3, 0.05)
+        assert relocks.cancel('p', 3)
+        assert wait_until(lambda: gave_up == [2])
+    finally:
+        relocks.stop()
+
+    assert sorted(closed) == [1, 2, 2, 2]
+    assert relocks.pending() == []
+    assert relocks.snapshot()['relocked'] == 1
+    assert relocks.snapshot()['failed'] == 1
+
+
+def test_journal_restores_pending_relocks(tmp_path):
+    path = str(tmp_path / 'relocks.jsonl')
+    relocks = RelockScheduler(path, lambda port, device_id: True, tick=0.01)
+    relocks.schedule('p', 1, 600)
+    relocks.schedule('p', 2, 600)
+    relocks.schedule('p', 2, 900)   # 같은 장치는 마지막 예약만
+    relocks.schedule('p', 3, 600)
+    relocks.cancel('p', 3)
+    due = relocks.get('p', 2)
+    relocks.stop()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"port": "p", "device_id": 4, "du')  # 기록 중 끊긴 마지막 줄
+
+    restored = RelockScheduler(path, lambda port, device_id: True, tick=0.01)
+    try:
+        assert [(e['port'], e['device_id']) for e in restored.pending()] == [('p', 1), ('p', 2)]
+        assert restored.get('p', 2) == due
+    finally:
+        restored.stop()
+    # 복원 후 현재 예약만 남도록 다시 씀
+    with open(path, encoding='utf-8') as f:
+        assert len([json.loads(line) for line in f]) == 2
+
+
+def test_journal_restores_overdue_relock_immediately(tmp_path):
+    path = str(tmp_path / 'relocks.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'port': 'p', 'device_id': 5, 'due': time.time() - 60}) + '\n')
+    closed = []
+    relocks = RelockScheduler(path, lambda port, device_id: closed.append(device_id) or True, tick=0.01)
+    try:
+        relocks.start()
+        assert wait_until(lambda: closed == [5])
+    finally:
+        relocks.stop()
+
+
+def test_journal_group_commits_concurrent_schedules(tmp_path):
+    relocks = RelockScheduler(str(tmp_path / 'relocks.jsonl'), lambda port, device_id: True)
+
+    def worker(base):
+        for device_id in range(base, base + 25):
+            relocks.schedule('p', device_id, 600)
+
+    threads = [threading.Thread(target=worker, args=(i * 25 + 1,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = relocks.snapshot()
+    finally:
+        relocks.stop()
+    assert stats['pending'] == 200
+    assert 1 <= stats['fsyncs'] <= 200
@@ -0,0 +1,148 @@
+"""
+Tracing Module
+요청 단위 구간 측정 - /api/open 등이 느릴 때 어느 구간(대기, 연결, 전송, 응답, 파싱)에서 시간이 걸렸는지 확인
+- 시각은 time.monotonic_ns 기준 이름 붙은 지점(mark)으로 기록
+- 샘플링된 요청만 Chrome trace event 형식(JSON 배열)으로 파일에 기록 (chrome://tracing, Perfetto에서 열기)
+- 현재 스레드에 추적 중인 요청이 없으면 mark()는 속성 조회 1번으로 끝남
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+# (구간 이름, 시작 지점, 끝 지점)
+SPANS = (
+    ('http_receive', 'received', 'admitted'),
+    ('queue_wait', 'queue_enter', 'bus_acquired'),
+    ('connect', 'connect_start', 'connected'),
+    ('write', 'write_start', 'write_complete'),
+    ('await_reply', 'write_complete', 'first_rx_byte'),
+    ('no_reply', 'write_complete', 'reply_timeout'),
+    ('frame_rx', 'first_rx_byte', 'frame_complete'),
+    ('parse', 'frame_complete', 'parsed'),
+)
+
+_local = threading.local()
+
+
+class Trace:
+    __slots__ = ('name', 'start_ns', 'marks', 'args', 'sampled', 'tid')
+
+    def __init__(self, name: str, sampled: bool, args: dict):
+        self.name = name
+        self.start_ns = time.monotonic_ns()
+        self.marks = {'received': self.start_ns}
+        self.args = args
+        self.sampled = sampled
+        self.tid = threading.get_ident()
+
+    def mark(self, name: str, ns: Optional[int] = None):
+        # 같은 지점이 여러 번 나오면(재전송 등) 처음 것 유지
+        if name not in self.marks:
+            self.marks[name] = time.monotonic_ns() if ns is None else ns
+
+    def spans(self) -> list:
+        """[(이름, 시작 ns, 끝 ns)] - 양쪽 지점이 모두 기록된 구간만"""
+        marks = self.marks
+        result = [(name, marks[a], marks[b]) for name, a, b in SPANS if a in marks and b in marks]
+        end = marks.get('response')
+        if end is not None:
+            # 응답 구간: 마지막 처리 지점 ~ 응답 생성
+            last = max(ns for name, ns in marks.items() if name != 'response')
+            result.append(('response', last, end))
+        return result
+
+    def timing(self) -> dict:
+        """API 응답에 넣을 구간별 소요 시간 (ms)"""
+        end = self.marks.get('response') or time.monotonic_ns()
+        return {
+            'total_ms': round((end - self.start_ns) / 1e6, 3),
+            'spans': {name: round((b - a) / 1e6, 3) for name, a, b in self.spans()},
+        }
+
+
+def current() -> Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+def mark(name: str, ns: Optional[int] = None):
+    """현재 스레드의 추적 중인 요청에 지점 기록 (없으면 무시)"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.mark(name, ns)
+
+
+class Tracer:
+    def __init__(self, path: str, sample_rate: float = 0.0, max_bytes: int = 10 * 1024 * 1024):
+        """
+        Args:
+            path: trace event 파일 경로
+            sample_rate: 파일에 기록할 요청 비율 (0~1)
+            max_bytes: 파일 최대 크기 (초과 시 .1로 옮기고 새로 시작)
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.export_errors = 0
+
+    def begin(self, name: str, force: bool = False, **args) -> Optional[Trace]:
+        """
+        요청 추적 시작 - 샘플링되었거나 force(응답에 timing 요청)일 때만 Trace 생성
+        """
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        trace = Trace(name, sampled, args) if sampled or force else None
+        _local.trace = trace
+        return trace
+
+    def end(self, trace: Trace):
+        _local.trace = None
+        if trace.sampled:
+            self._export(trace)
+
+    def _events(self, trace: Trace) -> list:
+        pid = os.getpid()
+        end = trace.marks.get('response') or time.monotonic_ns()
+        events = [{
+            'name': trace.name, 'cat': 'request', 'ph': 'X', 'pid': pid, 'tid': trace.tid,
+            'ts': trace.start_ns / 1000, 'dur': (end - trace.start_ns) / 1000, 'args': trace.args,
+        }]
+        for name, a, b in trace.spans():
+            events.append({
+                'name': name, 'cat': 'bus', 'ph': 'X', 'pid': pid, 'tid': trace.tid,
+                'ts': a / 1000, 'dur': (b - a) / 1000,
+            })
+        return events
+
+    def _export(self, trace: Trace):
+        """JSON 배열 형식으로 이어쓰기 (닫는 ']'는 생략 가능한 형식)"""
+        lines = ''.join(json.dumps(e, ensure_ascii=False) + ',\n' for e in self._events(trace))
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                try:
+                    size = os.path.getsize(self.path)
+                except OSError:
+                    size = 0
+                if size > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                    size = 0
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    if size == 0:
+                        f.write('[\n')
+                    f.write(lines)
+                self.exported += 1
+            except OSError as e:
+                self.export_errors += 1
+                print(f"[TRACE] 기록 실패: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            'sample_rate': self.sample_rate,
+            'exported': self.exported,
+            'export_errors': self.export_errors,
+            'path': self.path,
+        }
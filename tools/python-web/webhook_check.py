@@ -0,0 +1,161 @@
+"""
+Webhook Check
+상태 변화 감지 → 웹훅 전달 경로를 가상 버스 + 로컬 HTTP 수신기로 확인 (실패 시 종료코드 1)
+- 앱을 이 프로세스에서 띄우고 (sim:// 포트) 로컬 수신기를 웹훅으로 등록
+- 디바운스: 한 번만 튄 조회 결과(API 조회 / 폴러 조회)는 이벤트를 만들지 않아야 함
+- 실제 변화: 연속 2회 관측되면 이벤트 정확히 1건
+- 재시도: 수신기가 처음 --fail번 500으로 응답해도 백오프 후 같은 이벤트가 1번 전달되어야 함
+
+사용법:
+    python webhook_check.py
+    python webhook_check.py --fail 3 --verbose
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SIM_URL = 'sim://webhook-check?devices=1-2&turnaround=0.005'
+
+
+class Receiver:
+    """로컬 웹훅 수신기 - 처음 fail번은 500 응답"""
+
+    def __init__(self, fail: int):
+        self.fail = fail
+        self.attempts = 0
+        self.events = []
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with receiver._lock:
+                    receiver.attempts += 1
+                    failed = receiver.attempts <= receiver.fail
+                    if not failed:
+                        receiver.events.extend(json.loads(body)['events'])
+                self.send_response(500 if failed else 200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name='webhook-receiver', daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+
+    def wait_events(self, count: int, timeout: float) -> list:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if len(self.events) >= count:
+                    break
+            time.sleep(0.02)
+        with self._lock:
+            return list(self.events)
+
+
+def start_app():
+    """가상 버스 구성으로 앱 로드 (요청 한도 없음, 웹훅 재시도 간격 짧게)"""
+    workdir = tempfile.mkdtemp(prefix='door-lock-webhook-')
+    config_path = os.path.join(workdir, 'fleet.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'default_port': SIM_URL, 'ports': {SIM_URL: {'baudrate': 9600, 'timeout': 1}}}, f)
+    os.environ['DOOR_LOCK_CONFIG'] = config_path
+    os.environ['DOOR_LOCK_DATA_DIR'] = os.path.join(workdir, 'data')
+
+    import app as web_app
+    from rate_limiter import RateLimits
+    unlimited = (1e9, 1e9)
+    web_app.rate_limits = RateLimits(unlimited, unlimited, unlimited, unlimited)
+    web_app.webhooks.flush_interval = 0.05
+    web_app.webhooks.retry_base = 0.05
+    web_app.webhooks.retry_max = 0.2
+    return web_app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Door lock webhook debounce/retry check')
+    parser.add_argument('--fail', type=int, default=2, help='수신기가 처음 500으로 응답할 횟수')
+    parser.add_argument('--timeout', type=float, default=10.0, help='전달 대기 (초)')
+    parser.add_argument('--verbose', action='store_true', help='앱 로그 출력')
+    args = parser.parse_args()
+
+    stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    receiver = Receiver(args.fail)
+    web_app = start_app()
+    from simulated_bus import get_bus
+    bus = get_bus(SIM_URL)
+    client = web_app.app.test_client()
+    ctrl = web_app.registry.get(SIM_URL)
+    checks = {}
+
+    def query(device_id: int):
+        response = client.post('/api/query-status', json={'device_id': device_id})
+        return response.get_json().get('status_code')
+
+    try:
+        client.post('/api/webhooks', json={'url': receiver.url})
+        # 기준 상태 (첫 관측은 이벤트 없음)
+        query(1)
+        web_app.poll_query(ctrl, 2)
+
+        # 한 번만 튄 조회: API 경로와 폴러 경로 모두 이벤트 없어야 함
+        bus.set_status(1, '00', notify=False)
+        query(1)
+        bus.set_status(1, '01', notify=False)
+        query(1)
+        bus.set_status(2, '10', notify=False)
+        web_app.poll_query(ctrl, 2)
+        bus.set_status(2, '01', notify=False)
+        web_app.poll_query(ctrl, 2)
+        checks['glitch_suppressed'] = not web_app.detector.recent() and web_app.detector.suppressed == 2
+
+        # 실제 변화: 연속 2회 관측 → 1건
+        bus.set_status(1, '00', notify=False)
+        query(1)
+        query(1)
+        recent = web_app.detector.recent()
+        checks['transition_once'] = [t.kind for t in recent] == ['unlocked']
+
+        # 재시도 후 전달 (같은 이벤트 1번)
+        events = receiver.wait_events(1, args.timeout)
+        time.sleep(0.3)  # 중복 전달이 있으면 받을 시간
+        events = receiver.wait_events(1, 0)
+        checks['delivered_once'] = [(e['kind'], e['device_id']) for e in events] == [('unlocked', 1)]
+        checks['retried'] = receiver.attempts == args.fail + 1
+        target = web_app.webhooks.snapshot()[0]
+    finally:
+        web_app.webhooks.stop()
+        web_app.registry.close_all()
+        receiver.server.shutdown()
+        if sys.stdout is not stdout:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    report = {
+        'checks': checks,
+        'attempts': receiver.attempts,
+        'events': events,
+        'webhook': target,
+        'suppressed': web_app.detector.suppressed,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"[WEBHOOK CHECK] 실패: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    print("[WEBHOOK CHECK] 통과", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())